@@ -1,11 +1,40 @@
 import os
+import time
+import atexit
+import random
+import asyncio
+import logging
+import weakref
+import threading
 from core.bus_defines import PROTOCOLS
-from ollama import Client
+from typing import Callable
+from core.balancer import EndpointPool, is_endpoint_failure, parse_endpoints
+from core.json_stream import BraceScanner
+from ollama import AsyncClient, Client
+
+logger = logging.getLogger(__name__)
 
 # SERVER_URL = "http://enqii.lsc.ic.unicamp.br:11434"
 # SERVER_URL = 'http://127.0.0.1:11434'
+# Aceita vários servidores separados por vírgula (ver core/balancer.py)
 SERVER_URL = os.getenv('SERVER_URL', 'http://127.0.0.1:11434')
-client = Client(host=SERVER_URL)
+llm_pool = EndpointPool(parse_endpoints(SERVER_URL))
+# Número máximo de requisições simultâneas por servidor (caminho assíncrono)
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '4'))
+# Tempo que o modelo fica carregado após uma requisição (ex.: '30m', '-1'),
+# o que também preserva o prefixo de prompt já avaliado
+LLM_KEEP_ALIVE = os.getenv('LLM_KEEP_ALIVE', '30m')
+# Prazo (s) de uma requisição; LLM_DEADLINE_<ETAPA> define prazos por etapa
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '900'))
+# Requisições mais lentas que o percentil HEDGE_PERCENTILE ganham uma
+# duplicata (LLM_HEDGE=0 desativa)
+LLM_HEDGE = os.getenv('LLM_HEDGE', '1') != '0'
+HEDGE_PERCENTILE = 90
+# Espera (s) antes de repetir quando todos os servidores falharam; dobra a
+# cada rodada
+RETRY_BACKOFF = 1.0
+MAX_RETRY_BACKOFF = 30.0
+MAX_RETRY_ROUNDS = 4
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CURRENT_DIR = os.getcwd()
@@ -14,25 +43,613 @@ TEMPLATES_DIR: str = os.path.normpath(
     os.path.join(BASE_DIR, '..', 'templates')
 )
 INTERNAL_DIR = os.path.normpath(os.path.join(BASE_DIR, '..', 'internal'))
+CACHE_DIR = os.getenv(
+    'PROCESSOR_CI_CACHE_DIR', os.path.join(CURRENT_DIR, '.cache')
+)
+CACHE_MAX_BYTES = (
+    int(os.getenv('PROCESSOR_CI_CACHE_MAX_MB', '2048')) * 1024 * 1024
+)
+LLM_CACHE_TTL = (
+    float(os.getenv('PROCESSOR_CI_LLM_CACHE_TTL_DAYS', '30')) * 24 * 3600
+)
+LLM_CACHE_MAX_ENTRIES = int(
+    os.getenv('PROCESSOR_CI_LLM_CACHE_MAX_ENTRIES', '10000')
+)
+# Processos usados para varrer arquivos HDL (0 = um por CPU)
+SCAN_WORKERS = int(os.getenv('PROCESSOR_CI_SCAN_WORKERS', '0'))
+# Abaixo disso por processo, varrer no próprio processo sai mais barato que
+# iniciar o pool
+SCAN_MIN_FILES_PER_WORKER = 200
+# Varre os arquivos HDL com mmap e regex de bytes, sem decodificá-los
+# ('0' decodifica o texto inteiro, como antes)
+SCAN_MMAP = os.getenv('PROCESSOR_CI_SCAN_MMAP', '1') != '0'
+# Arquivos maiores que isso sem module/entity/package não são varridos
+SCAN_SKIP_BYTES = int(
+    float(os.getenv('PROCESSOR_CI_SCAN_SKIP_MB', '4')) * 1024 * 1024
+)
+
+
+def _keep_alive(keep_alive: str | None = None) -> float | str:
+    """
+    `keep_alive` (by default `LLM_KEEP_ALIVE`) as accepted by Ollama
+    (seconds or a duration).
+    """
+    if keep_alive is None:
+        keep_alive = LLM_KEEP_ALIVE
+    try:
+        return float(keep_alive)
+    except ValueError:
+        return keep_alive
+
+
+def set_keep_alive(keep_alive: str) -> str:
+    """
+    Sets how long models stay loaded after each request.
+
+    Returns:
+        str: The previous setting.
+    """
+    global LLM_KEEP_ALIVE
+    previous, LLM_KEEP_ALIVE = LLM_KEEP_ALIVE, str(keep_alive)
+    return previous
+
+
+def set_scan_workers(workers: int) -> None:
+    """Sets how many processes scan HDL files (0 = one per CPU)."""
+    global SCAN_WORKERS
+    SCAN_WORKERS = int(workers)
+
+
+# (servidor, modelo) carregados por este processo, isto é, que não estavam
+# na memória antes de `preload_model`; só esses são descarregados depois
+_preloaded = set()
+_preloaded_lock = threading.Lock()
+
+
+def _model_tag(model: str) -> str:
+    return model if ':' in model else f'{model}:latest'
+
+
+def _is_resident(endpoint, model: str) -> bool | None:
+    """Whether `model` is loaded on the server (None if unknown)."""
+    try:
+        loaded = endpoint.client.ps().models
+    except Exception as e:
+        logger.debug(f'Could not list loaded models on {endpoint.url}: {e}')
+        return None
+    return any(
+        _model_tag(m.model or m.name or '') == _model_tag(model)
+        for m in loaded
+    )
+
+
+def _load_model(endpoint, model: str, keep_alive: float | str) -> bool:
+    try:
+        # Prompt vazio só carrega (ou descarrega, com keep_alive=0) o modelo
+        endpoint.client.generate(model=model, prompt='', keep_alive=keep_alive)
+    except Exception as e:
+        logger.debug(f'Could not (un)load {model} on {endpoint.url}: {e}')
+        return False
+    return True
+
+
+def _preload(endpoint, model: str, keep_alive: float | str) -> None:
+    resident = _is_resident(endpoint, model)
+    if _load_model(endpoint, model, keep_alive) and resident is False:
+        with _preloaded_lock:
+            _preloaded.add((endpoint.url, model))
+
+
+def preload_model(model: str) -> list[threading.Thread]:
+    """
+    Loads `model` on every server configured for it without waiting, so
+    that the load overlaps with other work instead of delaying the first
+    prompt. The model stays loaded for `LLM_KEEP_ALIVE`; failures are only
+    logged, since the first real request loads the model anyway. Servers
+    where the model was not loaded yet are remembered for `release_model`.
+
+    Returns:
+        list: The background threads, one per server.
+    """
+    threads = []
+    for endpoint in llm_pool.endpoints:
+        if not endpoint.serves(model):
+            continue
+        thread = threading.Thread(
+            target=_preload,
+            args=(endpoint, model, _keep_alive()),
+            name=f'preload-{model}',
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    logger.debug(f'Preloading {model} on {len(threads)} server(s)')
+    return threads
+
+
+def release_model(model: str, keep_alive: str | None = None) -> None:
+    """
+    Unloads `model` from the servers where `preload_model` loaded it.
+
+    Servers where it was already loaded (e.g. shared servers used by
+    others) or whose state was unknown keep it loaded. With `keep_alive`,
+    they get one request with it instead, which replaces a longer
+    keep-alive sent by this run (such as the '-1' of a batch) so the model
+    is not pinned there forever.
+    """
+    for endpoint in llm_pool.endpoints:
+        if not endpoint.serves(model):
+            continue
+        with _preloaded_lock:
+            loaded_here = (endpoint.url, model) in _preloaded
+            _preloaded.discard((endpoint.url, model))
+        if loaded_here:
+            _load_model(endpoint, model, 0)
+        elif keep_alive is not None:
+            _load_model(endpoint, model, _keep_alive(keep_alive))
+
+
+def _generate(
+    client: Client,
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None = None,
+) -> str | None:
+    if stop_when is None:
+        response = client.generate(
+            prompt=prompt,
+            model=model,
+            format=format,
+            options=options,
+            keep_alive=_keep_alive(),
+        )
+        if not response or 'response' not in response:
+            return None
+        return response['response']
+
+    parts = client.generate(
+        prompt=prompt,
+        model=model,
+        format=format,
+        options=options,
+        keep_alive=_keep_alive(),
+        stream=True,
+    )
+    scanner = BraceScanner()
+    text = ''
+    for part in parts:
+        chunk = part.get('response') or ''
+        text += chunk
+        if scanner.feed(chunk) and stop_when(text):
+            # Fechar o stream encerra a conexão e cancela a geração
+            parts.close()
+            logger.debug('Answer complete, generation stopped early.')
+            break
+    return text
+
+
+async def _generate_async(
+    client: AsyncClient,
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None = None,
+) -> str | None:
+    if stop_when is None:
+        response = await client.generate(
+            prompt=prompt,
+            model=model,
+            format=format,
+            options=options,
+            keep_alive=_keep_alive(),
+        )
+        if not response or 'response' not in response:
+            return None
+        return response['response']
+
+    parts = await client.generate(
+        prompt=prompt,
+        model=model,
+        format=format,
+        options=options,
+        keep_alive=_keep_alive(),
+        stream=True,
+    )
+    scanner = BraceScanner()
+    text = ''
+    async for part in parts:
+        chunk = part.get('response') or ''
+        text += chunk
+        if scanner.feed(chunk) and stop_when(text):
+            await parts.aclose()
+            logger.debug('Answer complete, generation stopped early.')
+            break
+    return text
+
+
+def _backoff(rounds: int) -> float:
+    """Delay (s) before retrying after every endpoint failed `rounds` times."""
+    delay = min(RETRY_BACKOFF * 2**rounds, MAX_RETRY_BACKOFF)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def stage_deadline(stage: str) -> float:
+    """
+    Deadline (s) of an LLM request of a pipeline stage, taken from
+    `LLM_DEADLINE_<STAGE>` or, if unset, `LLM_DEADLINE`.
+    """
+    return float(os.getenv(f'LLM_DEADLINE_{stage.upper()}', LLM_DEADLINE))
+
 
+def _send(
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None,
+) -> str | None:
+    tried = set()
+    rounds = 0
+    while True:
+        endpoint = llm_pool.acquire(model, exclude=tried)
+        try:
+            response = _generate(
+                endpoint.client, prompt, model, stop_when, format, options
+            )
+        except Exception as e:
+            failure = is_endpoint_failure(e)
+            llm_pool.release(endpoint, ok=not failure)
+            if not failure:
+                raise
+            tried.add(endpoint)
+            if len(tried) >= llm_pool.candidates(model):
+                if rounds >= MAX_RETRY_ROUNDS:
+                    raise
+                delay = _backoff(rounds)
+                logger.warning(
+                    f'Every server failed for {model}, retrying in '
+                    f'{delay:.1f}s'
+                )
+                time.sleep(delay)
+                rounds += 1
+                tried.clear()
+            else:
+                logger.warning(f'{endpoint.url} failed ({e}), trying another')
+            continue
+        llm_pool.release(endpoint, ok=True)
+        return response
 
-def send_prompt(prompt: str, model: str = 'qwen2.5:14b') -> tuple[bool, str]:
+
+def send_prompt(
+    prompt: str,
+    model: str = 'qwen2.5:14b',
+    stop_when: Callable[[str], bool] | None = None,
+    format: dict | None = None,
+    options: dict | None = None,
+    stage: str | None = None,
+    accept: Callable[[str], bool] | None = None,
+) -> tuple[bool, str]:
     """
     Sends a prompt to the specified server and receives the model's response.
 
+    The request is dispatched by `llm_pool`. If the chosen server fails, the
+    request is retried on the other servers configured for the model; when
+    all of them failed, it is retried with exponential backoff.
+
     Args:
         prompt (str): The prompt to be sent to the model.
         model (str, optional): The model to use. Default is 'qwen2.5:32b'.
+        stop_when (callable, optional): Enables streaming. Called with the
+            text received so far whenever a top-level `{...}` block closes;
+            returning True cancels the rest of the generation.
+        format (dict, optional): JSON schema the answer must follow
+            (Ollama structured outputs).
+        options (dict, optional): Generation options, such as `temperature`
+            and `seed`.
+        stage (str, optional): Pipeline stage of the request (e.g.
+            'interface'). Enables the stage deadline, latency tracking and
+            hedging, as in `send_prompt_async`.
+        accept (callable, optional): With `stage`, tells whether an answer
+            is usable; a hedged duplicate keeps running until one is.
 
     Returns:
         tuple: A tuple containing a boolean value (indicating success)
                and the model's response as a string.
     """
-    response = client.generate(prompt=prompt, model=model)
+    if stage is not None:
+        return run_async(
+            _send_hedged_async(
+                prompt, model, stop_when, format, options, stage, accept
+            )
+        )
+
+    response = _send(prompt, model, stop_when, format, options)
 
     # print("Full response:", response)  # Debug: show the full response
 
-    if not response or 'response' not in response:
+    if response is None:
+        return 0, ''
+
+    return 1, response
+
+
+# AsyncClient e Semaphore ficam presos ao event loop em que foram criados
+_async_state = weakref.WeakKeyDictionary()
+# Event loop de longa duração, numa thread própria, usado pelas chamadas
+# síncronas: clientes e semáforos são os mesmos entre chamadas e threads
+_shared_loop = None
+_shared_loop_pid = None
+_shared_loop_lock = threading.Lock()
+
+
+def _get_shared_loop() -> asyncio.AbstractEventLoop:
+    global _shared_loop, _shared_loop_pid
+    with _shared_loop_lock:
+        # A thread do loop não sobrevive a um fork (processos do lote)
+        if _shared_loop is None or _shared_loop_pid != os.getpid():
+            _shared_loop = asyncio.new_event_loop()
+            _shared_loop_pid = os.getpid()
+            threading.Thread(
+                target=_shared_loop.run_forever,
+                name='llm-event-loop',
+                daemon=True,
+            ).start()
+        return _shared_loop
+
+
+def run_async(coro):
+    """
+    Runs `coro` on the shared LLM event loop and waits for its result.
+
+    Every synchronous caller shares the loop, and with it the AsyncClient
+    and the `LLM_MAX_IN_FLIGHT` semaphore of each server. It may be called
+    from any thread, including one that is already running an event loop,
+    except from a coroutine running on the shared loop itself.
+    """
+    loop = _get_shared_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError('run_async called from the shared LLM loop')
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def _close_async_clients() -> None:
+    clients = _async_state.pop(asyncio.get_running_loop(), {})
+    for client, _ in clients.values():
+        # O ollama não expõe o close; o httpx.AsyncClient fica em _client
+        await client._client.aclose()
+
+
+@atexit.register
+def close_shared_loop() -> None:
+    """Closes the connections of the shared LLM loop and stops it."""
+    global _shared_loop
+    with _shared_loop_lock:
+        loop = _shared_loop
+        if loop is None or _shared_loop_pid != os.getpid():
+            return
+        _shared_loop = None
+    try:
+        asyncio.run_coroutine_threadsafe(_close_async_clients(), loop).result(
+            timeout=5
+        )
+    except Exception as e:
+        logger.debug(f'Could not close the LLM clients: {e!r}')
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def _get_async_client(host: str) -> tuple[AsyncClient, asyncio.Semaphore]:
+    """Returns the AsyncClient and request semaphore of `host` in this loop."""
+    loop = asyncio.get_running_loop()
+    clients = _async_state.setdefault(loop, {})
+    if host not in clients:
+        clients[host] = (
+            AsyncClient(host=host),
+            asyncio.Semaphore(LLM_MAX_IN_FLIGHT),
+        )
+    return clients[host]
+
+
+async def _send_async(
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None,
+    busy: set | None = None,
+) -> tuple[bool, str]:
+    """
+    `busy` holds endpoints to avoid, if possible; the endpoint serving this
+    request is added to it, so a hedged duplicate goes somewhere else.
+    """
+    tried = set(busy or ())
+    rounds = 0
+    while True:
+        endpoint = llm_pool.acquire(model, exclude=tried)
+        if busy is not None:
+            busy.add(endpoint)
+        async_client, semaphore = _get_async_client(endpoint.url)
+        try:
+            async with semaphore:
+                response = await _generate_async(
+                    async_client, prompt, model, stop_when, format, options
+                )
+        except asyncio.CancelledError:
+            llm_pool.release(endpoint, ok=None)
+            raise
+        except Exception as e:
+            failure = is_endpoint_failure(e)
+            llm_pool.release(endpoint, ok=not failure)
+            if not failure:
+                raise
+            tried.add(endpoint)
+            if len(tried) >= llm_pool.candidates(model):
+                if rounds >= MAX_RETRY_ROUNDS:
+                    raise
+                delay = _backoff(rounds)
+                logger.warning(
+                    f'Every server failed for {model}, retrying in '
+                    f'{delay:.1f}s'
+                )
+                await asyncio.sleep(delay)
+                rounds += 1
+                tried.clear()
+            else:
+                logger.warning(f'{endpoint.url} failed ({e}), trying another')
+            continue
+        llm_pool.release(endpoint, ok=True)
+        break
+
+    if response is None:
+        return 0, ''
+
+    return 1, response
+
+
+async def _race(
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None,
+    stage: str,
+    accept: Callable[[str], bool] | None,
+) -> tuple[bool, str]:
+    # Import local: core.latency depende das constantes deste módulo
+    from core.latency import get_latency_tracker
+
+    tracker = get_latency_tracker()
+    delay = (
+        tracker.percentile(model, stage, HEDGE_PERCENTILE)
+        if LLM_HEDGE
+        else None
+    )
+    busy = set()
+    started = {}
+    result = (0, '')
+
+    def launch() -> asyncio.Task:
+        task = asyncio.ensure_future(
+            _send_async(prompt, model, stop_when, format, options, busy)
+        )
+        started[task] = time.monotonic()
+        return task
+
+    pending = {launch()}
+    first = time.monotonic()
+    hedged = False
+    try:
+        while pending:
+            timeout = None
+            if delay is not None and not hedged:
+                timeout = max(0.0, delay - (time.monotonic() - first))
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                hedged = True
+                logger.info(
+                    f'{stage} request to {model} passed p{HEDGE_PERCENTILE} '
+                    f'latency ({delay:.1f}s), sending a hedged duplicate'
+                )
+                pending.add(launch())
+                continue
+
+            # As duas requisições podem terminar juntas: uma resposta boa
+            # vale mais que a falha da outra
+            failed = [task for task in done if task.exception() is not None]
+            for task in done:
+                if task in failed:
+                    continue
+                result = task.result()
+                if result[0] and (accept is None or accept(result[1])):
+                    tracker.record(
+                        model, stage, time.monotonic() - started[task]
+                    )
+                    return result
+            if failed and len(failed) == len(done) and not pending:
+                raise failed[0].exception()
+            for task in failed:
+                logger.warning(
+                    f'{stage} request failed ({task.exception()!r})'
+                    + (', waiting for the hedged duplicate' if pending else '')
+                )
+    finally:
+        # Cancela a requisição perdedora
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return result
+
+
+async def _send_hedged_async(
+    prompt: str,
+    model: str,
+    stop_when: Callable | None,
+    format: dict | None,
+    options: dict | None,
+    stage: str,
+    accept: Callable[[str], bool] | None,
+) -> tuple[bool, str]:
+    deadline = stage_deadline(stage)
+    try:
+        return await asyncio.wait_for(
+            _race(prompt, model, stop_when, format, options, stage, accept),
+            deadline,
+        )
+    except asyncio.TimeoutError:
+        logger.error(
+            f'{stage} request to {model} missed its {deadline:.0f}s deadline'
+        )
         return 0, ''
 
-    return 1, response['response']
+
+async def send_prompt_async(
+    prompt: str,
+    model: str = 'qwen2.5:14b',
+    stop_when: Callable[[str], bool] | None = None,
+    format: dict | None = None,
+    options: dict | None = None,
+    stage: str | None = None,
+    accept: Callable[[str], bool] | None = None,
+) -> tuple[bool, str]:
+    """
+    Asynchronous counterpart of `send_prompt`.
+
+    At most `LLM_MAX_IN_FLIGHT` requests are in flight per server; further
+    calls wait for a free slot, so many prompts can be submitted at once
+    without flooding the inference servers.
+
+    With `stage`, the request must finish within the stage deadline (see
+    `stage_deadline`), otherwise it is cancelled and reported as a failure.
+    Once it runs longer than the p90 latency observed for the model and
+    stage, a duplicate is sent (to another server, if there is one); the
+    first answer accepted by `accept` wins and the other is cancelled.
+
+    Args:
+        prompt (str): The prompt to be sent to the model.
+        model (str, optional): The model to use. Default is 'qwen2.5:14b'.
+        stop_when (callable, optional): Enables streaming with early stop,
+            as in `send_prompt`.
+        format (dict, optional): JSON schema the answer must follow.
+        options (dict, optional): Generation options, as in `send_prompt`.
+        stage (str, optional): Pipeline stage of the request.
+        accept (callable, optional): Tells whether an answer is usable.
+
+    Returns:
+        tuple: A tuple containing a boolean value (indicating success)
+               and the model's response as a string.
+    """
+    if stage is not None:
+        return await _send_hedged_async(
+            prompt, model, stop_when, format, options, stage, accept
+        )
+    return await _send_async(prompt, model, stop_when, format, options)
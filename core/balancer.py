@@ -0,0 +1,184 @@
+import time
+import logging
+import threading
+import httpx
+from ollama import Client, ResponseError
+
+logger = logging.getLogger(__name__)
+
+# Falhas consecutivas até um servidor ser ejetado
+MAX_FAILURES = 3
+# Tempo (s) da primeira ejeção; dobra a cada nova ejeção
+EJECTION_TIME = 30.0
+MAX_EJECTION_TIME = 600.0
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    Tells whether an exception raised by the Ollama client means that the
+    server itself is unhealthy (as opposed to a bad request).
+    """
+    if isinstance(error, ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class Endpoint:
+    """An Ollama server taking part in load balancing."""
+
+    def __init__(
+        self, url: str, weight: float = 1.0, models: set[str] | None = None
+    ):
+        self.url = url
+        self.weight = weight
+        self.models = models  # None: aceita qualquer modelo
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.last_model = None
+        self._client = None
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            self._client = Client(host=self.url)
+        return self._client
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def __repr__(self) -> str:
+        return f'Endpoint({self.url!r}, weight={self.weight})'
+
+
+def parse_endpoints(spec: str) -> list[Endpoint]:
+    """
+    Parses the `SERVER_URL` endpoint list.
+
+    Endpoints are separated by commas. Each one may carry options after
+    `;`: `weight=<number>` and `models=<model>|<model>|...`, e.g.
+
+        http://gpu1:11434;weight=2;models=qwen3:14b|gpt-oss:20b,http://gpu2:11434
+
+    Returns:
+        list[Endpoint]: The endpoints, in the given order.
+    """
+    endpoints = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, *options = [part.strip() for part in entry.split(';')]
+        weight = 1.0
+        models = None
+        for option in options:
+            name, _, value = option.partition('=')
+            if name == 'weight':
+                weight = float(value)
+            elif name == 'models':
+                models = {m.strip() for m in value.split('|') if m.strip()}
+            else:
+                raise ValueError(f'Unknown endpoint option: {option}')
+        endpoints.append(Endpoint(url, weight, models))
+
+    if not endpoints:
+        raise ValueError('SERVER_URL does not define any endpoint')
+    return endpoints
+
+
+class EndpointPool:
+    """
+    Least-outstanding-requests balancer over several Ollama servers.
+
+    Each request goes to the healthy endpoint, among those configured for
+    the model, with the fewest outstanding requests relative to its weight.
+    Ties prefer the endpoint that last served the same model, since it
+    probably still has it loaded. Health checks are passive: after
+    `MAX_FAILURES` consecutive failures an endpoint is ejected for a period
+    that doubles on every new ejection.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        max_failures: int = MAX_FAILURES,
+        ejection_time: float = EJECTION_TIME,
+    ):
+        self.endpoints = endpoints
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, model: str, exclude: set[Endpoint] | None = None
+    ) -> Endpoint:
+        """
+        Selects an endpoint for `model` and counts the request as outstanding.
+
+        If every candidate is ejected, the one whose ejection ends first is
+        used anyway, so requests are never refused outright.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                e
+                for e in self.endpoints
+                if e.serves(model) and e not in (exclude or ())
+            ]
+            if not candidates:
+                candidates = [e for e in self.endpoints if e.serves(model)]
+            if not candidates:
+                raise ValueError(f'No endpoint configured for model {model}')
+
+            healthy = [e for e in candidates if e.healthy(now)]
+            if healthy:
+                endpoint = min(
+                    healthy,
+                    key=lambda e: (
+                        e.outstanding / e.weight,
+                        e.last_model != model,
+                        self.endpoints.index(e),
+                    ),
+                )
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+
+            endpoint.outstanding += 1
+            endpoint.last_model = model
+            return endpoint
+
+    def release(self, endpoint: Endpoint, ok: bool | None) -> None:
+        """
+        Finishes a request and updates the endpoint health.
+
+        `ok=None` (e.g. a cancelled request) leaves the health untouched.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                return
+
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                duration = min(
+                    self.ejection_time * 2**endpoint.ejections,
+                    MAX_EJECTION_TIME,
+                )
+                endpoint.ejections += 1
+                endpoint.failures = 0
+                endpoint.ejected_until = time.monotonic() + duration
+                logger.warning(
+                    f'Ejecting LLM endpoint {endpoint.url} for {duration:.0f}s'
+                )
+
+    def candidates(self, model: str) -> int:
+        """Returns how many endpoints are configured for `model`."""
+        return sum(1 for e in self.endpoints if e.serves(model))
@@ -0,0 +1,151 @@
+import logging
+from collections import defaultdict
+from core.bus_defines import PROTOCOLS
+from core.make_wrapper import parse_module_header
+
+logger = logging.getLogger(__name__)
+
+# Confiança mínima para dispensar a consulta ao LLM
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+# Cobertura mínima de um grupo de portas para contar como interface
+MIN_GROUP_COVERAGE = 0.6
+
+DIRECTION_TOKENS = {'i', 'o', 'in', 'out'}
+INSTRUCTION_HINTS = ('instr', 'inst', 'imem', 'ibus', 'fetch', 'pc', 'iwb')
+DATA_HINTS = ('data', 'dmem', 'dbus', 'lsu', 'dwb', 'load', 'store')
+
+
+def match_signal(tokens: list[str], names: list[list[str]]):
+    """
+    Checks whether a port name (split on '_') ends with one of `names`.
+
+    Direction markers at either end (`i_`, `_o`, `_in`, ...) are ignored
+    unless they are part of the signal name itself (e.g. Wishbone `dat_i`).
+
+    Returns:
+        list | None: The tokens before the signal name (the interface
+                     prefix), or None if the port does not match.
+    """
+    candidates = [tokens]
+    if len(tokens) > 1 and tokens[-1] in DIRECTION_TOKENS:
+        candidates.append(tokens[:-1])
+    for cand in list(candidates):
+        if len(cand) > 1 and cand[0] in DIRECTION_TOKENS:
+            candidates.append(cand[1:])
+
+    for cand in candidates:
+        for name in names:
+            if len(cand) >= len(name) and cand[-len(name) :] == name:
+                return cand[: -len(name)]
+    return None
+
+
+def width_score(width: int, expected: tuple[int, int]) -> float:
+    low, high = expected
+    if low <= width <= high:
+        return 1.0
+    if width == 1:
+        # Faixas parametrizadas ([ADDR_WIDTH-1:0]) são lidas como 1 bit
+        return 0.75
+    return 0.25
+
+
+def _score_protocol(protocol: dict, ports: list) -> dict[str, float]:
+    """
+    Scores how well each group of ports (keyed by its name prefix) covers
+    the signals of a protocol.
+
+    Returns:
+        dict: prefix -> coverage in [0, 1].
+    """
+    aliases = protocol.get('aliases', {})
+    inputs = protocol.get('inputs', set())
+    best = defaultdict(dict)  # prefixo -> sinal -> pontuação
+
+    for direction, port, width in ports:
+        tokens = [t for t in port.lower().split('_') if t]
+        for signal, expected in protocol['signals'].items():
+            names = [signal, *aliases.get(signal, [])]
+            prefix = match_signal(tokens, [n.split('_') for n in names])
+            if prefix is None:
+                continue
+            wanted = 'input' if signal in inputs else 'output'
+            if direction != wanted:
+                continue
+            score = width_score(width, expected)
+            group = best['_'.join(prefix)]
+            group[signal] = max(group.get(signal, 0.0), score)
+
+    total = len(protocol['signals'])
+    return {
+        prefix: sum(signals.values()) / total
+        for prefix, signals in best.items()
+    }
+
+
+def is_instruction_prefix(prefix: str) -> bool:
+    tokens = prefix.split('_')
+    return any(h in prefix for h in INSTRUCTION_HINTS) or 'i' in tokens
+
+
+def is_data_prefix(prefix: str) -> bool:
+    tokens = prefix.split('_')
+    return any(h in prefix for h in DATA_HINTS) or 'd' in tokens
+
+
+def classify_bus(header: str) -> tuple[dict, float]:
+    """
+    Classifies the memory bus of a processor without querying the LLM.
+
+    The ports of the top module are scored against every protocol in
+    `PROTOCOLS` by name (including aliases), direction and width range.
+    Ports are grouped by their name prefix, so two complete interfaces with
+    instruction/data prefixes (e.g. `iwb_*` and `dwb_*`) indicate a dual
+    memory interface.
+
+    Returns:
+        tuple: ({'bus_type': ..., 'memory_interface': ...}, confidence),
+               where confidence is in [0, 1]. The confidence is penalized
+               when another protocol scores close to the best one.
+    """
+    try:
+        _, _, ports = parse_module_header(header)
+    except ValueError:
+        logger.debug('Bus classifier could not parse the module header.')
+        return {}, 0.0
+
+    results = []
+    for name, protocol in PROTOCOLS.items():
+        groups = _score_protocol(protocol, ports)
+        if groups:
+            results.append((max(groups.values()), name, groups))
+
+    if not results:
+        return {}, 0.0
+
+    results.sort(key=lambda r: r[0], reverse=True)
+    best_score, best_name, groups = results[0]
+    second_score = results[1][0] if len(results) > 1 else 0.0
+
+    logger.debug(
+        'Bus classifier scores: '
+        + ', '.join(f'{name}={score:.2f}' for score, name, _ in results)
+    )
+
+    interfaces = [
+        prefix
+        for prefix, coverage in groups.items()
+        if coverage >= MIN_GROUP_COVERAGE
+    ]
+    dual = len(interfaces) >= 2 and (
+        any(is_instruction_prefix(p) for p in interfaces)
+        or any(is_data_prefix(p) for p in interfaces)
+    )
+
+    interface_info = {
+        'bus_type': PROTOCOLS[best_name]['bus_type'],
+        'memory_interface': 'Dual' if dual else 'Single',
+    }
+    confidence = max(0.0, best_score - 0.5 * second_score)
+
+    return interface_info, confidence
@@ -8,7 +8,15 @@ PROTOCOLS = {
             'adr': (8, 64),  # flexível
             'dat_i': (8, 512),
             'dat_o': (8, 512),
-        }
+        },
+        'bus_type': 'Wishbone',
+        # sinais de entrada do processador (dirigidos pelo escravo)
+        'inputs': {'ack', 'dat_i'},
+        'aliases': {
+            'adr': ['addr', 'address'],
+            'dat_i': ['dat_r', 'data_i', 'rdata', 'data_in', 'rdat'],
+            'dat_o': ['dat_w', 'data_o', 'wdata', 'data_out', 'wdat'],
+        },
     },
     'axi4-lite': {
         'signals': {
@@ -24,7 +32,10 @@ PROTOCOLS = {
             'rdata': (32, 512),
             'rvalid': (1, 1),
             'rready': (1, 1),
-        }
+        },
+        'bus_type': 'AXI',
+        'inputs': {'awready', 'wready', 'arready', 'rdata', 'rvalid'},
+        'aliases': {},
     },
     'ahb-lite': {
         'signals': {
@@ -35,7 +46,10 @@ PROTOCOLS = {
             'hready': (1, 1),
             'hrdata': (32, 512),
             'hwdata': (32, 512),
-        }
+        },
+        'bus_type': 'AHB',
+        'inputs': {'hready', 'hrdata'},
+        'aliases': {},
     },
     'apb': {
         'signals': {
@@ -46,7 +60,10 @@ PROTOCOLS = {
             'prdata': (32, 512),
             'pwdata': (32, 512),
             'pready': (1, 1),
-        }
+        },
+        'bus_type': 'Custom',
+        'inputs': {'prdata', 'pready'},
+        'aliases': {},
     },
     'avalon': {
         'signals': {
@@ -57,7 +74,10 @@ PROTOCOLS = {
             'readdata': (32, 512),
             'waitrequest': (1, 1),
             'chipselect': (1, 1),
-        }
+        },
+        'bus_type': 'Avalon',
+        'inputs': {'readdata', 'waitrequest'},
+        'aliases': {},
     },
     'axi-stream': {
         'signals': {
@@ -66,7 +86,10 @@ PROTOCOLS = {
             'tready': (1, 1),
             'tlast': (1, 1),
             'tkeep': (1, 128),
-        }
+        },
+        'bus_type': 'Custom',
+        'inputs': {'tready'},
+        'aliases': {},
     },
     'tilelink-ul': {
         'signals': {
@@ -79,7 +102,10 @@ PROTOCOLS = {
             'd_ready': (1, 1),
             'd_opcode': (3, 3),
             'd_data': (32, 512),
-        }
+        },
+        'bus_type': 'Custom',
+        'inputs': {'a_ready', 'd_valid', 'd_opcode', 'd_data'},
+        'aliases': {},
     },
 }
 
@@ -0,0 +1,347 @@
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import functools
+import contextlib
+from core import (
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts) -> str:
+    """
+    Builds a cache key from an ordered sequence of strings or bytes.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest of all parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Returns:
+        str: The hexadecimal digest, or an empty string if the file cannot
+             be read.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError:
+        return ''
+    return digest.hexdigest()
+
+
+def _tree_size(path: str) -> int:
+    """Total size of the files under `path`."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+class ArtifactCache:
+    """
+    Content-addressed on-disk cache of build artifacts.
+
+    Each entry is a directory `<root>/<name>/<key>` holding one or more
+    artifact files. Entries are published with an atomic rename, so several
+    processes can share the same cache. Reading an entry refreshes its
+    modification time, and the least recently used entries are evicted once
+    the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int = CACHE_MAX_BYTES,
+        root: str = CACHE_DIR,
+    ):
+        self.path = os.path.join(root, name)
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        """
+        Looks up an entry.
+
+        Returns:
+            str | None: The entry directory, or None on a miss.
+        """
+        entry = os.path.join(self.path, key)
+        if not os.path.isdir(entry):
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            return None  # removida por outro processo
+        return entry
+
+    def put(
+        self,
+        key: str,
+        contents: dict[str, str] | None = None,
+        files: dict[str, str] | None = None,
+    ) -> str:
+        """
+        Stores an entry.
+
+        Args:
+            key (str): The entry key, usually built with `make_key`.
+            contents (dict, optional): Artifact name -> text to store.
+            files (dict, optional): Artifact name -> path of a file to copy.
+
+        Returns:
+            str: The entry directory.
+        """
+        entry = os.path.join(self.path, key)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.path)
+        try:
+            for name, text in (contents or {}).items():
+                with open(
+                    os.path.join(tmp_dir, name), 'w', encoding='utf-8'
+                ) as f:
+                    f.write(text)
+            for name, src in (files or {}).items():
+                shutil.copyfile(src, os.path.join(tmp_dir, name))
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # Outro processo publicou a mesma entrada primeiro
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.evict()
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        """Removes an entry, if present."""
+        shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the size cap is met."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            if name.startswith('.'):
+                continue
+            entry = os.path.join(self.path, name)
+            try:
+                size = _tree_size(entry)
+                entries.append((os.path.getmtime(entry), size, entry))
+            except OSError:
+                continue
+            total += size
+
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, entry = entries.pop(0)
+            logger.debug(f'Evicting cache entry {entry}')
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt for cache lookups.
+
+    Comments (`// ...` and `/* ... */`) are removed and every run of
+    whitespace is collapsed, so reformatting or re-commenting the module
+    header does not change the key.
+    """
+    prompt = re.sub(r'/\*.*?\*/', ' ', prompt, flags=re.DOTALL)
+    prompt = re.sub(r'//[^\n]*', ' ', prompt)
+    return ' '.join(prompt.split())
+
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses keyed by model, normalized prompt and
+    generation options (e.g. the seed of a sample).
+
+    Backed by SQLite in WAL mode, so it can be shared by concurrent
+    processes. Entries older than `ttl` seconds are ignored and purged, and
+    only the `max_entries` most recently used entries are kept. Hits and
+    misses are counted both for the current process (`hits`, `misses`) and
+    for the lifetime of the database (`stats()`).
+    """
+
+    def __init__(
+        self,
+        path: str = os.path.join(CACHE_DIR, 'llm_responses.sqlite'),
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, model TEXT, response TEXT, '
+                'created REAL, accessed REAL)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'name TEXT PRIMARY KEY, value INTEGER)'
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Opens a connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, db: sqlite3.Connection, name: str) -> None:
+        db.execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,),
+        )
+
+    @staticmethod
+    def key(
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        format: dict | None = None,
+    ) -> str:
+        parts = [model, normalize_prompt(prompt)]
+        if options:
+            parts.append(json.dumps(options, sort_keys=True))
+        if format:
+            # Respostas livres e estruturadas (JSON schema) não se misturam
+            parts.append('format=' + json.dumps(format, sort_keys=True))
+        return make_key(*parts)
+
+    def get(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        format: dict | None = None,
+    ) -> str | None:
+        """
+        Looks up a response.
+
+        Returns:
+            str | None: The stored response, or None on a miss.
+        """
+        key = self.key(model, prompt, options, format)
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                'SELECT response FROM responses WHERE key = ? AND created > ?',
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                self._count(db, 'misses')
+                return None
+            db.execute(
+                'UPDATE responses SET accessed = ? WHERE key = ?', (now, key)
+            )
+            self.hits += 1
+            self._count(db, 'hits')
+        logger.debug(f'LLM response cache hit for {model} ({key[:12]})')
+        return row[0]
+
+    def peek(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        format: dict | None = None,
+    ) -> str | None:
+        """Like `get`, but not counted as a hit or miss nor as a use."""
+        with self._connect() as db:
+            row = db.execute(
+                'SELECT response FROM responses WHERE key = ? AND created > ?',
+                (
+                    self.key(model, prompt, options, format),
+                    time.time() - self.ttl,
+                ),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        response: str,
+        options: dict | None = None,
+        format: dict | None = None,
+    ) -> None:
+        """Stores a response and evicts expired or excess entries."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, model, response, created, accessed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    self.key(model, prompt, options, format),
+                    model,
+                    response,
+                    now,
+                    now,
+                ),
+            )
+            db.execute(
+                'DELETE FROM responses WHERE created <= ?', (now - self.ttl,)
+            )
+            db.execute(
+                'DELETE FROM responses WHERE key NOT IN ('
+                'SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)',
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Returns the persistent hit/miss counters and the entry count."""
+        with self._connect() as db:
+            counters = dict(db.execute('SELECT name, value FROM counters'))
+            entries = db.execute('SELECT COUNT(*) FROM responses').fetchone()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'entries': entries[0],
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide LLM response cache."""
+    return ResponseCache()
@@ -0,0 +1,305 @@
+import re
+import logging
+from collections import defaultdict
+from core.bus_classifier import (
+    match_signal,
+    width_score,
+    is_instruction_prefix,
+    is_data_prefix,
+)
+from core.bus_defines import (
+    PROTOCOLS,
+    PROCESSOR_CI_WISHBONE_SIGNALS,
+    ahb_adapter,
+    ahb_data_adapter,
+    axi4_adapter,
+    axi4_data_adapter,
+)
+from core.make_wrapper import parse_module_header
+
+logger = logging.getLogger(__name__)
+
+# Confiança mínima para aceitar uma conexão sem consultar o LLM
+DEFAULT_MAPPER_THRESHOLD = 0.8
+# Peso de um nome alternativo menos específico (ex.: `valid` para `stb`)
+WEAK_ALIAS_SCORE = 0.85
+# Confiança atribuída a regras fixas (ex.: `core_sel` ausente -> 4'b1111)
+RULE_SCORE = 0.9
+
+# Papel Wishbone de cada sinal do wrapper (sem o prefixo core_/data_mem_)
+WISHBONE_ROLES = {
+    'cyc': 'cyc',
+    'stb': 'stb',
+    'we': 'we',
+    'sel': 'sel',
+    'addr': 'adr',
+    'data_out': 'dat_o',
+    'data_in': 'dat_i',
+    'ack': 'ack',
+}
+
+# Nomes alternativos além dos de `PROTOCOLS`, com confiança menor
+WEAK_ALIASES = {
+    'stb': ['req', 'valid', 'request'],
+    'we': ['wen', 'write', 'wr', 'wr_en', 'write_en'],
+    'sel': ['be', 'byteen', 'byte_en', 'wstrb', 'strb', 'mask'],
+    'ack': ['ready', 'rdy', 'resp_valid'],
+    'hmastlock': ['hlock'],
+}
+
+# Sinais do adaptador dirigidos pelo escravo (entradas do processador)
+ADAPTER_INPUTS = (
+    PROTOCOLS['ahb-lite']['inputs']
+    | PROTOCOLS['axi4-lite']['inputs']
+    | {'hresp', 'bid', 'bresp', 'bvalid', 'rid', 'rresp'}
+)
+
+SEL_DEFAULT = "4'b1111"
+
+
+def adapter_signals(adapter: str) -> dict[str, int | None]:
+    """
+    Wrapper-side signals declared or connected by a bus adapter.
+
+    Returns:
+        dict: signal name -> declared width (None when only connected).
+    """
+    signals = {}
+    for range_str, name in re.findall(
+        r'^\s*logic\s*(\[[^\]]*\])?\s*([A-Za-z_]\w*)\s*;', adapter, re.M
+    ):
+        m = re.match(r'\[(\d+)\s*:\s*(\d+)\]', range_str)
+        signals[name] = abs(int(m.group(1)) - int(m.group(2))) + 1 if m else 1
+    for name in re.findall(
+        r'^\s*\.\w+\s*\(\s*([A-Za-z_]\w*)\s*\)', adapter, re.M
+    ):
+        signals.setdefault(name, None)
+    return {
+        name: width
+        for name, width in signals.items()
+        if name not in PROCESSOR_CI_WISHBONE_SIGNALS and name != 'clk_core'
+    }
+
+
+def _wrapper_signals(interface_info) -> list[dict]:
+    """
+    Describes the wrapper signals to connect for a bus type.
+
+    Each entry holds the wrapper `key`, the interface it belongs to
+    (`instr` or `data`), the processor-side `direction`, the accepted
+    `names` (with their score), the `expected` width range and whether the
+    signal is `optional` in the protocol.
+    """
+    dual = interface_info.get('memory_interface') == 'Dual'
+    bus_type = interface_info.get('bus_type')
+    signals = []
+
+    if bus_type in ('AHB', 'AXI'):
+        if bus_type == 'AHB':
+            protocol = PROTOCOLS['ahb-lite']['signals']
+            adapters = [('instr', ahb_adapter)]
+            if dual:
+                adapters.append(('data', ahb_data_adapter))
+        else:
+            protocol = PROTOCOLS['axi4-lite']['signals']
+            adapters = [('instr', axi4_adapter)]
+            if dual:
+                adapters.append(('data', axi4_data_adapter))
+
+        for group, adapter in adapters:
+            for key, width in adapter_signals(adapter).items():
+                role = re.sub(r'^(data_)?(axi_)?', '', key.lower())
+                if role in protocol:
+                    expected = protocol[role]
+                elif width is not None:
+                    expected = (width, width)
+                else:
+                    expected = None
+                names = [(role, 1.0)]
+                names += [
+                    (n, WEAK_ALIAS_SCORE) for n in WEAK_ALIASES.get(role, [])
+                ]
+                signals.append(
+                    {
+                        'key': key,
+                        'group': group,
+                        'direction': (
+                            'input' if role in ADAPTER_INPUTS else 'output'
+                        ),
+                        'names': names,
+                        'expected': expected,
+                        'optional': role not in protocol,
+                    }
+                )
+        return signals
+
+    wishbone = PROTOCOLS['wishbone']
+    for key in PROCESSOR_CI_WISHBONE_SIGNALS:
+        group = 'data' if key.startswith('data_mem_') else 'instr'
+        if group == 'data' and not dual:
+            continue
+        role = WISHBONE_ROLES[re.sub(r'^(core|data_mem)_', '', key)]
+        names = [(role, 1.0)]
+        names += [(n, 1.0) for n in wishbone['aliases'].get(role, [])]
+        names += [(n, WEAK_ALIAS_SCORE) for n in WEAK_ALIASES.get(role, [])]
+        signals.append(
+            {
+                'key': key,
+                'group': group,
+                'direction': (
+                    'input' if role in wishbone['inputs'] else 'output'
+                ),
+                'names': names,
+                'expected': wishbone['signals'].get(role, (1, 8)),
+                'optional': False,
+            }
+        )
+    return signals
+
+
+def connection_keys(interface_info) -> list[str]:
+    """
+    Wrapper signals of the connection answer: Wishbone signals, or adapter
+    signals for AHB/AXI. Data memory signals of a Wishbone wrapper are only
+    listed for dual memory interfaces.
+    """
+    return [signal['key'] for signal in _wrapper_signals(interface_info)]
+
+
+def describe_signals(interface_info, keys) -> str:
+    """One line per wrapper signal in `keys`, with direction and width."""
+    lines = []
+    for signal in _wrapper_signals(interface_info):
+        if signal['key'] not in keys:
+            continue
+        expected = signal['expected']
+        if expected is None:
+            width = ''
+        elif expected[0] == expected[1]:
+            width = f', {expected[0]} bit(s)'
+        else:
+            width = f', {expected[0]} to {expected[1]} bits'
+        lines.append(
+            f'- {signal["key"]} (processor {signal["direction"]}{width})'
+        )
+    return '\n'.join(lines)
+
+
+def _candidates(signal: dict, ports: list) -> list[tuple[float, str, str]]:
+    """Processor ports matching a wrapper signal: (score, prefix, port)."""
+    found = []
+    for direction, port, width in ports:
+        if direction != signal['direction']:
+            continue
+        tokens = [t for t in port.lower().split('_') if t]
+        for name, name_score in signal['names']:
+            prefix = match_signal(tokens, [name.split('_')])
+            if prefix is None:
+                continue
+            score = name_score
+            if signal['expected'] is not None:
+                score *= width_score(width, signal['expected'])
+            found.append((score, '_'.join(prefix), port))
+            break
+    return found
+
+
+def _pick_groups(candidates: dict, signals: list, dual: bool) -> dict:
+    """
+    Chooses the port prefix used by each interface (`instr`/`data`).
+
+    Prefixes are ranked by how many wrapper signals they cover. With a dual
+    memory interface, name hints (`imem`, `dwb`, ...) decide which prefix is
+    the instruction one; otherwise the first declared prefix is used.
+    """
+    coverage = defaultdict(float)
+    order = {}
+    for signal in signals:
+        if signal['group'] != 'instr':
+            continue
+        best = {}
+        for score, prefix, _ in candidates[signal['key']]:
+            best[prefix] = max(best.get(prefix, 0.0), score)
+        for prefix, score in best.items():
+            coverage[prefix] += score
+            order.setdefault(prefix, len(order))
+
+    ranked = sorted(coverage, key=lambda p: (-coverage[p], order[p]))
+    if not ranked:
+        return {}
+    if not dual or len(ranked) < 2:
+        return {'instr': ranked[0]}
+
+    top = sorted(ranked[:2], key=lambda p: order[p])
+    instr = next((p for p in top if is_instruction_prefix(p)), None)
+    data = next((p for p in top if is_data_prefix(p) and p != instr), None)
+    if instr is None:
+        instr = next(p for p in top if p != data)
+    if data is None:
+        data = next(p for p in top if p != instr)
+    return {'instr': instr, 'data': data}
+
+
+def map_connections(interface_info, header: str) -> tuple[dict, dict]:
+    """
+    Connects the processor ports to the wrapper signals by name, direction
+    and width, without querying the LLM.
+
+    Returns:
+        tuple: (connections, confidence). `connections` has the same flat
+               format returned by `connect_interfaces`; `confidence` maps
+               each wrapper signal to a score in [0, 1]. Signals without a
+               match are None with confidence 0.
+    """
+    signals = _wrapper_signals(interface_info)
+    try:
+        _, _, ports = parse_module_header(header)
+    except ValueError:
+        logger.debug('Connection mapper could not parse the module header.')
+        return {s['key']: None for s in signals}, {
+            s['key']: 0.0 for s in signals
+        }
+
+    dual = interface_info.get('memory_interface') == 'Dual'
+    candidates = {s['key']: _candidates(s, ports) for s in signals}
+    groups = _pick_groups(candidates, signals, dual)
+
+    # Cada porta é usada uma vez; as melhores correspondências escolhem antes
+    options = []
+    for signal in signals:
+        prefix = groups.get(signal['group'])
+        if prefix is None:
+            continue
+        for score, port_prefix, port in candidates[signal['key']]:
+            if port_prefix == prefix:
+                options.append((score, signal['key'], port))
+    options.sort(key=lambda o: -o[0])
+
+    connections = {s['key']: None for s in signals}
+    confidence = {s['key']: 0.0 for s in signals}
+    used = set()
+    for score, key, port in options:
+        if connections[key] is not None or port in used:
+            continue
+        connections[key] = port
+        confidence[key] = score
+        used.add(port)
+
+    # Sinais opcionais sem nenhuma porta parecida ficam abertos
+    for signal in signals:
+        key = signal['key']
+        if (
+            signal['optional']
+            and connections[key] is None
+            and not candidates[key]
+            and signal['group'] in groups
+        ):
+            confidence[key] = RULE_SCORE
+
+    for sel in ('core_sel', 'data_mem_sel'):
+        if sel in connections and connections[sel] is None:
+            if ('data' if sel == 'data_mem_sel' else 'instr') in groups:
+                connections[sel] = SEL_DEFAULT
+                confidence[sel] = RULE_SCORE
+
+    return connections, confidence
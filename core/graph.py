@@ -0,0 +1,138 @@
+import heapq
+from typing import Callable, Hashable, Iterable
+
+
+class DependencyGraph:
+    """
+    Directed graph where an edge `a -> b` means `a` must come before `b`
+    (e.g. a package before the files importing it).
+
+    Ties between nodes that could come next are broken by `key` (smallest
+    first; by default, the position in `nodes`). Cycles never block the
+    ordering: each strongly connected component is placed as a whole, with
+    its members sorted by `key`.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable], key: Callable | None = None):
+        self.nodes = list(dict.fromkeys(nodes))
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.key = key or self.index.__getitem__
+        self.successors = {node: set() for node in self.nodes}
+        self.predecessors = {node: set() for node in self.nodes}
+        self._components = None
+
+    def add_edge(self, before: Hashable, after: Hashable) -> bool:
+        """Adds `before -> after`; returns False if it already existed."""
+        if before == after or after in self.successors[before]:
+            return False
+        self.successors[before].add(after)
+        self.predecessors[after].add(before)
+        self._components = None
+        return True
+
+    def components(self) -> list[list]:
+        """
+        Strongly connected components (Tarjan's algorithm), each with its
+        members sorted by `key`. Nodes outside cycles are components of
+        their own.
+        """
+        if self._components is not None:
+            return self._components
+
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+        counter = 0
+
+        for root in self.nodes:
+            if root in index:
+                continue
+            # Versão iterativa: grafos de milhares de arquivos estouram o
+            # limite de recursão
+            work = [(root, None)]
+            while work:
+                node, successors = work.pop()
+                if successors is None:
+                    index[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                    successors = iter(
+                        sorted(self.successors[node], key=self.index.get)
+                    )
+                for succ in successors:
+                    if succ not in index:
+                        work.append((node, successors))
+                        work.append((succ, None))
+                        break
+                    if succ in on_stack:
+                        lowlink[node] = min(lowlink[node], index[succ])
+                else:
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component, key=self.key))
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+        self._components = components
+        return components
+
+    def cycles(self) -> list[list]:
+        """Components with more than one node, i.e. dependency cycles."""
+        cycles = [c for c in self.components() if len(c) > 1]
+        return sorted(cycles, key=lambda c: self.key(c[0]))
+
+    def _condensation(self) -> tuple[list[list], list[set[int]]]:
+        """Components and the edges between them, by component index."""
+        components = self.components()
+        owner = {
+            node: i
+            for i, component in enumerate(components)
+            for node in component
+        }
+        edges = [set() for _ in components]
+        for node, successors in self.successors.items():
+            for succ in successors:
+                if owner[node] != owner[succ]:
+                    edges[owner[node]].add(owner[succ])
+        return components, edges
+
+    def _component_order(self, components, edges) -> list[int]:
+        """Kahn's algorithm over the components, smallest `key` first."""
+        indeg = [0] * len(components)
+        for successors in edges:
+            for j in successors:
+                indeg[j] += 1
+        ready = [
+            (self.key(component[0]), i)
+            for i, component in enumerate(components)
+            if indeg[i] == 0
+        ]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, i = heapq.heappop(ready)
+            order.append(i)
+            for j in edges[i]:
+                indeg[j] -= 1
+                if indeg[j] == 0:
+                    heapq.heappush(ready, (self.key(components[j][0]), j))
+        return order
+
+    def order(self) -> list:
+        """All nodes in dependency order."""
+        components, edges = self._condensation()
+        return [
+            node
+            for i in self._component_order(components, edges)
+            for node in components[i]
+        ]
@@ -0,0 +1,510 @@
+import os
+import re
+import json
+import mmap
+import sqlite3
+import hashlib
+import logging
+import functools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import core
+from core import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Muda quando `scan_text` passa a extrair algo diferente, invalidando o
+# índice já gravado
+INDEX_VERSION = 3
+
+HDL_EXTENSIONS = ('.v', '.sv', '.vh', '.svh', '.vhd', '.vhdl')
+
+# Declarações de módulo/entidade usadas por `search_files`; o lookahead
+# testa todo início de linha
+MODULE_DECL_RE = re.compile(r'^(?=\s*module\s+(\w+))', re.I | re.M)
+ENTITY_DECL_RE = re.compile(r'^(?=\s*entity\s+(\w+)\s+is\b)', re.I | re.M)
+
+# SystemVerilog
+SV_PKG_DECL_RE = re.compile(
+    r'^\s*package\s+(\w+)\s*;', re.MULTILINE | re.IGNORECASE
+)
+SV_IMPORT_RE = re.compile(
+    r'^\s*import\s+([a-zA-Z_]\w*)\s*::\s*\*\s*;',
+    re.MULTILINE | re.IGNORECASE,
+)
+SV_IMPORT_LIST_RE = re.compile(
+    r'^\s*import\s+([^;]+);', re.MULTILINE | re.IGNORECASE
+)
+SV_NAMESPACE_REF_RE = re.compile(
+    r'\b([a-zA-Z_]\w+)::[a-zA-Z_]\w+', re.MULTILINE
+)
+SV_IFDEF_ERROR_RE = re.compile(
+    r'^\s*`ifdef\s+(\w+)\s*\n\s*`error', re.MULTILINE | re.IGNORECASE
+)
+SV_DEFINE_RE = re.compile(r'^\s*`define\s+(\w+)', re.MULTILINE | re.IGNORECASE)
+# Regex to detect module declarations
+SV_MODULE_DECL_RE = re.compile(
+    r'^\s*module\s+([a-zA-Z_]\w*)', re.MULTILINE | re.IGNORECASE
+)
+# Possible module instantiations: a line starting with an identifier
+# followed by "#" or "instance_name (". The lookahead tests every line
+# start, so each line yields at most one candidate name.
+SV_MODULE_INST_RE = re.compile(
+    r'^(?=\s*([a-zA-Z_]\w*)\s+(?:#|\w+\s*\())', re.MULTILINE
+)
+IDENTIFIER_RE = re.compile(r'^[a-zA-Z_]\w*$')
+
+# VHDL (case-insensitive)
+# Library declaration: library <name>;
+VHDL_LIBRARY_DECL_RE = re.compile(
+    r'^\s*library\s+(\w+)\s*;', re.MULTILINE | re.IGNORECASE
+)
+# Package declaration: package <name> is
+VHDL_PKG_DECL_RE = re.compile(
+    r'^\s*package\s+(\w+)\s+is\b', re.MULTILINE | re.IGNORECASE
+)
+# Entity declaration: entity <name> is
+VHDL_ENTITY_DECL_RE = re.compile(
+    r'^\s*entity\s+(\w+)\s+is\b', re.MULTILINE | re.IGNORECASE
+)
+# Use clause: use <library>.<package>.<item> or use <library>.<package>.all
+VHDL_USE_CLAUSE_RE = re.compile(
+    r'^\s*use\s+(\w+)\.(\w+)(?:\.(\w+))?', re.MULTILINE | re.IGNORECASE
+)
+# Component declaration: component <name> is (for instantiation detection)
+VHDL_COMPONENT_RE = re.compile(
+    r'^\s*component\s+(\w+)\b', re.MULTILINE | re.IGNORECASE
+)
+# Direct entity instantiation: <instance_name> : entity <library>.<entity>
+VHDL_ENTITY_INST_RE = re.compile(
+    r'^\s*\w+\s*:\s*entity\s+(\w+)\.(\w+)', re.MULTILINE | re.IGNORECASE
+)
+# Component instantiation: <instance_name> : <component> (port|generic) map
+VHDL_COMP_INST_RE = re.compile(
+    r'^\s*\w+\s*:\s*(\w+)\s+(?:port|generic)\s+map',
+    re.MULTILINE | re.IGNORECASE,
+)
+
+STANDARD_VHDL_LIBRARIES = ('ieee', 'std')
+
+# Padrões usados por `scan_text`, também compilados para `bytes` para a
+# varredura direto sobre o mmap do arquivo
+TEXT_PATTERNS = {
+    'module_decl': MODULE_DECL_RE,
+    'entity_decl': ENTITY_DECL_RE,
+    'sv_pkg_decl': SV_PKG_DECL_RE,
+    'sv_import': SV_IMPORT_RE,
+    'sv_import_list': SV_IMPORT_LIST_RE,
+    'sv_namespace_ref': SV_NAMESPACE_REF_RE,
+    'sv_ifdef_error': SV_IFDEF_ERROR_RE,
+    'sv_define': SV_DEFINE_RE,
+    'sv_module_decl': SV_MODULE_DECL_RE,
+    'sv_module_inst': SV_MODULE_INST_RE,
+    'vhdl_library_decl': VHDL_LIBRARY_DECL_RE,
+    'vhdl_pkg_decl': VHDL_PKG_DECL_RE,
+    'vhdl_entity_decl': VHDL_ENTITY_DECL_RE,
+    'vhdl_use_clause': VHDL_USE_CLAUSE_RE,
+    'vhdl_component': VHDL_COMPONENT_RE,
+    'vhdl_entity_inst': VHDL_ENTITY_INST_RE,
+    'vhdl_comp_inst': VHDL_COMP_INST_RE,
+}
+# Em bytes, \w, \s e IGNORECASE valem só para ASCII, como os
+# identificadores de Verilog e VHDL
+BYTES_PATTERNS = {
+    name: re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+    for name, pattern in TEXT_PATTERNS.items()
+}
+# Arquivos grandes sem nenhuma dessas palavras não declaram nada; deles só
+# valem os `define, pois cabeçalhos só de macros contam para a ordem dos
+# arquivos
+DECLARATION_KEYWORD_RE = re.compile(
+    rb'\b(?:module|entity|package)\b', re.IGNORECASE
+)
+UNDECLARED_PATTERNS = frozenset({'sv_define', 'sv_ifdef_error'})
+# CR sem LF (fim de linha do Mac antigo) não é início de linha para `^`
+LONE_CR_RE = re.compile(rb'\r(?!\n)')
+
+
+def _scan(text, patterns: dict, decode, only=None) -> dict:
+    """
+    The facts of `scan_text` for `text` given as `str` or as `bytes`, with
+    `patterns` compiled for the same type; `decode` turns the captured
+    groups into `str`. With `only`, the other patterns match nothing.
+    """
+
+    def first(name: str) -> str | None:
+        if only is not None and name not in only:
+            return None
+        m = patterns[name].search(text)
+        return decode(m.group(1)) if m else None
+
+    def found(name: str, *groups: int):
+        if only is not None and name not in only:
+            return
+        # Um nome por ocorrência, ou uma tupla quando há vários grupos
+        for m in patterns[name].finditer(text):
+            if groups:
+                yield tuple(decode(m.group(g)) for g in groups)
+            else:
+                yield decode(m.group(1))
+
+    imports = set(found('sv_import'))
+    for statement in found('sv_import_list'):
+        for seg in statement.split(','):
+            seg = seg.strip()
+            if '::' in seg:
+                pkg = seg.split('::', 1)[0].strip()
+                if IDENTIFIER_RE.match(pkg):
+                    imports.add(pkg)
+
+    vhdl_package = first('vhdl_pkg_decl')
+    vhdl_entity = first('vhdl_entity_decl')
+
+    return {
+        'empty': False,
+        # search_files: nomes declarados, em minúsculas
+        'modules': sorted({name.lower() for name in found('module_decl')}),
+        'entities': sorted({name.lower() for name in found('entity_decl')}),
+        # _order_sv_files
+        'sv_module': first('sv_module_decl'),
+        'sv_package': first('sv_pkg_decl'),
+        'sv_defines': list(found('sv_define')),
+        'sv_forbidden_defines': sorted(set(found('sv_ifdef_error'))),
+        'sv_imports': sorted(imports),
+        'sv_namespaces': sorted(set(found('sv_namespace_ref'))),
+        'sv_instances': sorted(set(found('sv_module_inst'))),
+        # _order_vhdl_files (nomes em minúsculas: VHDL não diferencia)
+        'vhdl_libraries': sorted(
+            {
+                name.lower()
+                for name in found('vhdl_library_decl')
+                if name.lower() not in ('ieee', 'std', 'work')
+            }
+        ),
+        'vhdl_package': vhdl_package.lower() if vhdl_package else None,
+        'vhdl_entity': vhdl_entity.lower() if vhdl_entity else None,
+        'vhdl_uses': sorted(
+            {
+                (lib.lower(), pkg.lower())
+                for lib, pkg in found('vhdl_use_clause', 1, 2)
+                if lib.lower() not in STANDARD_VHDL_LIBRARIES
+            }
+        ),
+        'vhdl_entity_instances': sorted(
+            {
+                entity.lower()
+                for lib, entity in found('vhdl_entity_inst', 1, 2)
+                if lib.lower() not in STANDARD_VHDL_LIBRARIES
+            }
+        ),
+        'vhdl_components': sorted(
+            {name.lower() for name in found('vhdl_component')}
+        ),
+        'vhdl_component_instances': [
+            name.lower() for name in found('vhdl_comp_inst')
+        ],
+    }
+
+
+def scan_text(text: str) -> dict:
+    """
+    Extracts what the file search and the file orderers need to know about
+    an HDL source: declared modules, packages and entities, defines,
+    imports and instantiation candidates. Every value is JSON-serializable
+    and independent of the other files of the project.
+    """
+    if not text:
+        return {'empty': True}
+    return _scan(text, TEXT_PATTERNS, str)
+
+
+def _decode(data: bytes) -> str:
+    # Mesmo texto que open(..., 'r', errors='ignore') produziria
+    text = data.decode('utf-8', errors='ignore')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def scan_bytes(data) -> dict:
+    """
+    `scan_text` of the raw content of a file (`bytes` or a memory map),
+    running the patterns on the bytes and decoding only what they capture.
+    Large files without any module, entity or package keyword are only
+    scanned for defines (see `SCAN_SKIP_BYTES`).
+    """
+    if not len(data):
+        return {'empty': True}
+    only = None
+    if len(data) > core.SCAN_SKIP_BYTES and not (
+        DECLARATION_KEYWORD_RE.search(data)
+    ):
+        logger.debug(
+            f'Only looking for defines in {len(data)} bytes without '
+            'module/entity/package'
+        )
+        only = UNDECLARED_PATTERNS
+    if not core.SCAN_MMAP or LONE_CR_RE.search(data):
+        return _scan(_decode(bytes(data)), TEXT_PATTERNS, str, only)
+    return _scan(data, BYTES_PATTERNS, _decode, only)
+
+
+def scan_path(
+    path: str, known_digest: str | None = None
+) -> tuple[str | None, dict | None]:
+    """
+    Reads, hashes and scans one file, memory-mapped when `SCAN_MMAP` is
+    set. Depends only on its arguments, so it can run in a worker process.
+
+    Returns:
+        tuple: (sha256 of the content, `scan_text` facts). The digest is
+        None if the file cannot be read, and the facts are None when the
+        digest equals `known_digest` (the caller already has them).
+    """
+    try:
+        with open(path, 'rb') as f:
+            if core.SCAN_MMAP and os.fstat(f.fileno()).st_size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+    except (OSError, ValueError) as e:
+        logger.debug(f'Could not read file {path}: {e}')
+        return None, {'empty': True}
+
+    try:
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == known_digest:
+            return digest, None
+        return digest, scan_bytes(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def scan_plan(count: int) -> tuple[int, int]:
+    """
+    Worker processes and chunk size to scan `count` files. Each worker gets
+    at least `SCAN_MIN_FILES_PER_WORKER` files and about four chunks, so
+    small repositories are scanned in the calling process (one worker) and
+    large ones keep every worker busy until the end.
+    """
+    limit = core.SCAN_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(limit, count // core.SCAN_MIN_FILES_PER_WORKER))
+    chunksize = max(1, -(-count // (workers * 4)))
+    return workers, chunksize
+
+
+def scan_paths(
+    paths: list[str], known_digests: list[str | None] | None = None
+) -> list[tuple[str | None, dict | None]]:
+    """`scan_path` of each path, in order, on a process pool if worth it."""
+    if known_digests is None:
+        known_digests = [None] * len(paths)
+    workers, chunksize = scan_plan(len(paths))
+    if workers == 1:
+        return list(map(scan_path, paths, known_digests))
+
+    logger.debug(
+        f'Scanning {len(paths)} files with {workers} processes '
+        f'(chunks of {chunksize})'
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(scan_path, paths, known_digests, chunksize=chunksize)
+        )
+
+
+def index_version() -> str:
+    """
+    Version stored with each index entry: `INDEX_VERSION` plus the scan
+    settings that change the facts of a file, so that entries scanned with
+    other settings are scanned again.
+    """
+    return f'{INDEX_VERSION}:{core.SCAN_SKIP_BYTES}:{int(core.SCAN_MMAP)}'
+
+
+def resolve_path(path: str, root: str | None = None) -> str:
+    """
+    Absolute path of `path`. Relative paths that exist from the current
+    directory (e.g. already joined with a relative repository path) are
+    taken as they are; the others are relative to `root`.
+    """
+    if os.path.isabs(path) or not root or os.path.exists(path):
+        return os.path.abspath(path)
+    return os.path.abspath(os.path.join(root, path))
+
+
+class HdlIndex:
+    """
+    Persistent index of the facts `scan_text` extracts from the HDL files
+    of a repository, so that only files that changed are scanned again.
+
+    Entries are keyed by absolute path and validated by modification time
+    and size; when those differ, the content hash decides whether the file
+    really changed. Backed by SQLite in WAL mode, like `ResponseCache`.
+    """
+
+    def __init__(self, root: str, path: str | None = None):
+        self.root = os.path.abspath(root)
+        if path is None:
+            name = os.path.basename(self.root.rstrip(os.sep)) or 'root'
+            digest = hashlib.sha256(self.root.encode()).hexdigest()[:12]
+            path = os.path.join(
+                CACHE_DIR, 'hdl_index', f'{name}-{digest}.sqlite'
+            )
+        self.path = path
+        self.scanned = 0
+        self.reused = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, '
+                'digest TEXT, version TEXT, facts TEXT)'
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Opens a connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _abspath(self, path: str) -> str:
+        return resolve_path(path, self.root)
+
+    def facts(self, paths: list[str]) -> dict[str, dict]:
+        """
+        Returns the `scan_text` facts of each path (see `resolve_path`),
+        keyed by the given paths, scanning only new or changed files.
+        Missing files get empty facts.
+        """
+        with self._connect() as db:
+            rows = {
+                row[0]: row[1:]
+                for row in db.execute(
+                    'SELECT path, mtime_ns, size, digest, version, facts '
+                    'FROM files'
+                )
+            }
+
+        version = index_version()
+        result = {}
+        pending = []
+        for path in paths:
+            abspath = self._abspath(path)
+            try:
+                st = os.stat(abspath)
+            except OSError:
+                result[path] = scan_text('')
+                continue
+
+            row = rows.get(abspath)
+            if row is not None and row[3] != version:
+                row = None
+            if row is not None and (row[0], row[1]) == (
+                st.st_mtime_ns,
+                st.st_size,
+            ):
+                result[path] = json.loads(row[4])
+                self.reused += 1
+                continue
+            pending.append((path, abspath, st, row))
+
+        scans = scan_paths(
+            [abspath for _, abspath, _, _ in pending],
+            [row[2] if row else None for _, _, _, row in pending],
+        )
+        updates = []
+        for (path, abspath, st, row), (digest, facts) in zip(pending, scans):
+            if digest is None:
+                result[path] = facts
+                continue
+            if facts is None:
+                # Só a data mudou (ex.: checkout); o conteúdo é o mesmo
+                facts = json.loads(row[4])
+                self.reused += 1
+            else:
+                self.scanned += 1
+            result[path] = facts
+            updates.append(
+                (
+                    abspath,
+                    st.st_mtime_ns,
+                    st.st_size,
+                    digest,
+                    version,
+                    json.dumps(facts),
+                )
+            )
+
+        if updates:
+            with self._connect() as db:
+                db.executemany(
+                    'INSERT OR REPLACE INTO files '
+                    '(path, mtime_ns, size, digest, version, facts) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    updates,
+                )
+        return result
+
+    def prune(self) -> int:
+        """Removes the entries of files that no longer exist."""
+        with self._connect() as db:
+            paths = [row[0] for row in db.execute('SELECT path FROM files')]
+            gone = [(p,) for p in paths if not os.path.exists(p)]
+            db.executemany('DELETE FROM files WHERE path = ?', gone)
+        return len(gone)
+
+
+def find_hdl_files(root: str) -> list[str]:
+    """Every HDL source under `root`, skipping hidden directories."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        found.extend(
+            os.path.join(dirpath, name)
+            for name in sorted(filenames)
+            if name.lower().endswith(HDL_EXTENSIONS)
+        )
+    return found
+
+
+def warm_index(root: str) -> tuple[int, int, int]:
+    """
+    Brings the index of the repository at `root` up to date with every HDL
+    file under it and drops entries of deleted files.
+
+    Returns:
+        tuple: (files, scanned, reused).
+    """
+    root = os.path.abspath(root)
+    index = get_hdl_index(root)
+    scanned, reused = index.scanned, index.reused
+    files = find_hdl_files(root)
+    index.facts(files)
+    index.prune()
+    return len(files), index.scanned - scanned, index.reused - reused
+
+
+@functools.lru_cache(maxsize=None)
+def get_hdl_index(root: str) -> HdlIndex:
+    """Returns the index of the repository at `root`."""
+    return HdlIndex(root)
+
+
+def file_facts(
+    paths: list[str], root: str | None = None, use_index: bool = True
+) -> dict[str, dict]:
+    """
+    `scan_text` facts of each path, from the index of `root` when one is
+    given and `use_index` is set, or by scanning every file otherwise.
+    Relative paths are resolved as in `resolve_path`.
+    """
+    if root and use_index:
+        return get_hdl_index(os.path.abspath(root)).facts(paths)
+    scans = scan_paths([resolve_path(path, root) for path in paths])
+    return {path: facts for path, (_, facts) in zip(paths, scans)}
@@ -1,15 +1,157 @@
 import os
 import re
+import json
+import shutil
+import tempfile
+import functools
 import subprocess
 import logging
+from collections import defaultdict
 from core import BUILD_DIR, INTERNAL_DIR
+from core.cache import ArtifactCache, make_key, file_digest
+from core.hdl_index import file_facts
 from core.defines import KEYWORDS
 
 
 logger = logging.getLogger(__name__)
 
+VERILATOR_DEFINES = [
+    '-DSIMULATION',
+    '-DSYNTHESIS',
+    '-DSYNTH',
+    '-DEN_EXCEPT',
+    '-DEN_RVZICSR',
+]
 
-def run_ghdl_import(cpu_name, vhdl_files):
+# `line <n> "<file>" <level>, emitted by verilator -E for every source read
+LINE_DIRECTIVE_RE = re.compile(r'^`line\s+\d+\s+"([^"]+)"', re.MULTILINE)
+
+# Nomes referenciados que são identificadores simples (ver search_files)
+WORD_RE = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(tool: str) -> str:
+    """Returns the output of `<tool> --version` (empty if unavailable)."""
+    try:
+        proc = subprocess.run(
+            [tool, '--version'], capture_output=True, text=True
+        )
+    except OSError:
+        return ''
+    return proc.stdout.strip()
+
+
+def _load_preprocessed(cache: ArtifactCache, key: str) -> str | None:
+    """
+    Returns the path of a cached preprocessing result.
+
+    The entry is discarded if any file Verilator read while producing it
+    (including `include files outside the include directories) changed.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    try:
+        with open(os.path.join(entry, 'deps.json'), encoding='utf-8') as f:
+            deps = json.load(f)
+        for path, digest in deps.items():
+            if file_digest(path) != digest:
+                logger.debug(f'Cached preprocessing is stale: {path} changed')
+                cache.invalidate(key)
+                return None
+    except (OSError, ValueError):
+        cache.invalidate(key)
+        return None
+
+    processed = os.path.join(entry, 'processed.sv')
+    if not os.path.isfile(processed):
+        cache.invalidate(key)
+        return None
+    return processed
+
+
+class PreprocessedSink:
+    """
+    Consumes the preprocessed code line by line, in a single pass: drops
+    blank and `line lines, writes the others to `output` (unless it is
+    None), keeps the header of the top module (plus `context` lines after
+    it) and collects the referenced module names and the source files
+    named by `line directives. Memory use does not depend on the size of
+    the design.
+    """
+
+    def __init__(self, output, top_module: str, context: int = 20):
+        self.output = output
+        self.top_string = f'module {top_module}'
+        self.context = context
+        self.header_lines = []
+        self.modules = set()
+        self.sources = set()
+        self.lines = 0
+        self._inside_module = False
+        self._inside_extended = False
+        self._counter = 0
+        self.header_done = False
+
+    def feed(self, chunk: str) -> None:
+        """Consumes one line as read from a stream (or a few, see below)."""
+        # splitlines também separa em \f, \v, etc., como a versão que
+        # dividia a saída inteira
+        for line in chunk.splitlines():
+            stripped = line.strip()
+            if line.startswith('`line'):
+                m = LINE_DIRECTIVE_RE.match(line)
+                if m:
+                    self.sources.add(m.group(1))
+                continue
+            if stripped == '':
+                continue
+
+            if self.output is not None:
+                if self.lines:
+                    self.output.write('\n')
+                self.output.write(line)
+            self.lines += 1
+
+            module = referenced_module(line)
+            if module is not None:
+                self.modules.add(module)
+            if not self.header_done and not stripped.startswith('`line'):
+                self._feed_header(line, stripped)
+
+    def _feed_header(self, line: str, stripped: str) -> None:
+        if self.top_string in stripped:
+            self._inside_module = True
+        if self._inside_module:
+            self.header_lines.append(line)
+            if ');' in stripped:  # fim do header
+                self._inside_extended = True
+        if self._inside_extended:
+            if self._counter == self.context:
+                self.header_done = True
+            self._counter += 1
+
+    def consume(self, stream) -> None:
+        """Feeds every line of a text stream (file or pipe)."""
+        for chunk in stream:
+            self.feed(chunk)
+
+    @property
+    def header(self) -> str:
+        return '\n'.join(self.header_lines)
+
+    def deps(self) -> dict[str, str]:
+        """Digest of each existing source file named by `line directives."""
+        return {
+            path: file_digest(path)
+            for path in self.sources
+            if os.path.isfile(path)
+        }
+
+
+def run_ghdl_import(cpu_name, vhdl_files, workdir=BUILD_DIR):
     """Importar todos os arquivos VHDL com GHDL -i."""
     logger.info('Importing VHDL files with GHDL (-i)...')
     cmd = [
@@ -17,14 +159,14 @@ def run_ghdl_import(cpu_name, vhdl_files):
         '-i',
         '--std=08',
         f'--work={cpu_name}',
-        f'--workdir={BUILD_DIR}',
-        f'-P{BUILD_DIR}',
+        f'--workdir={workdir}',
+        f'-P{workdir}',
     ] + list(map(str, vhdl_files))
     logger.debug(f"[CMD] {' '.join(cmd)}")
     subprocess.run(cmd, check=True)
 
 
-def run_ghdl_elaborate(cpu_name, top_module):
+def run_ghdl_elaborate(cpu_name, top_module, workdir=BUILD_DIR):
     """Elaborar com GHDL -m."""
     logger.info('Elaborating project with GHDL (-m)...')
     cmd = [
@@ -32,15 +174,17 @@ def run_ghdl_elaborate(cpu_name, top_module):
         '-m',
         '--std=08',
         f'--work={cpu_name}',
-        f'--workdir={BUILD_DIR}',
-        f'-P{BUILD_DIR}',
+        f'--workdir={workdir}',
+        f'-P{workdir}',
         f'{top_module}',
     ]
     logger.debug(f"[CMD] {' '.join(cmd)}")
     subprocess.run(cmd, check=True)
 
 
-def synthesize_to_verilog(cpu_name, output_file, top_module):
+def synthesize_to_verilog(
+    cpu_name, output_file, top_module, workdir=BUILD_DIR
+):
     """Sintetizar o VHDL com GHDL para Verilog."""
     logger.info(f'Synthesizing {cpu_name} to Verilog...')
     cmd = [
@@ -49,8 +193,8 @@ def synthesize_to_verilog(cpu_name, output_file, top_module):
         '--latches',
         '--std=08',
         f'--work={cpu_name}',
-        f'--workdir={BUILD_DIR}',
-        f'-P{BUILD_DIR}',
+        f'--workdir={workdir}',
+        f'-P{workdir}',
         '--out=verilog',
         top_module,
     ]
@@ -59,88 +203,430 @@ def synthesize_to_verilog(cpu_name, output_file, top_module):
         subprocess.run(cmd, stdout=f, check=True)
 
 
-def convert_to_verilog(cpu_name, vhdl_files, top_module, output_file):
-    run_ghdl_import(cpu_name, vhdl_files)
-    run_ghdl_elaborate(cpu_name, top_module)
-    synthesize_to_verilog(cpu_name, output_file, top_module)
-
-
-def search_files(text_lines: str, files: list[str]):
-    modules = set()
-    pattern = re.compile(r'(\w+)\s*(\w+)\s*\(')
-
-    # Verilog/SystemVerilog module pattern
-    module_pattern = re.compile(r'^\s*module\s+(\w+)\s*\(')
-    # VHDL entity pattern
-    entity_pattern = re.compile(r'^\s*entity\s+(\w+)\s+is\b', re.IGNORECASE)
-
-    extensions = ['.sv', '.v', '.vh', '.vhd', '.vhdl']
-
-    for line in text_lines:
-        if line.strip() == '' or line.startswith('`line'):
-            continue
-        strip = line.strip()
-        out = pattern.search(strip)
-        module_out = module_pattern.search(strip)
-        entity_out = entity_pattern.search(strip)
-
-        # Verilog/SystemVerilog module detection
-        if strip.endswith('#('):
-            split = strip.split(' ')
-            if 'module' in split[0]:
-                modules.add(split[1])
-            else:
-                modules.add(split[0])
+def convert_to_verilog(
+    cpu_name,
+    vhdl_files,
+    top_module,
+    output_file,
+    build_dir=BUILD_DIR,
+    use_cache=True,
+):
+    """
+    Converte o projeto VHDL para Verilog com GHDL.
+
+    Com cache habilitado, o `{cpu}.v` sintetizado é reaproveitado enquanto
+    o conteúdo dos arquivos VHDL e a entidade top não mudarem. Caso
+    contrário, uma biblioteca de trabalho persistente por core é usada, de
+    modo que apenas os arquivos alterados são reimportados e reanalisados.
+    """
+    if not use_cache:
+        run_ghdl_import(cpu_name, vhdl_files, build_dir)
+        run_ghdl_elaborate(cpu_name, top_module, build_dir)
+        synthesize_to_verilog(cpu_name, output_file, top_module, build_dir)
+        return
+
+    digests = {str(f): file_digest(f) for f in vhdl_files}
+
+    cache = ArtifactCache('ghdl')
+    cache_key = make_key(
+        tool_version('ghdl'),
+        cpu_name,
+        top_module,
+        *(f'{path}={digest}' for path, digest in sorted(digests.items())),
+    )
+    entry = cache.get(cache_key)
+    if entry is not None:
+        logger.info(f'Reusing cached GHDL synthesis of {cpu_name}...')
+        shutil.copyfile(os.path.join(entry, f'{cpu_name}.v'), output_file)
+        return
+
+    # As bibliotecas de trabalho ficam sob o limite de tamanho do cache,
+    # como entradas de um `ArtifactCache`
+    work_cache = ArtifactCache('ghdl-work')
+    workdir = os.path.join(work_cache.path, cpu_name)
+    manifest_path = os.path.join(workdir, 'imported.json')
+    imported = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            imported = json.load(f)
+
+    if set(imported) - set(digests):
+        # Arquivos removidos deixariam unidades antigas na biblioteca
+        logger.debug(f'VHDL file set changed, resetting {workdir}')
+        shutil.rmtree(workdir, ignore_errors=True)
+        imported = {}
+    os.makedirs(workdir, exist_ok=True)
+
+    changed = [f for f, d in digests.items() if imported.get(f) != d]
+    if changed:
+        logger.debug(f'{len(changed)} of {len(digests)} VHDL files changed')
+        run_ghdl_import(cpu_name, changed, workdir)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(digests, f, indent=4)
+
+    # ghdl -m só reanalisa as unidades desatualizadas na biblioteca
+    run_ghdl_elaborate(cpu_name, top_module, workdir)
+    synthesize_to_verilog(cpu_name, output_file, top_module, workdir)
+
+    # Marca a biblioteca como usada por último antes da remoção por LRU
+    os.utime(workdir)
+    work_cache.evict()
+
+    cache.put(cache_key, files={f'{cpu_name}.v': output_file})
+
+
+# Instanciações/declarações nas linhas do código pré-processado
+REFERENCE_RE = re.compile(r'(\w+)\s*(\w+)\s*\(')
+# Verilog/SystemVerilog module pattern
+MODULE_HEADER_RE = re.compile(r'^\s*module\s+(\w+)\s*\(')
+# VHDL entity pattern
+ENTITY_HEADER_RE = re.compile(r'^\s*entity\s+(\w+)\s+is\b', re.IGNORECASE)
+
+
+def referenced_module(line: str) -> str | None:
+    """
+    Name of the module or entity a preprocessed line declares or
+    instantiates, if any.
+    """
+    strip = line.strip()
+    if strip == '' or line.startswith('`line'):
+        return None
+
+    # Verilog/SystemVerilog module detection
+    if strip.endswith('#(') or ' #(' in strip:
+        split = strip.split(' ')
+        if 'module' in split[0]:
+            return split[1]
+        return split[0]
+
+    module_out = MODULE_HEADER_RE.search(strip)
+    if module_out:
+        return module_out.group(1)
+    entity_out = ENTITY_HEADER_RE.search(strip)
+    if entity_out:
+        # VHDL entity detected
+        return entity_out.group(1)
+    out = REFERENCE_RE.search(strip)
+    if out and strip[-1] == '(' and not strip[0] == ')':
+        return out.group(1)
+    return None
+
+
+def search_files(
+    text_lines: str,
+    files: list[str],
+    repo_root: str | None = None,
+    use_index: bool = True,
+):
+    """Files among `files` declaring a module referenced in `text_lines`."""
+    modules = {referenced_module(line) for line in text_lines}
+    modules.discard(None)
+    return find_module_files(modules, files, repo_root, use_index)
 
-        elif ' #(' in strip:
-            split = strip.split(' ')
-            if 'module' in split[0]:
-                modules.add(split[1])
-            else:
-                modules.add(split[0])
-        else:
-            if module_out:
-                modules.add(module_out.group(1))
-            elif entity_out:
-                # VHDL entity detected
-                modules.add(entity_out.group(1))
-            elif out and strip[-1] == '(' and not strip[0] == ')':
-                modules.add(out.group(1))
 
+def find_module_files(
+    modules: set[str],
+    files: list[str],
+    repo_root: str | None = None,
+    use_index: bool = True,
+) -> list[str]:
+    """Files among `files` declaring one of the `modules` (or entities)."""
     found_files = set()
 
     # Check if we have any VHDL files in the file list
     has_vhdl_files = any(f.lower().endswith(('.vhd', '.vhdl')) for f in files)
 
-    # Create patterns based on file types present
-    hdl_file_patterns = {}
+    # Cada arquivo é lido uma vez; os nomes declarados nele formam um
+    # índice nome -> arquivos, cruzado com os módulos referenciados
+    wanted = {name.lower() for name in modules if WORD_RE.fullmatch(name)}
+    # Nomes com outros caracteres (ex.: 'core#(') seguem com regex própria
+    hdl_file_patterns = []
     for name in modules:
-        # Always create Verilog/SystemVerilog module pattern
-        hdl_file_patterns[f'module_{name}'] = re.compile(
-            rf'^\s*module\s+{re.escape(name)}\b', re.IGNORECASE | re.MULTILINE
+        if WORD_RE.fullmatch(name):
+            continue
+        hdl_file_patterns.append(
+            re.compile(
+                rf'^\s*module\s+{re.escape(name)}\b',
+                re.IGNORECASE | re.MULTILINE,
+            )
         )
-        # Only create VHDL entity pattern if we have VHDL files
         if has_vhdl_files:
-            hdl_file_patterns[f'entity_{name}'] = re.compile(
-                rf'^\s*entity\s+{re.escape(name)}\s+is\b',
-                re.IGNORECASE | re.MULTILINE,
+            hdl_file_patterns.append(
+                re.compile(
+                    rf'^\s*entity\s+{re.escape(name)}\s+is\b',
+                    re.IGNORECASE | re.MULTILINE,
+                )
             )
 
+    # Nomes declarados em cada arquivo, do índice do repositório
+    facts = file_facts(files, repo_root, use_index=use_index)
+    index = defaultdict(set)
     for file_path in files:
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                if any(
-                    pattern.search(content)
-                    for pattern in hdl_file_patterns.values()
-                ):
-                    found_files.add(os.path.abspath(file_path))
-        except Exception:
-            pass  # ignora erros de leitura
+        info = facts[file_path]
+        if info['empty']:
+            continue  # ignora erros de leitura
+        path = os.path.abspath(file_path)
+        names = info['modules']
+        if has_vhdl_files:
+            names = names + info['entities']
+        for name in names:
+            index[name].add(path)
+        if hdl_file_patterns:
+            try:
+                with open(
+                    file_path, 'r', encoding='utf-8', errors='ignore'
+                ) as f:
+                    content = f.read()
+            except Exception:
+                continue
+            if any(pattern.search(content) for pattern in hdl_file_patterns):
+                found_files.add(path)
+
+    for name in wanted & index.keys():
+        found_files |= index[name]
 
     return sorted(found_files)
 
 
+# Quanto do stderr de cada ferramenta vai para o log quando ela falha
+STDERR_TAIL = 2000
+
+
+def run_tool_pipeline(
+    stages: list[tuple[str, list[str]]], consume, check: bool = True
+) -> dict[str, tuple[int, str]]:
+    """
+    Runs the commands of `stages` (name, command) as an OS pipeline, each
+    stdout connected to the stdin of the next, so the tools run
+    concurrently. `consume` is called with the text stdout of the last
+    stage. The stderr of each stage is captured to a temporary file, and
+    stages that fail are logged as warnings if `check` is set.
+
+    Returns:
+        dict: Stage name -> (exit status, stderr).
+    """
+    procs = []
+    try:
+        previous = None
+        for i, (name, cmd) in enumerate(stages):
+            logger.debug(f'[CMD] {name}: {" ".join(cmd)}')
+            stderr = tempfile.TemporaryFile()
+            try:
+                proc = subprocess.Popen(
+                    cmd,
+                    stdin=previous.stdout if previous else None,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    text=i == len(stages) - 1,
+                )
+            except OSError:
+                stderr.close()
+                raise
+            if previous:
+                # Só o próximo estágio fica com a ponta de leitura; se ele
+                # terminar, o anterior recebe SIGPIPE em vez de travar
+                previous.stdout.close()
+            procs.append((name, proc, stderr))
+            previous = proc
+
+        consume(previous.stdout)
+        previous.stdout.close()
+    except BaseException:
+        for _, proc, _ in procs:
+            proc.kill()
+        raise
+    finally:
+        results = {}
+        for name, proc, stderr in procs:
+            proc.wait()
+            stderr.seek(0)
+            results[name] = (
+                proc.returncode,
+                stderr.read().decode('utf-8', errors='replace'),
+            )
+            stderr.close()
+
+    for name, (status, errors) in results.items():
+        if status != 0 and check:
+            logger.warning(
+                f'{name} exited with status {status}: '
+                f'{errors[-STDERR_TAIL:].strip()}'
+            )
+        elif errors.strip():
+            logger.debug(f'{name} stderr: {errors.strip()}')
+    return results
+
+
+def _preprocess(
+    cmd: list[str],
+    sink: PreprocessedSink,
+    convert_to_verilog2005: bool = False,
+    format_code: bool = False,
+    want_deps: bool = True,
+) -> tuple[bool, dict[str, str]]:
+    """
+    Runs `verilator -E`, piped into sv2v and Verible if requested, and
+    feeds the result to `sink` while the tools run.
+
+    Returns:
+        tuple: (whether every tool succeeded, digest of each source file
+        Verilator read; empty unless `want_deps`).
+    """
+    stages = [('verilator', cmd)]
+    raw_path = None
+    if (convert_to_verilog2005 or format_code) and want_deps:
+        # As diretivas `line só existem na saída do Verilator; uma cópia
+        # dela é gravada em disco para extrair as dependências depois
+        fd, raw_path = tempfile.mkstemp(suffix='.sv')
+        os.close(fd)
+        stages.append(('tee', ['tee', raw_path]))
+
+    if convert_to_verilog2005:
+        logger.info('Converting to Verilog 2005 with verilog2verilog...')
+        stages.append(('sv2v', ['sv2v']))
+
+    if format_code:
+        logger.info('Formatting Verilog code with Verible...')
+        verible_cmd = ['verible-verilog-format', '--inplace', '--']
+        stages.append(('verible', verible_cmd))
+
+    try:
+        results = run_tool_pipeline(stages, sink.consume)
+        ok = all(status == 0 for status, _ in results.values())
+        if not want_deps:
+            return ok, {}
+        if raw_path is None:
+            return ok, sink.deps()
+
+        sources = set()
+        with open(raw_path, encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                m = LINE_DIRECTIVE_RE.match(line)
+                if m:
+                    sources.add(m.group(1))
+        return ok, {
+            path: file_digest(path) for path in sources if os.path.isfile(path)
+        }
+    finally:
+        if raw_path:
+            os.remove(raw_path)
+
+
+def _verilator_preprocess_cmd(
+    top_module: str, files: list[str], include_flags: list[str]
+) -> list[str]:
+    return [
+        'verilator',
+        '-E',  # pré-processamento
+        '--top-module',
+        f'{top_module}',
+        *VERILATOR_DEFINES,
+        '--quiet',
+        '-Wall',
+        '-Wno-UNOPTFLAT',
+        '-Wno-IMPLICIT',
+        '-Wno-TIMESCALEMOD',
+        '-Wno-UNUSED',
+        *files,
+        *include_flags,
+    ]
+
+
+def extract_top_header(
+    top_module: str,
+    files: list[str],
+    include_dirs: list[str],
+    processor_path: str,
+    context: int = 20,
+    use_index: bool = True,
+) -> tuple[str, str] | None:
+    """
+    Fast path to the header of the top module, without preprocessing the
+    whole design: the file declaring `top_module` is found through the
+    HDL index and only it is run through `verilator -E`, preceded by the
+    files listed before it that define macros (its `include chain is
+    resolved by Verilator through the include directories).
+
+    Returns:
+        tuple: (header, path of the file declaring the top module), or
+        None if the header could not be extracted this way (VHDL top, top
+        not found, preprocessing errors), in which case the header of the
+        full preprocessing should be used.
+    """
+    candidates = []
+    for file_rel in files:
+        path = os.path.join(processor_path, file_rel)
+        if path.lower().endswith(('.vhd', '.vhdl')):
+            continue
+        if os.path.isfile(path):
+            candidates.append(path)
+
+    include_flags = []
+    for inc_dir in include_dirs:
+        inc_path = os.path.join(processor_path, inc_dir)
+        if os.path.isdir(inc_path):
+            include_flags.append(f'-I{inc_path}')
+
+    facts = file_facts(candidates, processor_path, use_index=use_index)
+    top_file = next(
+        (
+            path
+            for path in candidates
+            if facts[path].get('sv_module') == top_module
+            or top_module.lower() in facts[path].get('modules', ())
+        ),
+        None,
+    )
+    if top_file is None:
+        logger.debug(f'No Verilog file declares {top_module}')
+        return None
+
+    # Macros definidas nos arquivos que vêm antes do top na configuração
+    # valem para ele, já que o Verilator lê todos como uma única unidade
+    # de compilação
+    define_files = [
+        path
+        for path in candidates[: candidates.index(top_file)]
+        if facts[path].get('sv_defines')
+    ]
+
+    sink = PreprocessedSink(None, top_module, context)
+
+    def consume(stream):
+        # O resto do arquivo não interessa; com o pipe fechado, o Verilator
+        # termina sem escrevê-lo
+        for chunk in stream:
+            sink.feed(chunk)
+            if sink.header_done:
+                break
+
+    cmd = _verilator_preprocess_cmd(
+        top_module, [*define_files, top_file], include_flags
+    )
+    try:
+        results = run_tool_pipeline([('verilator', cmd)], consume, check=False)
+    except OSError as e:
+        logger.debug(f'Could not run Verilator: {e}')
+        return None
+
+    # Parar de ler depois do header faz o Verilator sair com erro de
+    # escrita; só os erros que ele mesmo reportou importam
+    status, errors = results['verilator']
+    if (status != 0 and not sink.header_done) or '%Error' in errors:
+        logger.debug(
+            f'Verilator failed on {top_file}, waiting for the full '
+            'preprocessing'
+        )
+        return None
+    if not sink.header_lines:
+        logger.debug(
+            f'Header of {top_module} not found in {top_file}, waiting for '
+            'the full preprocessing'
+        )
+        return None
+    return sink.header, top_file
+
+
 def process_verilog(
     cpu_name: str,
     top_module: str,
@@ -151,11 +637,13 @@ def process_verilog(
     convert_to_verilog2005: bool = False,
     format_code: bool = False,
     get_files_in_project: bool = False,
+    build_dir: str = BUILD_DIR,
+    use_cache: bool = True,
 ):
     vhdl_files = []
     other_files = []
 
-    os.makedirs(BUILD_DIR, exist_ok=True)
+    os.makedirs(build_dir, exist_ok=True)
 
     for file_rel in files:
         src_file = os.path.join(processor_path, file_rel)
@@ -172,13 +660,14 @@ def process_verilog(
         for vhdl_file in vhdl_files:
             logger.debug(f' - {vhdl_file}')
         logger.info('Converting VHDL files to Verilog...')
-        os.makedirs(BUILD_DIR, exist_ok=True)
-        verilog_output = os.path.join(BUILD_DIR, f'{cpu_name}.v')
+        verilog_output = os.path.join(build_dir, f'{cpu_name}.v')
         convert_to_verilog(
             cpu_name,
             vhdl_files,
             top_module,
             verilog_output,
+            build_dir,
+            use_cache=use_cache,
         )
 
         other_files.append(str(verilog_output))
@@ -203,98 +692,65 @@ def process_verilog(
         else:
             logger.warning(f'Include directory not found: {inc_path}')
 
-    logger.info('Preprocessing Verilog files with Verilator...')
-
-    verilator_preprocess_cmd = [
-        'verilator',
-        '-E',  # pré-processamento
-        '--top-module',
-        f'{top_module}',
-        '-DSIMULATION',
-        '-DSYNTHESIS',
-        '-DSYNTH',
-        '-DEN_EXCEPT',
-        '-DEN_RVZICSR',
-        '--quiet',
-        '-Wall',
-        '-Wno-UNOPTFLAT',
-        '-Wno-IMPLICIT',
-        '-Wno-TIMESCALEMOD',
-        '-Wno-UNUSED',
-        *other_files,
-        *include_flags,
-    ]
-
-    # Executa o comando e captura a saída
-    proc = subprocess.run(
-        verilator_preprocess_cmd, capture_output=True, text=True
+    verilator_preprocess_cmd = _verilator_preprocess_cmd(
+        top_module, other_files, include_flags
     )
 
-    output = proc.stdout
-
-    if convert_to_verilog2005:
-        logger.info('Converting to Verilog 2005 with verilog2verilog...')
-        sv2v_cmd = ['sv2v']
-        proc2 = subprocess.run(
-            sv2v_cmd, input=output, capture_output=True, text=True
-        )
-        output = proc2.stdout
+    cache = ArtifactCache('verilator') if use_cache else None
+    cached = None
 
-    if format_code:
-        logger.info('Formatting Verilog code with Verible...')
-        verible_cmd = ['verible-verilog-format', '--inplace', '--']
-        proc3 = subprocess.run(
-            verible_cmd, input=output, capture_output=True, text=True
+    if cache:
+        cache_key = make_key(
+            tool_version('verilator'),
+            top_module,
+            *VERILATOR_DEFINES,
+            *include_flags,
+            f'sv2v={convert_to_verilog2005}',
+            f'verible={format_code}',
+            *(file_digest(f) for f in other_files),
         )
-        output = proc3.stdout
-
-    lines = output.splitlines()
-
-    logging.debug(f'Verilator command: {" ".join(verilator_preprocess_cmd)}')
-
-    logging.info('Filtering top module header...')
-
-    header_lines = []
-    inside_module = False
-    inside_extended = False
-    counter = 0
-    top_string = f'module {top_module}'
-
-    for line in lines:
-        stripped = line.strip()
-        if stripped == '' or stripped.startswith('`line'):
-            continue
-        if top_string in stripped:
-            inside_module = True
-        if inside_module:
-            header_lines.append(line)
-            if ');' in stripped:  # fim do header
-                inside_extended = True
-        if inside_extended:
-            if counter == context:
-                break
-            counter += 1
-
-    filtered_output = '\n'.join(
-        line
-        for line in lines
-        if line.strip() != '' and not line.startswith('`line')
-    )
-
-    output_path = os.path.join(BUILD_DIR, f'{cpu_name}_processed.sv')
+        cached = _load_preprocessed(cache, cache_key)
+
+    output_path = os.path.join(build_dir, f'{cpu_name}_processed.sv')
+
+    # O código é filtrado, salvo e analisado (header do top e módulos
+    # referenciados) em uma única passada, à medida que é lido
+    with open(output_path, 'w', encoding='utf-8') as f:
+        sink = PreprocessedSink(f, top_module, context)
+        if cached is not None:
+            logger.info('Reusing cached Verilator preprocessing output...')
+            with open(cached, encoding='utf-8') as src:
+                sink.consume(src)
+        else:
+            logger.info('Preprocessing Verilog files with Verilator...')
+            ok, deps = _preprocess(
+                verilator_preprocess_cmd,
+                sink,
+                convert_to_verilog2005,
+                format_code,
+                want_deps=cache is not None,
+            )
 
-    logging.info(f'Saving processed Verilog code to {output_path}...')
+    logging.info(f'Processed Verilog code saved to {output_path}')
 
-    # Salva o resultado em um único arquivo
-    with open(output_path, 'w') as f:
-        f.write(filtered_output)
+    if cache and cached is None and ok:
+        cache.put(
+            cache_key,
+            contents={'deps.json': json.dumps(deps)},
+            files={'processed.sv': output_path},
+        )
 
-    header_str = '\n'.join(header_lines)
+    header_str = sink.header
 
     files = []
 
     if get_files_in_project:
-        files = search_files(lines, other_files)
+        files = find_module_files(
+            sink.modules,
+            other_files,
+            repo_root=processor_path,
+            use_index=use_cache,
+        )
 
     return header_str, other_files, include_flags, files
 
@@ -305,7 +761,8 @@ def simulate_to_check(
     include_flags: list[str],
     output_dir: str = 'outputs',
     second_memory: bool = False,
-):
+    build_dir: str = BUILD_DIR,
+) -> bool:
     logging.info('Compilando e executando simulação com Verilator...')
 
     current_dir = os.getcwd()
@@ -331,11 +788,7 @@ def simulate_to_check(
         '--trace',
         '-Wno-fatal',
         '-DENABLE_SECOND_MEMORY' if second_memory else '',
-        '-DSIMULATION',
-        '-DSYNTHESIS',
-        '-DSYNTH',
-        '-DEN_EXCEPT',
-        '-DEN_RVZICSR',
+        *VERILATOR_DEFINES,
         '-Wall',
         '-Wno-UNOPTFLAT',
         '-Wno-IMPLICIT',
@@ -357,11 +810,11 @@ def simulate_to_check(
         verilator_cmd.append('-DENABLE_SECOND_MEMORY')
 
     logger.debug(f"[CMD] {' '.join(verilator_cmd)}")
-    subprocess.run(verilator_cmd, check=True, cwd=BUILD_DIR)
+    subprocess.run(verilator_cmd, check=True, cwd=build_dir)
 
     expected_output = (0x3C, 0x5)
 
-    sim_executable = os.path.join(BUILD_DIR, 'build', 'Vverification_top')
+    sim_executable = os.path.join(build_dir, 'build', 'Vverification_top')
     if os.path.exists(sim_executable):
         logger.info('Executando simulação...')
         result = subprocess.run(
@@ -405,5 +858,8 @@ def simulate_to_check(
                 f'Expected: Address 0x{expected_output[0]:08X}, Data: 0x{expected_output[1]:08X}'
             )
             logger.error('Check the logs above for more details.')
-    else:
-        logger.error('Simulation executable not found.')
+
+        return ok
+
+    logger.error('Simulation executable not found.')
+    return False
@@ -0,0 +1,155 @@
+import os
+import re
+import math
+import logging
+from core.make_wrapper import module_header_end, parse_module_ports
+
+logger = logging.getLogger(__name__)
+
+# Estimativa grosseira usada por tokenizers BPE em código
+CHARS_PER_TOKEN = 4
+# Orçamento de tokens do cabeçalho por família de modelo
+HEADER_TOKEN_BUDGETS = {
+    'qwen2.5': 3072,
+    'qwen3': 3072,
+    'gpt-oss': 4096,
+    'llama3': 2048,
+}
+DEFAULT_HEADER_TOKEN_BUDGET = int(
+    os.getenv('PROCESSOR_CI_HEADER_TOKENS', '2048')
+)
+MAX_COMMENT_CHARS = 40
+# Portas descartadas primeiro quando o orçamento estoura
+LOW_PRIORITY_PORT_RE = re.compile(
+    r'dbg|debug|trace|trc|jtag|perf|scan|test|bist|irq|intr|interrupt', re.I
+)
+
+LINE_COMMENT_RE = re.compile(r'//(.*)$', re.M)
+BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` (about 4 characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def header_budget(model: str) -> int:
+    """Token budget of the module header in the prompts sent to `model`."""
+    if 'PROCESSOR_CI_HEADER_TOKENS' in os.environ:
+        return DEFAULT_HEADER_TOKEN_BUDGET
+    for family, budget in HEADER_TOKEN_BUDGETS.items():
+        if model.startswith(family):
+            return budget
+    return DEFAULT_HEADER_TOKEN_BUDGET
+
+
+def _trailing_comments(header: str) -> dict[str, str]:
+    """Maps each port to the `//` comment at the end of its line."""
+    comments = {}
+    for line in header.splitlines():
+        m = LINE_COMMENT_RE.search(line)
+        if not m:
+            continue
+        names = re.findall(r'[A-Za-z_]\w*', line[: m.start()])
+        comment = ' '.join(m.group(1).split())
+        if names and comment:
+            if len(comment) > MAX_COMMENT_CHARS:
+                comment = comment[: MAX_COMMENT_CHARS - 3].rstrip() + '...'
+            comments[names[-1]] = comment
+    return comments
+
+
+def _render(module_name, params, ports, comments, body, omitted) -> str:
+    lines = [f'module {module_name}']
+    if params:
+        lines[0] += ' #('
+        lines += [f'  parameter {name} = {value},' for name, value in params]
+        lines[-1] = lines[-1].rstrip(',')
+        lines.append(') (')
+    else:
+        lines[0] += ' ('
+
+    for i, (direction, name, _, range_str) in enumerate(ports):
+        range_str = ''.join(range_str.split())
+        line = '  ' + ' '.join(p for p in (direction, range_str, name) if p)
+        if i < len(ports) - 1 or omitted:
+            line += ','
+        if name in comments:
+            line += f' // {comments[name]}'
+        lines.append(line)
+    if omitted:
+        lines.append(f'  // ... {omitted} more ports omitted')
+    lines.append(');')
+    if body:
+        lines.append(body)
+    return '\n'.join(lines)
+
+
+def compact_header(
+    header: str, max_tokens: int | None = None, keep_body: bool = False
+) -> str:
+    """
+    Rewrites the module header extracted by `process_verilog` as a dense
+    port table for the LLM prompts: one `direction range name` line per
+    port, with short trailing comments, no alignment whitespace and (unless
+    `keep_body`) none of the module body lines that follow the header.
+
+    When the result exceeds `max_tokens`, the body, the comments and the
+    parameters are dropped, in this order, and finally the ports (debug,
+    trace and interrupt ports first). Headers that cannot be parsed only
+    lose comments and extra whitespace.
+    """
+    comments = _trailing_comments(header)
+    code = BLOCK_COMMENT_RE.sub('', LINE_COMMENT_RE.sub('', header))
+
+    try:
+        module_name, params, ports = parse_module_ports(code)
+    except ValueError:
+        ports = []
+
+    if not ports:
+        compact = '\n'.join(
+            ' '.join(line.split())
+            for line in code.splitlines()
+            if line.strip()
+        )
+        if max_tokens is not None:
+            compact = compact[: max_tokens * CHARS_PER_TOKEN]
+        return compact
+
+    body = ''
+    if keep_body:
+        end = module_header_end(code)
+        body = '\n'.join(
+            ' '.join(line.split())
+            for line in code[end:].splitlines()
+            if line.strip()
+        )
+
+    def fits(text: str) -> bool:
+        return max_tokens is None or estimate_tokens(text) <= max_tokens
+
+    compact = _render(module_name, params, ports, comments, body, 0)
+    for degrade in ('body', 'comments', 'params'):
+        if fits(compact):
+            return compact
+        if degrade == 'body':
+            body = ''
+        elif degrade == 'comments':
+            comments = {}
+        else:
+            params = []
+        compact = _render(module_name, params, ports, comments, body, 0)
+
+    # Remove portas de baixa prioridade primeiro, preservando a ordem
+    ranked = sorted(
+        range(len(ports)),
+        key=lambda i: (not LOW_PRIORITY_PORT_RE.search(ports[i][1]), -i),
+    )
+    removed = set()
+    while not fits(compact) and len(removed) < len(ports) - 1:
+        removed.add(ranked[len(removed)])
+        kept = [p for i, p in enumerate(ports) if i not in removed]
+        compact = _render(module_name, params, kept, {}, '', len(removed))
+
+    return compact
@@ -1,17 +1,99 @@
 import re
 import ast
 import json
+import string
+import asyncio
 import logging
-from core import send_prompt
+import collections
+from core import run_async, send_prompt, send_prompt_async
+from core.cache import get_response_cache
+from core.json_stream import extract_balanced_braces
+from core.connection_mapper import connection_keys, describe_signals
 from core.prompts import (
     wishbone_prompt,
     ahb_prompt,
     axi_prompt,
     find_interface_prompt,
+    partial_connection_prompt,
 )
 
 logger = logging.getLogger(__name__)
 
+CONNECTIONS_MARKER_RE = re.compile(r'Connections\s*:\s*{')
+INTERFACE_KEYS = {'bus_type', 'memory_interface'}
+# Temperatura das amostras de conexão (self-consistency)
+SAMPLE_TEMPERATURE = 0.7
+
+# Esquema JSON para saída estruturada (parâmetro `format` do Ollama)
+INTERFACE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'bus_type': {'enum': ['AHB', 'AXI', 'Avalon', 'Wishbone', 'Custom']},
+        'memory_interface': {'enum': ['Single', 'Dual']},
+    },
+    'required': ['bus_type', 'memory_interface'],
+}
+
+
+def static_prefix(template: str) -> str:
+    """
+    Returns the fixed text of a prompt template, up to its first
+    placeholder. It is byte-identical in every prompt built from the
+    template, so Ollama can reuse its evaluation across calls.
+    """
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        parts.append(literal)
+        if field is not None:
+            break
+    return ''.join(parts)
+
+
+def connection_schema(interface_info, keys=None) -> dict:
+    """
+    JSON schema of the connection answer: a flat map from wrapper signals
+    (Wishbone signals, or adapter signals for AHB/AXI) to a processor
+    signal, an expression or null. `keys` restricts it to some signals.
+    """
+    if keys is None:
+        keys = connection_keys(interface_info)
+    else:
+        keys = list(keys)
+
+    return {
+        'type': 'object',
+        'properties': {
+            key: {'anyOf': [{'type': 'string'}, {'type': 'null'}]}
+            for key in keys
+        },
+        'required': keys,
+        'additionalProperties': False,
+    }
+
+
+def connections_complete(text: str) -> bool:
+    """
+    Early-stop predicate for streamed connection answers: the JSON after
+    the `Connections:` marker is complete and parseable.
+    """
+    if not CONNECTIONS_MARKER_RE.search(text):
+        return False
+    return filter_connections_from_response(text) is not None
+
+
+def connections_parseable(text: str) -> bool:
+    """Tells whether a connection answer (with or without marker) parses."""
+    return filter_connections_from_response(text) is not None
+
+
+def interface_complete(text: str) -> bool:
+    """
+    Early-stop predicate for streamed interface answers: the last JSON
+    object is complete and holds both expected keys.
+    """
+    ok, parsed = filter_processor_interface_from_response(text)
+    return ok and INTERFACE_KEYS <= parsed.keys()
+
 
 def filter_connections_from_response(response):
     def clean_json_block(block: str):
@@ -23,20 +105,8 @@ def filter_connections_from_response(response):
         block = re.sub(r',\s*([}\]])', r'\1', block)
         return block.strip()
 
-    def extract_balanced_braces(text, start_index):
-        """Extrai um bloco com chaves balanceadas a partir do primeiro '{'."""
-        brace_count = 0
-        for i, ch in enumerate(text[start_index:], start=start_index):
-            if ch == '{':
-                brace_count += 1
-            elif ch == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    return text[start_index : i + 1]
-        return None  # não encontrou fechamento
-
     # Encontrar início do JSON
-    match = re.search(r'Connections\s*:\s*{', response)
+    match = CONNECTIONS_MARKER_RE.search(response)
     if match:
         start_index = response.find('{', match.start())
     else:
@@ -87,42 +157,304 @@ def filter_connections_from_response(response):
     return connections
 
 
-def connect_interfaces(
-    interface_info, processor_interface, model='qwen2.5:32b'
-):
+def build_connection_prompt(interface_info, processor_interface) -> str:
+    """Builds the connection prompt for the detected bus type."""
     if interface_info['bus_type'] == 'Wishbone':
-        prompt = wishbone_prompt.format(
-            processor_interface=processor_interface,
-            memory_interface=interface_info['memory_interface'],
-        )
+        template = wishbone_prompt
     elif interface_info['bus_type'] == 'AHB':
-        prompt = ahb_prompt.format(
-            processor_interface=processor_interface,
-            memory_interface=interface_info['memory_interface'],
-        )
+        template = ahb_prompt
     elif interface_info['bus_type'] == 'AXI':
-        prompt = axi_prompt.format(
-            processor_interface=processor_interface,
-            memory_interface=interface_info['memory_interface'],
-        )
+        template = axi_prompt
     else:
         logger.debug('Defaulting to Wishbone.')
-        prompt = wishbone_prompt.format(
-            processor_interface=processor_interface,
-            memory_interface=interface_info['memory_interface'],
-        )
+        template = wishbone_prompt
+
+    return template.format(
+        processor_interface=processor_interface,
+        memory_interface=interface_info['memory_interface'],
+    )
 
-    logger.debug(f'Consulting model {model} for interface connections...')
 
-    success, response = send_prompt(prompt, model=model)
+def _remaining_keys(interface_info, resolved) -> list[str]:
+    return [k for k in connection_keys(interface_info) if k not in resolved]
 
+
+def build_partial_connection_prompt(
+    interface_info, processor_interface, resolved
+) -> str:
+    """
+    Builds a short connection prompt asking only for the wrapper signals
+    that are not in `resolved` (connections already made by name).
+    """
+    remaining = _remaining_keys(interface_info, resolved)
+    return partial_connection_prompt.format(
+        bus_type=interface_info['bus_type'],
+        memory_interface=interface_info['memory_interface'],
+        resolved='\n'.join(
+            f'- {key}: {value}' for key, value in resolved.items()
+        ),
+        remaining=describe_signals(interface_info, remaining),
+        processor_interface=processor_interface,
+    )
+
+
+def _connection_request(interface_info, processor_interface, resolved):
+    """Returns the prompt and the JSON schema of a connection request."""
+    if not resolved:
+        return (
+            build_connection_prompt(interface_info, processor_interface),
+            connection_schema(interface_info),
+        )
+    return (
+        build_partial_connection_prompt(
+            interface_info, processor_interface, resolved
+        ),
+        connection_schema(
+            interface_info, _remaining_keys(interface_info, resolved)
+        ),
+    )
+
+
+def _merge_resolved(connections, resolved):
+    """Connections made by name take precedence over the model answer."""
+    if connections is None or not resolved:
+        return connections
+    return {**connections, **resolved}
+
+
+def _cached_connections(prompt, model, use_cache, options=None, format=None):
+    cache = get_response_cache() if use_cache else None
+    if cache:
+        cached = cache.get(model, prompt, options, format)
+        if cached is not None:
+            connections = filter_connections_from_response(cached)
+            if connections is not None:
+                logger.info('Using cached response for interface connections.')
+                return cache, connections
+    return cache, None
+
+
+def connections_cached(
+    interface_info,
+    processor_interface,
+    model='qwen2.5:32b',
+    structured=False,
+    resolved=None,
+    samples=1,
+):
+    """
+    Whether `connect_interfaces` (or every answer of `sample_connections`,
+    when `samples` > 1) would come from the response cache. The lookup is
+    not counted as a cache hit or miss.
+    """
+    prompt, schema = _connection_request(
+        interface_info, processor_interface, resolved
+    )
+    format = schema if structured else None
+    cache = get_response_cache()
+    seeds = range(samples) if samples > 1 else [None]
+    for seed in seeds:
+        options = None if seed is None else _sample_options(seed)
+        cached = cache.peek(model, prompt, options, format)
+        if cached is None or filter_connections_from_response(cached) is None:
+            return False
+    return True
+
+
+def _parse_connections(
+    success, response, prompt, model, cache, options=None, format=None
+):
     logger.debug(f'Ollama response for connection: \n{response}\n\n')
 
     if not success:
         logger.error('Error communicating with the server.')
         return None
 
-    return filter_connections_from_response(response)
+    connections = filter_connections_from_response(response)
+
+    # Só respostas válidas são armazenadas, para não repetir respostas ruins
+    if cache and connections is not None:
+        cache.put(model, prompt, response, options, format)
+
+    return connections
+
+
+def connect_interfaces(
+    interface_info,
+    processor_interface,
+    model='qwen2.5:32b',
+    use_cache=True,
+    stream=False,
+    structured=False,
+    resolved=None,
+    options=None,
+):
+    """
+    Asks the model how the processor ports connect to the wrapper.
+
+    `resolved` holds connections already made by name (see
+    `core.connection_mapper`); when given, only the remaining wrapper
+    signals are asked for, with a much shorter prompt. `options` are passed
+    to the model (e.g. temperature and seed of a sample).
+    """
+    prompt, schema = _connection_request(
+        interface_info, processor_interface, resolved
+    )
+
+    format = schema if structured else None
+    cache, connections = _cached_connections(
+        prompt, model, use_cache, options, format
+    )
+    if connections is not None:
+        return _merge_resolved(connections, resolved)
+
+    logger.debug(f'Consulting model {model} for interface connections...')
+
+    success, response = send_prompt(
+        prompt,
+        model=model,
+        stop_when=connections_complete if stream else None,
+        format=format,
+        options=options,
+        stage='connections',
+        accept=connections_parseable,
+    )
+
+    connections = _parse_connections(
+        success, response, prompt, model, cache, options, format
+    )
+    return _merge_resolved(connections, resolved)
+
+
+async def connect_interfaces_async(
+    interface_info,
+    processor_interface,
+    model='qwen2.5:32b',
+    use_cache=True,
+    stream=False,
+    structured=False,
+    resolved=None,
+    options=None,
+):
+    """Asynchronous counterpart of `connect_interfaces`."""
+    prompt, schema = _connection_request(
+        interface_info, processor_interface, resolved
+    )
+
+    format = schema if structured else None
+    cache, connections = _cached_connections(
+        prompt, model, use_cache, options, format
+    )
+    if connections is not None:
+        return _merge_resolved(connections, resolved)
+
+    logger.debug(f'Consulting model {model} for interface connections...')
+
+    success, response = await send_prompt_async(
+        prompt,
+        model=model,
+        stop_when=connections_complete if stream else None,
+        format=format,
+        options=options,
+        stage='connections',
+        accept=connections_parseable,
+    )
+
+    connections = _parse_connections(
+        success, response, prompt, model, cache, options, format
+    )
+    return _merge_resolved(connections, resolved)
+
+
+def _normalize_connection(value):
+    """Canonical form of a connection value, so equal answers vote together."""
+    if value is None:
+        return None
+    value = re.sub(r'\s+', ' ', str(value)).strip()
+    if value in ('', 'null', 'None'):
+        return None
+    return value
+
+
+def vote_connections(samples: list[dict]) -> tuple[dict, dict]:
+    """
+    Per-signal majority vote over several connection answers.
+
+    A signal missing from an answer counts as a vote for leaving it open
+    (None). Ties keep the value of the earliest sample.
+
+    Returns:
+        tuple: (connections, agreement), where `agreement` maps each signal
+               to the fraction of samples that voted for the chosen value.
+    """
+    keys = list(dict.fromkeys(key for sample in samples for key in sample))
+    connections = {}
+    agreement = {}
+    for key in keys:
+        votes = collections.Counter(
+            _normalize_connection(sample.get(key)) for sample in samples
+        )
+        value, count = votes.most_common(1)[0]
+        connections[key] = value
+        agreement[key] = count / len(samples)
+    return connections, agreement
+
+
+def _sample_options(seed: int) -> dict:
+    return {'temperature': SAMPLE_TEMPERATURE, 'seed': seed}
+
+
+async def sample_connections_async(
+    interface_info,
+    processor_interface,
+    model='qwen2.5:32b',
+    samples=5,
+    use_cache=True,
+    stream=False,
+    structured=False,
+    resolved=None,
+):
+    """
+    Self-consistency: asks for `samples` connection answers at once (with
+    different seeds) and keeps the per-signal majority.
+
+    Returns:
+        tuple: (connections, agreement) as in `vote_connections`, or
+               (None, {}) if no answer could be parsed.
+    """
+    results = await asyncio.gather(
+        *(
+            connect_interfaces_async(
+                interface_info,
+                processor_interface,
+                model,
+                use_cache=use_cache,
+                stream=stream,
+                structured=structured,
+                resolved=resolved,
+                options=_sample_options(seed),
+            )
+            for seed in range(samples)
+        ),
+        return_exceptions=True,
+    )
+
+    valid = []
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f'Connection sample failed: {result!r}')
+        elif result is not None:
+            valid.append(result)
+
+    logger.info(f'{len(valid)} of {samples} connection samples were valid.')
+    if not valid:
+        return None, {}
+    return vote_connections(valid)
+
+
+def sample_connections(*args, **kwargs):
+    """Synchronous entry point of `sample_connections_async`."""
+    return run_async(sample_connections_async(*args, **kwargs))
 
 
 def filter_processor_interface_from_response(response: str) -> str:
@@ -173,27 +505,83 @@ def filter_processor_interface_from_response(response: str) -> str:
             return False, {}
 
     # --- 4. Keep only expected keys ---
-    allowed_keys = {'bus_type', 'memory_interface'}
-    filtered = {k: parsed[k] for k in allowed_keys if k in parsed}
+    filtered = {k: parsed[k] for k in INTERFACE_KEYS if k in parsed}
 
     return True, filtered
 
 
-def extract_interface_and_memory_ports(core_declaration, model='qwen2.5:32b'):
+def build_interface_prompt(core_declaration) -> str:
+    """Builds the bus interface detection prompt."""
+    return find_interface_prompt.format(core_declaration=core_declaration)
 
-    prompt = find_interface_prompt.format(core_declaration=core_declaration)
 
-    logger.debug(
-        f'Consulting model {model} to identify the processor interface...'
-    )
+def _cached_interface(prompt, model, use_cache, format=None):
+    cache = get_response_cache() if use_cache else None
+    if cache:
+        cached = cache.get(model, prompt, format=format)
+        if cached is not None:
+            ok, json_info = filter_processor_interface_from_response(cached)
+            if ok and 'bus_type' in json_info:
+                logger.info('Using cached response for interface detection.')
+                return cache, json_info
+    return cache, None
+
+
+def cached_interface(core_declaration, model='qwen2.5:32b', structured=False):
+    """
+    Answer of `extract_interface_and_memory_ports` already in the response
+    cache, or None. The lookup is not counted as a cache hit or miss.
+    """
+    prompt = build_interface_prompt(core_declaration)
+    format = INTERFACE_SCHEMA if structured else None
+    cached = get_response_cache().peek(model, prompt, format=format)
+    if cached is None:
+        return None
+    ok, json_info = filter_processor_interface_from_response(cached)
+    return json_info if ok and 'bus_type' in json_info else None
 
-    success, response = send_prompt(prompt, model=model)
 
+def _parse_interface(success, response, prompt, model, cache, format=None):
     logger.debug(f'Ollama response for interface extraction: \n{response}\n\n')
 
     if not success:
         logger.error('Error communicating with the server.')
-        return None
+        return False, {}
 
     ok, json_info = filter_processor_interface_from_response(response)
+
+    if cache and ok and 'bus_type' in json_info:
+        cache.put(model, prompt, response, format=format)
+
     return ok, json_info
+
+
+def extract_interface_and_memory_ports(
+    core_declaration,
+    model='qwen2.5:32b',
+    use_cache=True,
+    stream=False,
+    structured=False,
+):
+
+    prompt = build_interface_prompt(core_declaration)
+
+    format = INTERFACE_SCHEMA if structured else None
+    cache, json_info = _cached_interface(prompt, model, use_cache, format)
+    if json_info is not None:
+        return True, json_info
+
+    logger.debug(
+        f'Consulting model {model} to identify the processor interface...'
+    )
+
+    success, response = send_prompt(
+        prompt,
+        model=model,
+        stop_when=interface_complete if stream else None,
+        format=format,
+        stage='interface',
+        accept=interface_complete,
+    )
+
+    return _parse_interface(success, response, prompt, model, cache, format)
@@ -0,0 +1,42 @@
+class BraceScanner:
+    """
+    Incremental balanced-brace detector.
+
+    Text is fed in chunks (e.g. tokens from a streaming generation) and
+    every top-level `{ ... }` block is reported as soon as its closing brace
+    arrives, without rescanning what was already seen.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.start = None
+        self.pos = 0
+
+    def feed(self, chunk: str) -> list[tuple[int, int]]:
+        """
+        Consumes a chunk of text.
+
+        Returns:
+            list: (start, end) offsets, relative to all text fed so far, of
+                  the top-level blocks closed by this chunk.
+        """
+        closed = []
+        for i, ch in enumerate(chunk, start=self.pos):
+            if ch == '{':
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif ch == '}' and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    closed.append((self.start, i + 1))
+        self.pos += len(chunk)
+        return closed
+
+
+def extract_balanced_braces(text: str, start_index: int) -> str | None:
+    """Extrai um bloco com chaves balanceadas a partir do primeiro '{'."""
+    scanner = BraceScanner()
+    for start, end in scanner.feed(text[start_index:]):
+        return text[start_index + start : start_index + end]
+    return None  # não encontrou fechamento
@@ -0,0 +1,111 @@
+import os
+import json
+import fcntl
+import logging
+import tempfile
+import threading
+import functools
+import collections
+from core import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Amostras mantidas por modelo e etapa
+WINDOW = 200
+# Amostras necessárias antes de estimar percentis
+MIN_SAMPLES = 5
+
+
+class LatencyTracker:
+    """
+    Keeps the latest LLM request latencies per model and pipeline stage
+    (e.g. `interface`, `connections`) and estimates their percentiles.
+
+    Samples live in memory; `save()` merges the ones recorded since the
+    last save into `path`, so the next run starts with the observed
+    distribution instead of an empty one.
+    """
+
+    def __init__(self, path: str | None = None, window: int = WINDOW):
+        self.path = path
+        self.window = window
+        self._samples = collections.defaultdict(
+            lambda: collections.deque(maxlen=self.window)
+        )
+        # Amostras ainda não gravadas em `path`
+        self._unsaved = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(model: str, stage: str) -> str:
+        return f'{model}/{stage}'
+
+    def record(self, model: str, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[self._key(model, stage)].append(seconds)
+            self._unsaved[self._key(model, stage)].append(seconds)
+
+    def percentile(self, model: str, stage: str, q: float) -> float | None:
+        """
+        Returns the `q` percentile (0-100) of the latencies of `model` in
+        `stage`, or None while fewer than `MIN_SAMPLES` were observed.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(self._key(model, stage), ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, round(q / 100 * (len(samples) - 1)))
+        return samples[index]
+
+    def _read(self) -> dict[str, list[float]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f'Could not read latency history {self.path}: {e}')
+            return {}
+        return {
+            key: [float(s) for s in samples] for key, samples in data.items()
+        }
+
+    def load(self) -> None:
+        data = self._read()
+        with self._lock:
+            for key, samples in data.items():
+                self._samples[key].extend(samples)
+
+    def save(self) -> None:
+        """
+        Adds the samples recorded since the last save to `path` (if one
+        was given), keeping the latest `window` per key. The file is
+        re-read under a lock, so concurrent processes (e.g. batch workers)
+        do not drop each other's samples.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            unsaved = {key: list(s) for key, s in self._unsaved.items()}
+            self._unsaved.clear()
+        if not unsaved:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            for key, samples in unsaved.items():
+                data[key] = (data.get(key, []) + samples)[-self.window :]
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_latency_tracker() -> LatencyTracker:
+    """Returns the process-wide latency tracker."""
+    return LatencyTracker(os.path.join(CACHE_DIR, 'llm_latency.json'))
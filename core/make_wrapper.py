@@ -156,24 +156,7 @@ def _split_top_level_commas(s: str):
     return parts
 
 
-def generate_instance(
-    code: str,
-    mapping: dict,
-    second_memory: bool = False,
-    instance_name: str = 'u_instancia',
-    use_adapter: bool = False,
-):
-    """
-    Gera uma instância Verilog/SystemVerilog a partir de um `module` (com suporte a parâmetros).
-    - mapping pode conter:
-        * mapping[local_name] = module_port_name  (ex.: 'sys_clk':'clk')
-        * mapping[module_port_name] = "<expr>"    (ex.: 'core_sel': "4'b1111")
-      Valores None são ignorados.
-    - Entradas sem match -> 1'b0
-    - Entradas terminadas em _en ou _valid -> 1'b1
-    - Debug/trace inputs -> 1'b0
-    - Saídas/inout sem match -> ()
-    """
+def _find_module_header(code: str) -> re.Match:
     # localizar module <name> #( ... )? ( ... ) ;
     header_pat = re.compile(
         r'\bmodule\s+([A-Za-z_]\w*)'  # nome do módulo
@@ -187,6 +170,25 @@ def generate_instance(
         raise ValueError(
             'Unable to locate module header (module ... #( ... )? ( ... );).'
         )
+    return m
+
+
+def module_header_end(code: str) -> int:
+    """
+    Posição logo após o `;` que fecha o cabeçalho localizado por
+    `parse_module_ports`, isto é, onde começa o corpo do módulo.
+    """
+    return _find_module_header(code).end()
+
+
+def parse_module_ports(code: str):
+    """
+    Localiza o cabeçalho `module <name> #( ... )? ( ... );` e extrai o nome,
+    os parâmetros [(nome, valor)] e as portas
+    [(direção, nome, largura, range)], onde `range` é o texto original do
+    intervalo (ex.: '[ADDR_WIDTH-1:0]') ou '' para portas de 1 bit.
+    """
+    m = _find_module_header(code)
 
     module_name = m.group(1)
     params_block = m.group('params') or ''
@@ -196,12 +198,6 @@ def generate_instance(
     # parse parâmetros (parameter ...)
     # -----------------------
     params = parse_parameters(params_block)
-    # params = []
-    # if params_block:
-    #     for pname, pval in re.findall(
-    #         r'parameter\s+([A-Za-z_]\w*)\s*=\s*([^,)+]+)', params_block
-    #     ):
-    #         params.append((pname.strip(), pval.strip()))
 
     # -----------------------
     # parse portas
@@ -209,6 +205,7 @@ def generate_instance(
     chunks = _split_top_level_commas(ports_block)
     ports = []
     current_dir = None
+    current_range = ''
 
     for chunk in chunks:
         s = chunk.strip()
@@ -219,6 +216,7 @@ def generate_instance(
         dm = re.match(r'^(input|output|inout)\b(.*)$', s, re.IGNORECASE)
         if dm:
             current_dir = dm.group(1).lower()
+            current_range = ''
             rest = dm.group(2).strip()
         else:
             if current_dir is None:
@@ -232,6 +230,11 @@ def generate_instance(
         for range_str, name in matches:
             if name.lower() in TYPE_WORDS:
                 continue
+            # `output [7:0] a, b`: b herda o range da declaração
+            if range_str:
+                current_range = range_str
+            else:
+                range_str = current_range
             # calcula largura
             if range_str:
                 m = re.match(r'\[(\d+)\s*:\s*(\d+)\]', range_str)
@@ -243,7 +246,39 @@ def generate_instance(
                     width = 1
             else:
                 width = 1
-            ports.append((current_dir, name, width))
+            ports.append((current_dir, name, width, range_str))
+
+    return module_name, params, ports
+
+
+def parse_module_header(code: str):
+    """
+    Localiza o cabeçalho `module <name> #( ... )? ( ... );` e extrai o nome,
+    os parâmetros [(nome, valor)] e as portas [(direção, nome, largura)].
+    """
+    module_name, params, ports = parse_module_ports(code)
+    return module_name, params, [port[:3] for port in ports]
+
+
+def generate_instance(
+    code: str,
+    mapping: dict,
+    second_memory: bool = False,
+    instance_name: str = 'u_instancia',
+    use_adapter: bool = False,
+):
+    """
+    Gera uma instância Verilog/SystemVerilog a partir de um `module` (com suporte a parâmetros).
+    - mapping pode conter:
+        * mapping[local_name] = module_port_name  (ex.: 'sys_clk':'clk')
+        * mapping[module_port_name] = "<expr>"    (ex.: 'core_sel': "4'b1111")
+      Valores None são ignorados.
+    - Entradas sem match -> 1'b0
+    - Entradas terminadas em _en ou _valid -> 1'b1
+    - Debug/trace inputs -> 1'b0
+    - Saídas/inout sem match -> ()
+    """
+    module_name, params, ports = parse_module_header(code)
 
     # -----------------------
     # lógica de sinais não mapeados
@@ -1,7 +1,8 @@
 import os
-import re
 import logging
 from typing import List, Dict, Set
+from core.graph import DependencyGraph
+from core.hdl_index import file_facts
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +45,7 @@ def _is_pkg_file(path: str) -> bool:
 
 
 def _order_sv_files(
-    files: List[str], repo_root: str | None = None
+    files: List[str], repo_root: str | None = None, use_index: bool = True
 ) -> List[str]:
     """
     Order SystemVerilog files based on dependencies.
@@ -64,49 +65,16 @@ def _order_sv_files(
         indexed.sort(key=lambda t: (0 if _is_pkg_file(t[1]) else 1, t[0]))
         return [f for _i, f in indexed]
 
-    logger.debug(f'Ordering {len(files)} files with repo_root: {repo_root}')
-
-    pkg_decl_re = re.compile(
-        r'^\s*package\s+(\w+)\s*;', re.MULTILINE | re.IGNORECASE
-    )
-    import_re = re.compile(
-        r'^\s*import\s+([a-zA-Z_]\w*)\s*::\s*\*\s*;',
-        re.MULTILINE | re.IGNORECASE,
-    )
-    import_list_re = re.compile(
-        r'^\s*import\s+([^;]+);', re.MULTILINE | re.IGNORECASE
-    )
-    namespace_ref_re = re.compile(
-        r'\b([a-zA-Z_]\w+)::[a-zA-Z_]\w+', re.MULTILINE
-    )
-    ifdef_error_re = re.compile(
-        r'^\s*`ifdef\s+(\w+)\s*\n\s*`error', re.MULTILINE | re.IGNORECASE
-    )
-    define_re = re.compile(
-        r'^\s*`define\s+(\w+)', re.MULTILINE | re.IGNORECASE
-    )
+    ordered = _sv_dependency_graph(files, repo_root, use_index).order()
+    logger.debug(f'File ordering complete: {len(ordered)} files ordered')
+    return ordered
 
-    # Regex to detect module declarations
-    module_decl_re = re.compile(
-        r'^\s*module\s+([a-zA-Z_]\w*)', re.MULTILINE | re.IGNORECASE
-    )
-    # Regex to detect module instantiations - simpler pattern that catches "ModuleName #(" or "ModuleName instanceName ("
-    # This handles cases where #( is on the same line or next line
-    module_inst_re = re.compile(
-        r'^\s*([a-zA-Z_]\w+)\s+(?:#\s*\(|([a-zA-Z_]\w+)\s*\()', re.MULTILINE
-    )
 
-    def _read(file_path: str) -> str:
-        try:
-            # Handle both absolute and relative paths
-            if os.path.isabs(file_path):
-                path = file_path
-            else:
-                path = os.path.join(repo_root, file_path)
-            with open(path, 'r', encoding='utf-8', errors='ignore') as fh:
-                return fh.read()
-        except Exception as e:
-            return ''
+def _sv_dependency_graph(
+    files: List[str], repo_root: str, use_index: bool = True
+) -> DependencyGraph:
+    """Builds the dependency graph used by `_order_sv_files`."""
+    logger.debug(f'Ordering {len(files)} files with repo_root: {repo_root}')
 
     file_to_imports: Dict[str, Set[str]] = {f: set() for f in files}
     file_to_module_instantiations: Dict[str, Set[str]] = {
@@ -117,34 +85,35 @@ def _order_sv_files(
     define_to_file: Dict[str, str] = {}
     file_to_forbidden_defines: Dict[str, Set[str]] = {f: set() for f in files}
 
+    # Declarações e referências de cada arquivo, do índice do repositório
+    facts = file_facts(files, repo_root, use_index=use_index)
+
     # First pass: detect module declarations, package declarations and defines
     for f in files:
-        text = _read(f)
-        if not text:
+        info = facts[f]
+        if info['empty']:
             logger.debug(f'Could not read file: {f}')
             continue
 
-        # Detect module declarations
-        for m in module_decl_re.finditer(text):
-            module_name = m.group(1)
+        # Detect module declarations (only the first one per file)
+        module_name = info['sv_module']
+        if module_name:
             module_to_file[module_name] = f
             logger.debug(
                 f"Found module '{module_name}' in {os.path.basename(f)}"
             )
-            break  # Only take the first module declaration per file
 
-        for m in pkg_decl_re.finditer(text):
-            pkg_to_file[m.group(1)] = f
+        if info['sv_package']:
+            pkg_to_file[info['sv_package']] = f
             logger.debug(
-                f"Found package '{m.group(1)}' in {os.path.basename(f)}"
+                f"Found package '{info['sv_package']}' in "
+                f'{os.path.basename(f)}'
             )
-            break
 
-        for m in define_re.finditer(text):
-            define_to_file[m.group(1)] = f
+        for define in info['sv_defines']:
+            define_to_file[define] = f
 
-        for m in ifdef_error_re.finditer(text):
-            file_to_forbidden_defines[f].add(m.group(1))
+        file_to_forbidden_defines[f].update(info['sv_forbidden_defines'])
 
     logger.debug(
         f'Detected {len(module_to_file)} modules: {list(module_to_file.keys())}'
@@ -155,75 +124,31 @@ def _order_sv_files(
 
     # Second pass: detect imports, module instantiations, and dependencies
     for f in files:
-        text = _read(f)
-        if not text:
+        info = facts[f]
+        if info['empty']:
             continue
 
         # Detect package imports
-        for m in import_re.finditer(text):
-            file_to_imports[f].add(m.group(1))
-
-        for m in import_list_re.finditer(text):
-            for seg in m.group(1).split(','):
-                seg = seg.strip()
-                if '::' in seg:
-                    pkg = seg.split('::', 1)[0].strip()
-                    if re.match(r'^[a-zA-Z_]\w*$', pkg):
-                        file_to_imports[f].add(pkg)
-
-        for m in namespace_ref_re.finditer(text):
-            pkg = m.group(1)
-            if pkg in pkg_to_file:
-                file_to_imports[f].add(pkg)
+        file_to_imports[f].update(info['sv_imports'])
+        file_to_imports[f].update(
+            pkg for pkg in info['sv_namespaces'] if pkg in pkg_to_file
+        )
 
         # Detect module instantiations
         # Need to handle multi-line instantiations like:
         #   ModuleName #(
         #       params
         #   ) instance_name (
-        # Strategy: Look for "ModuleName" followed by either "#(" or "instance_name ("
-        # where ModuleName matches a known module
-        keywords = {
-            'module',
-            'endmodule',
-            'if',
-            'else',
-            'case',
-            'for',
-            'while',
-            'initial',
-            'always',
-            'always_comb',
-            'always_ff',
-            'assign',
-            'logic',
-            'reg',
-            'wire',
-            'input',
-            'output',
-            'inout',
-            'parameter',
-            'localparam',
-            'function',
-            'task',
-            'generate',
-            'endgenerate',
-            'begin',
-            'end',
-            'return',
-        }
-
-        # Simple approach: look for lines that start with a module name followed by whitespace and either # or an identifier
-        for module_name in module_to_file.keys():
-            # Pattern: start of line, optional whitespace, module name, whitespace, then either #( or identifier (
-            pattern = rf'^\s*{re.escape(module_name)}\s+(?:#|\w+\s*\()'
-            if re.search(pattern, text, re.MULTILINE):
-                # Make sure it's not the module declaration itself
-                if module_to_file[module_name] != f:
-                    file_to_module_instantiations[f].add(module_name)
-                    logger.debug(
-                        f"{os.path.basename(f)} instantiates module '{module_name}'"
-                    )
+        # Lines starting with an identifier followed by either "#" or
+        # "instance_name (" are candidates; the known modules among them
+        # are instantiations
+        for module_name in module_to_file.keys() & set(info['sv_instances']):
+            # Make sure it's not the module declaration itself
+            if module_to_file[module_name] != f:
+                file_to_module_instantiations[f].add(module_name)
+                logger.debug(
+                    f"{os.path.basename(f)} instantiates module '{module_name}'"
+                )
 
         if file_to_imports[f]:
             logger.debug(
@@ -242,18 +167,25 @@ def _order_sv_files(
     if top_modules:
         logger.debug(f'Top modules (never instantiated): {top_modules}')
 
-    nodes = list(files)
-    adj: Dict[str, Set[str]] = {f: set() for f in nodes}
-    indeg: Dict[str, int] = {f: 0 for f in nodes}
+    # Priority: packages (0) < regular modules (1) < top modules (2)
+    def get_priority(f):
+        if _is_pkg_file(f):
+            return 0
+        elif f in top_module_files:
+            return 2
+        else:
+            return 1
+
+    graph = DependencyGraph(
+        files, key=lambda f: (get_priority(f), graph.index[f])
+    )
 
     # Package dependency edges: provider → importer
     for f, imports in file_to_imports.items():
         for pkg in imports:
             provider = pkg_to_file.get(pkg)
             if provider and provider != f:
-                if f not in adj[provider]:
-                    adj[provider].add(f)
-                    indeg[f] += 1
+                graph.add_edge(provider, f)
 
     # Module instantiation edges: instantiated module → instantiating module
     # (the instantiated module must be compiled before the module that uses it)
@@ -261,9 +193,7 @@ def _order_sv_files(
         for module_name in instantiated_modules:
             provider = module_to_file.get(module_name)
             if provider and provider != f:
-                if f not in adj[provider]:
-                    adj[provider].add(f)
-                    indeg[f] += 1
+                if graph.add_edge(provider, f):
                     logger.debug(
                         f'Dependency: {os.path.basename(provider)} must come before {os.path.basename(f)}'
                     )
@@ -273,49 +203,19 @@ def _order_sv_files(
         for define in forbidden:
             definer = define_to_file.get(define)
             if definer and definer != f:
-                if definer not in adj[f]:
-                    adj[f].add(definer)
-                    indeg[definer] += 1
-
-    # --- Topological sort (Kahn's algorithm) ---
-    # Priority: packages (0) < regular modules (1) < top modules (2)
-    def get_priority(f):
-        if _is_pkg_file(f):
-            return 0
-        elif f in top_module_files:
-            return 2
-        else:
-            return 1
+                graph.add_edge(f, definer)
 
-    index_map = {f: i for i, f in enumerate(nodes)}
-    zero_indeg = sorted(
-        [n for n in nodes if indeg[n] == 0],
-        key=lambda x: (get_priority(x), index_map[x]),
-    )
-    ordered: List[str] = []
-
-    while zero_indeg:
-        n = zero_indeg.pop(0)
-        ordered.append(n)
-        for m in sorted(adj[n], key=lambda x: index_map[x]):
-            indeg[m] -= 1
-            if indeg[m] == 0:
-                zero_indeg.append(m)
-                zero_indeg.sort(key=lambda x: (get_priority(x), index_map[x]))
-
-    if len(ordered) != len(nodes):
-        remaining = [n for n in nodes if n not in ordered]
+    for cycle in graph.cycles():
         logger.warning(
-            f'Topological sort incomplete: {len(remaining)} files have circular dependencies'
+            f'Circular dependency between {len(cycle)} files: '
+            + ', '.join(os.path.basename(f) for f in cycle)
         )
-        ordered.extend(sorted(remaining, key=lambda x: index_map[x]))
 
-    logger.debug(f'File ordering complete: {len(ordered)} files ordered')
-    return ordered
+    return graph
 
 
 def _order_vhdl_files(
-    files: List[str], repo_root: str | None = None
+    files: List[str], repo_root: str | None = None, use_index: bool = True
 ) -> List[str]:
     """
     Order VHDL files for GHDL compilation compatibility.
@@ -337,58 +237,20 @@ def _order_vhdl_files(
         indexed.sort(key=lambda t: (0 if _is_vhdl_pkg_file(t[1]) else 1, t[0]))
         return [f for _i, f in indexed]
 
+    ordered = _vhdl_dependency_graph(files, repo_root, use_index).order()
+    logger.info(f'VHDL file ordering complete: {len(ordered)} files')
+    logger.info(f'Compilation order: {[os.path.basename(f) for f in ordered]}')
+    return ordered
+
+
+def _vhdl_dependency_graph(
+    files: List[str], repo_root: str, use_index: bool = True
+) -> DependencyGraph:
+    """Builds the dependency graph used by `_order_vhdl_files`."""
     logger.info(
         f'Ordering {len(files)} VHDL files for GHDL compilation compatibility'
     )
 
-    # VHDL patterns (case-insensitive)
-    # Library declaration: library <name>;
-    library_decl_re = re.compile(
-        r'^\s*library\s+(\w+)\s*;', re.MULTILINE | re.IGNORECASE
-    )
-    # Package declaration: package <name> is
-    pkg_decl_re = re.compile(
-        r'^\s*package\s+(\w+)\s+is\b', re.MULTILINE | re.IGNORECASE
-    )
-    # Entity declaration: entity <name> is
-    entity_decl_re = re.compile(
-        r'^\s*entity\s+(\w+)\s+is\b', re.MULTILINE | re.IGNORECASE
-    )
-    # Architecture declaration: architecture <arch_name> of <entity_name> is
-    arch_decl_re = re.compile(
-        r'^\s*architecture\s+\w+\s+of\s+(\w+)\s+is\b',
-        re.MULTILINE | re.IGNORECASE,
-    )
-    # Use clause: use <library>.<package>.<item> or use <library>.<package>.all
-    use_clause_re = re.compile(
-        r'^\s*use\s+(\w+)\.(\w+)(?:\.(\w+))?', re.MULTILINE | re.IGNORECASE
-    )
-    # Component declaration: component <name> is (for instantiation detection)
-    component_re = re.compile(
-        r'^\s*component\s+(\w+)\b', re.MULTILINE | re.IGNORECASE
-    )
-    # Direct entity instantiation: <instance_name> : entity <library>.<entity_name>
-    entity_inst_re = re.compile(
-        r'^\s*\w+\s*:\s*entity\s+(\w+)\.(\w+)', re.MULTILINE | re.IGNORECASE
-    )
-    # Component instantiation: <instance_name> : <component_name> (port|generic) map
-    comp_inst_re = re.compile(
-        r'^\s*\w+\s*:\s*(\w+)\s+(?:port|generic)\s+map',
-        re.MULTILINE | re.IGNORECASE,
-    )
-
-    def _read(file_path: str) -> str:
-        try:
-            if os.path.isabs(file_path):
-                path = file_path
-            else:
-                path = os.path.join(repo_root, file_path)
-            with open(path, 'r', encoding='utf-8', errors='ignore') as fh:
-                return fh.read()
-        except Exception as e:
-            logger.debug(f'Could not read file {file_path}: {e}')
-            return ''
-
     # Data structures
     file_to_packages: Dict[str, Set[str]] = {
         f: set() for f in files
@@ -411,39 +273,38 @@ def _order_vhdl_files(
     # Track custom libraries (not ieee, std, work)
     custom_libraries: Set[str] = set()
 
+    # Declarações e referências de cada arquivo, do índice do repositório
+    facts = file_facts(files, repo_root, use_index=use_index)
+
     # First pass: detect package and entity declarations, and library declarations
     for f in files:
-        text = _read(f)
-        if not text:
+        info = facts[f]
+        if info['empty']:
             logger.debug(f'Could not read file: {f}')
             continue
 
         # Find library declarations (to detect custom libraries)
-        for m in library_decl_re.finditer(text):
-            lib_name = m.group(1).lower()
-            if lib_name not in ['ieee', 'std', 'work']:
-                custom_libraries.add(lib_name)
-                file_to_libraries[f].add(lib_name)
-
-        # Find package declarations
-        for m in pkg_decl_re.finditer(text):
-            pkg_name = m.group(1).lower()  # VHDL is case-insensitive
+        custom_libraries.update(info['vhdl_libraries'])
+        file_to_libraries[f].update(info['vhdl_libraries'])
+
+        # Find package declarations (usually one package per file)
+        pkg_name = info['vhdl_package']  # VHDL is case-insensitive
+        if pkg_name:
             pkg_to_file[pkg_name] = f
             file_to_declared_package[f] = pkg_name
             logger.debug(
-                f"Found package '{m.group(1)}' in {os.path.basename(f)}"
+                f"Found package '{pkg_name}' in {os.path.basename(f)}"
             )
-            break  # Usually one package per file
 
-        # Find entity declarations
-        for m in entity_decl_re.finditer(text):
-            entity_name = m.group(1).lower()
+        # Find entity declarations (usually one entity per file, the
+        # architecture can be in the same file)
+        entity_name = info['vhdl_entity']
+        if entity_name:
             entity_to_file[entity_name] = f
             file_to_declared_entity[f] = entity_name
             logger.debug(
-                f"Found entity '{m.group(1)}' in {os.path.basename(f)}"
+                f"Found entity '{entity_name}' in {os.path.basename(f)}"
             )
-            break  # Usually one entity per file (architecture can be in same file)
 
     logger.debug(
         f'Detected {len(pkg_to_file)} packages: {list(pkg_to_file.keys())}'
@@ -456,46 +317,29 @@ def _order_vhdl_files(
 
     # Second pass: detect dependencies (use clauses, instantiations)
     for f in files:
-        text = _read(f)
-        if not text:
+        info = facts[f]
+        if info['empty']:
             continue
 
-        # Find package dependencies via use clauses
-        for m in use_clause_re.finditer(text):
-            library = m.group(1).lower()
-            package = m.group(2).lower()
-
-            # Skip standard IEEE libraries
-            if library in ['ieee', 'std']:
-                continue
-
+        # Find package dependencies via use clauses (IEEE/std skipped)
+        for library, package in info['vhdl_uses']:
             # Track packages from work library or custom libraries
             if package in pkg_to_file:
                 # Store as "library.package" for better tracking
                 file_to_packages[f].add(f'{library}.{package}')
 
         # Find entity instantiations (direct entity instantiation)
-        for m in entity_inst_re.finditer(text):
-            library = m.group(1).lower()
-            entity = m.group(2).lower()
-
-            # Skip standard libraries
-            if library in ['ieee', 'std']:
-                continue
-
+        for entity in info['vhdl_entity_instances']:
             # Track entities from work or custom libraries
             if entity in entity_to_file:
                 file_to_entities_used[f].add(entity)
 
         # Find component instantiations
         # First collect component declarations in this file
-        components_in_file = set()
-        for m in component_re.finditer(text):
-            components_in_file.add(m.group(1).lower())
+        components_in_file = set(info['vhdl_components'])
 
         # Then find component instantiations
-        for m in comp_inst_re.finditer(text):
-            comp_name = m.group(1).lower()
+        for comp_name in info['vhdl_component_instances']:
             logger.debug(
                 f"{os.path.basename(f)}: Found instantiation of '{comp_name}'"
             )
@@ -531,11 +375,20 @@ def _order_vhdl_files(
             f'Top-level entities (not instantiated): {list(top_entities)}'
         )
 
+    # Priority: packages (0) < regular entities (1) < top entities (2)
+    def get_priority(f):
+        if _is_vhdl_pkg_file(f):
+            return 0
+        elif f in top_entity_files:
+            return 2
+        else:
+            return 1
+
     # Build dependency graph for GHDL compilation order
     # In GHDL: if file A depends on file B, then B must be compiled BEFORE A
-    nodes = list(files)
-    adj: Dict[str, Set[str]] = {f: set() for f in nodes}
-    indeg: Dict[str, int] = {f: 0 for f in nodes}
+    graph = DependencyGraph(
+        files, key=lambda f: (get_priority(f), graph.index[f])
+    )
 
     # Package dependency edges: package file must come BEFORE files that use it
     for f, packages in file_to_packages.items():
@@ -550,9 +403,7 @@ def _order_vhdl_files(
             if provider and provider != f:
                 # provider → f means f depends on provider
                 # So provider must be compiled first
-                if f not in adj[provider]:
-                    adj[provider].add(f)
-                    indeg[f] += 1
+                graph.add_edge(provider, f)
 
     # Entity instantiation edges: instantiated entity must come BEFORE instantiating entity
     for f, entities in file_to_entities_used.items():
@@ -561,46 +412,12 @@ def _order_vhdl_files(
             if provider and provider != f:
                 # provider → f means f instantiates provider
                 # So provider must be compiled first
-                if f not in adj[provider]:
-                    adj[provider].add(f)
-                    indeg[f] += 1
+                graph.add_edge(provider, f)
 
-    # Topological sort with priority: packages (0) < regular entities (1) < top entities (2)
-    def get_priority(f):
-        if _is_vhdl_pkg_file(f):
-            return 0
-        elif f in top_entity_files:
-            return 2
-        else:
-            return 1
-
-    index_map = {f: i for i, f in enumerate(nodes)}
-    zero_indeg = sorted(
-        [n for n in nodes if indeg[n] == 0],
-        key=lambda x: (get_priority(x), index_map[x]),
-    )
-    ordered: List[str] = []
-
-    while zero_indeg:
-        n = zero_indeg.pop(0)
-        ordered.append(n)
-        for m in sorted(adj[n], key=lambda x: index_map[x]):
-            indeg[m] -= 1
-            if indeg[m] == 0:
-                zero_indeg.append(m)
-                zero_indeg.sort(key=lambda x: (get_priority(x), index_map[x]))
-
-    if len(ordered) != len(nodes):
-        remaining = [n for n in nodes if n not in ordered]
+    for cycle in graph.cycles():
         logger.warning(
-            f'Circular dependencies detected in {len(remaining)} VHDL files'
+            f'Circular dependency between {len(cycle)} VHDL files: '
+            + ', '.join(os.path.basename(f) for f in cycle)
         )
-        logger.warning(
-            f'Files with circular dependencies: {[os.path.basename(f) for f in remaining]}'
-        )
-        # Add remaining files at the end, sorted by original order
-        ordered.extend(sorted(remaining, key=lambda x: index_map[x]))
 
-    logger.info(f'VHDL file ordering complete: {len(ordered)} files')
-    logger.info(f'Compilation order: {[os.path.basename(f) for f in ordered]}')
-    return ordered
+    return graph
@@ -0,0 +1,286 @@
+import time
+import logging
+from typing import Callable
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+logger = logging.getLogger(__name__)
+
+# Executores aceitos por um estágio
+EXECUTORS = ('thread', 'process')
+
+
+class Stage:
+    """
+    A step of a `Pipeline`: `func` is called with the values named in
+    `inputs` as keyword arguments and its result is stored under `outputs`
+    (a tuple of values when there are several outputs, ignored when there
+    are none).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        inputs: tuple[str, ...] = (),
+        outputs: tuple[str, ...] = (),
+        executor: str = 'thread',
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(f'Unknown executor {executor!r} for {name}')
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.executor = executor
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return (
+            f'Stage({self.name!r}, inputs={self.inputs}, '
+            f'outputs={self.outputs})'
+        )
+
+
+class Pipeline:
+    """
+    A DAG of stages linked by named values. A stage runs as soon as every
+    value it takes as input is available, so stages that do not depend on
+    each other overlap. Stages run on a thread pool by default; CPU-bound
+    stages with picklable functions and values can use a process pool.
+
+    After `run`, the start and end time of every stage are kept, and
+    `critical_path` / `report` tell which chain of stages bounded the run.
+    """
+
+    def __init__(self, name: str = 'pipeline', max_workers: int = 4):
+        self.name = name
+        self.max_workers = max_workers
+        self.stages = {}
+        self.started = None
+        self.finished = None
+
+    def add(
+        self,
+        name: str,
+        func: Callable,
+        inputs: tuple[str, ...] = (),
+        outputs: tuple[str, ...] = (),
+        executor: str = 'thread',
+    ) -> Stage:
+        """Adds a stage; see `Stage` for the meaning of the arguments."""
+        if name in self.stages:
+            raise ValueError(f'Stage {name} already exists')
+        for stage in self.stages.values():
+            produced = set(stage.outputs) & set(outputs)
+            if produced:
+                raise ValueError(
+                    f'{", ".join(sorted(produced))} already produced by '
+                    f'stage {stage.name}'
+                )
+        stage = Stage(name, func, inputs, outputs, executor)
+        self.stages[name] = stage
+        return stage
+
+    def producers(self) -> dict[str, str]:
+        """Maps each value to the stage that produces it."""
+        return {
+            value: stage.name
+            for stage in self.stages.values()
+            for value in stage.outputs
+        }
+
+    def dependencies(self, name: str) -> list[str]:
+        """Stages whose outputs the stage `name` takes as input."""
+        producers = self.producers()
+        return list(
+            dict.fromkeys(
+                producers[value]
+                for value in self.stages[name].inputs
+                if value in producers
+            )
+        )
+
+    def order(self, provided=()) -> list[str]:
+        """
+        Returns the stages in an order that respects their dependencies.
+
+        Raises:
+            ValueError: If an input is neither produced by a stage nor
+                `provided`, or if the stages form a cycle.
+        """
+        producers = self.producers()
+        for stage in self.stages.values():
+            missing = [
+                value
+                for value in stage.inputs
+                if value not in producers and value not in provided
+            ]
+            if missing:
+                raise ValueError(
+                    f'Stage {stage.name} needs {", ".join(missing)}, which '
+                    'no stage produces'
+                )
+
+        pending = {name: set(self.dependencies(name)) for name in self.stages}
+        order = []
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    'Stages form a cycle: ' + ', '.join(sorted(pending))
+                )
+            for name in ready:
+                del pending[name]
+                order.append(name)
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    def describe(self) -> str:
+        """One line per stage, in execution order, with its dependencies."""
+        lines = []
+        for name in self.order(provided=self._provided()):
+            stage = self.stages[name]
+            deps = ', '.join(self.dependencies(name)) or '-'
+            outputs = ', '.join(stage.outputs) or '-'
+            lines.append(
+                f'{name} [{stage.executor}] after: {deps}; '
+                f'produces: {outputs}'
+            )
+        return '\n'.join(lines)
+
+    def _provided(self) -> set[str]:
+        producers = self.producers()
+        return {
+            value
+            for stage in self.stages.values()
+            for value in stage.inputs
+            if value not in producers
+        }
+
+    def run(self, values: dict | None = None) -> dict:
+        """
+        Runs every stage and returns all values (the given `values` plus
+        the outputs of the stages).
+
+        The first stage to raise stops the run: stages not yet started are
+        cancelled, running ones are awaited and the exception is re-raised.
+        """
+        values = dict(values or {})
+        self.order(provided=values)
+        for stage in self.stages.values():
+            stage.start = stage.end = None
+
+        executors = {}
+
+        def submit(stage: Stage):
+            if stage.executor not in executors:
+                pool_class = (
+                    ThreadPoolExecutor
+                    if stage.executor == 'thread'
+                    else ProcessPoolExecutor
+                )
+                executors[stage.executor] = pool_class(
+                    max_workers=self.max_workers
+                )
+            kwargs = {value: values[value] for value in stage.inputs}
+            stage.start = time.monotonic()
+            logger.debug(f'[{self.name}] starting {stage.name}')
+            return executors[stage.executor].submit(stage.func, **kwargs)
+
+        self.started = time.monotonic()
+        waiting = dict(self.stages)
+        running = {}
+        try:
+            while waiting or running:
+                for name in list(waiting):
+                    stage = waiting[name]
+                    if all(value in values for value in stage.inputs):
+                        del waiting[name]
+                        running[submit(stage)] = stage
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    stage.end = time.monotonic()
+                    result = future.result()
+                    logger.debug(
+                        f'[{self.name}] {stage.name} finished in '
+                        f'{stage.duration:.2f}s'
+                    )
+                    if len(stage.outputs) == 1:
+                        values[stage.outputs[0]] = result
+                    elif stage.outputs:
+                        values.update(zip(stage.outputs, result))
+        finally:
+            self.finished = time.monotonic()
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return values
+
+    def critical_path(self) -> list[Stage]:
+        """
+        The chain of stages that bounded the last run: starting from the
+        stage that finished last, each step goes to the dependency that
+        finished last, i.e. the one the stage was waiting for.
+        """
+        finished = [s for s in self.stages.values() if s.end is not None]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda s: s.end)
+        path = [stage]
+        while True:
+            deps = [
+                self.stages[name]
+                for name in self.dependencies(stage.name)
+                if self.stages[name].end is not None
+            ]
+            if not deps:
+                break
+            stage = max(deps, key=lambda s: s.end)
+            path.append(stage)
+        return path[::-1]
+
+    def report(self) -> str:
+        """Stage timings of the last run, marking the critical path."""
+        if self.started is None:
+            return f'{self.name}: not run'
+        critical = {stage.name for stage in self.critical_path()}
+        width = max(len('Stage'), *(len(name) for name in self.stages))
+        lines = [
+            f'{"Stage":<{width}}  {"Start (s)":>9}  {"Time (s)":>8}',
+        ]
+        ran = sorted(
+            (s for s in self.stages.values() if s.start is not None),
+            key=lambda s: s.start,
+        )
+        for stage in ran:
+            mark = ' *' if stage.name in critical else ''
+            lines.append(
+                f'{stage.name:<{width}}  '
+                f'{stage.start - self.started:>9.2f}  '
+                f'{stage.duration:>8.2f}{mark}'
+            )
+        wall = self.finished - self.started
+        busy = sum(stage.duration for stage in ran)
+        path = self.critical_path()
+        lines.append(
+            f'Wall time {wall:.2f}s for {busy:.2f}s of stage time; '
+            'critical path (*): '
+            + ' -> '.join(stage.name for stage in path)
+            + f' ({sum(stage.duration for stage in path):.2f}s)'
+        )
+        return '\n'.join(lines)
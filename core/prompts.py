@@ -161,12 +161,6 @@ assign clk_core = sys_clk;
 assign rst_core = ~rst_n;
 `else
 
-Processor interface:
-
-{processor_interface}
-
-Memory interface: {memory_interface}
-
 ---
 
 **Final output format**
@@ -180,6 +174,14 @@ Connections:
     ...
 }}
 ```
+
+---
+
+Memory interface: {memory_interface}
+
+Processor interface:
+
+{processor_interface}
 """
 
 ############################################################################
@@ -283,12 +285,6 @@ module ahb_to_wishbone #(
 
 - For dual memory interface, second memory adapter use DATA_ prefix in signal names (e.g., DATA_HADDR, DATA_HWRITE, ...)
 
-Processor interface:
-
-{processor_interface}
-
-Memory interface: {memory_interface}
-
 ---
 
 **Final output format**
@@ -302,6 +298,14 @@ Connections:
     ...
 }}
 ```
+
+---
+
+Memory interface: {memory_interface}
+
+Processor interface:
+
+{processor_interface}
 """
 
 ############################################################################
@@ -402,23 +406,72 @@ module AXI4Lite_to_Wishbone #(
 
 - For dual memory interface, second memory adapter use DATA_ prefix in signal names (e.g., DATA_AWADDR, DATA_AWPROT, ...)
 
+---
+
+**Final output format**
+
+You must first give your reasoning and then output the json in this format:
+
+```
+Connections:
+{{
+    "clk_core" : "clk",
+    ...
+}}
+```
+
+---
+
+Memory interface: {memory_interface}
+
 Processor interface:
 
 {processor_interface}
+"""
 
-Memory interface: {memory_interface}
+############################################################################
+
+partial_connection_prompt = """You are a hardware engineer. Your task is to finish connecting a processor interface to the ProcessorCI wrapper through its memory bus. You will be given:
+
+1. The bus type and whether the processor has single or dual memory interfaces.
+2. The wrapper signals already connected by name.
+3. The remaining wrapper signals, with their direction and width seen from the processor.
+4. The processor interface (Verilog/VHDL module).
+
+Connect only the remaining wrapper signals:
+- Give the processor signal or an expression to generate it (e.g. "4'b1111", "wstrb != 0").
+- Match processor outputs to signals driven by the processor and processor inputs to signals driven by the wrapper.
+- Connect signals with the same bit width.
+- Allow for alternate names (e.g. "rw_address" ~= "adr", "write_request" ~= "write").
+- Treat `cyc` and `stb` signals as potentially merged into a single signal (e.g., read_request can represent cyc & stb).
+- Instruction bus signals go to `core_*` (or adapter signals without prefix) and data bus signals go to `data_mem_*` (or adapter signals with the DATA_ prefix).
+- If the processor has no matching signal, leave it open using `null`.
 
 ---
 
 **Final output format**
 
-You must first give your reasoning and then output the json in this format:
+You must first give your reasoning and then output the json, with one entry per remaining wrapper signal, in this format:
 
 ```
 Connections:
 {{
-    "clk_core" : "clk",
+    "<wrapper signal>" : "<processor signal or expression>",
     ...
 }}
 ```
+
+---
+
+Bus: {bus_type} ({memory_interface} memory interface)
+
+Wrapper signals already connected by name:
+{resolved}
+
+Remaining wrapper signals:
+{remaining}
+
+Processor interface:
+
+{processor_interface}
 """
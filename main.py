@@ -1,19 +1,50 @@
 import os
 import sys
 import json
+import time
 import colorlog
 import logging
 import argparse
-from core.hdl_process import process_verilog, simulate_to_check
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from core import (
+    BUILD_DIR,
+    preload_model,
+    release_model,
+    set_keep_alive,
+    set_scan_workers,
+)
+from core.bus_classifier import classify_bus, DEFAULT_CONFIDENCE_THRESHOLD
+from core.cache import get_response_cache
+from core.connection_mapper import map_connections, DEFAULT_MAPPER_THRESHOLD
+from core.header_compact import compact_header, estimate_tokens, header_budget
+from core.latency import get_latency_tracker
+from core.hdl_index import warm_index
+from core.hdl_process import (
+    extract_top_header,
+    process_verilog,
+    simulate_to_check,
+)
 from core.interface_resolve import (
     extract_interface_and_memory_ports,
+    cached_interface,
     connect_interfaces,
+    connections_cached,
+    sample_connections,
+)
+from core.make_wrapper import (
+    generate_instance,
+    generate_wrapper,
+    parse_module_header,
 )
-from core.make_wrapper import generate_instance, generate_wrapper
 from core.order_files import _order_sv_files, _order_vhdl_files
+from core.pipeline import Pipeline
 
 DEFAULT_CONFIG_PATH = '/eda/processor_ci/config'
+DEFAULT_PROCESSORS_PATH = '/eda/processadores'
 PROCESSOR_CI_PATH = os.getenv('PROCESSOR_CI_PATH', '/eda/processor_ci')
+LOG_FORMAT = '%(asctime)s [%(name)s] %(levelname)s: %(message)s'
+# Modelo residente sem prazo durante um lote (ver run_batch)
+BATCH_KEEP_ALIVE = '-1'
 
 
 def build_wrapper(
@@ -25,7 +56,17 @@ def build_wrapper(
     output: str,
     convert: bool,
     format: bool,
-) -> None:
+    build_dir: str = BUILD_DIR,
+    use_cache: bool = True,
+    stream: bool = False,
+    structured: bool = False,
+    classifier_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    mapper_threshold: float = DEFAULT_MAPPER_THRESHOLD,
+    samples: int = 1,
+    compact: bool = True,
+    keep_context: bool = False,
+    fast_header: bool = True,
+) -> bool:
     logging.info('Reading processor configuration...')
 
     config_path = os.path.join(config, f'{processor}.json')
@@ -37,112 +78,624 @@ def build_wrapper(
     include_dirs = config_data.get('include_dirs', [])
     top_module = config_data.get('top_module', processor)
 
-    logging.info('Processing HDL code...')
-
-    header, other_files, include_flags, files = process_verilog(
-        processor,
-        top_module,
-        files,
-        include_dirs,
-        processor_path,
-        context=context,
-        convert_to_verilog2005=convert,
-        format_code=format,
-        get_files_in_project=True,
-    )
-
-    files = [os.path.relpath(f, start=processor_path) for f in files]
-    files = set(files + config_data.get('files'))
-    # check if files are verilog or vhdl
-    if any(f.endswith('.vhd') or f.endswith('.vhdl') for f in files):
-        files = [f for f in files if f.endswith('.vhd') or f.endswith('.vhdl')]
-        files = _order_vhdl_files(files, repo_root=processor_path)
-    else:
-        files = [f for f in files if f.endswith('.sv') or f.endswith('.v')]
-        files = _order_sv_files(files, repo_root=processor_path)
+    # Header do pré-processamento completo, esperado pelo caminho rápido
+    # quando ele não consegue extrair o header sozinho
+    full_header = Future()
+
+    def preprocess():
+        logging.info('Processing HDL code...')
+        try:
+            result = process_verilog(
+                processor,
+                top_module,
+                files,
+                include_dirs,
+                processor_path,
+                context=context,
+                convert_to_verilog2005=convert,
+                format_code=format,
+                get_files_in_project=True,
+                build_dir=build_dir,
+                use_cache=use_cache,
+            )
+        except BaseException as e:
+            full_header.set_exception(e)
+            raise
+        full_header.set_result(result[0])
+        return result
+
+    def top_header():
+        # Com sv2v/Verible, o header do LLM precisa ser o mesmo (convertido)
+        # usado no wrapper, e o sv2v não converte o top sem os pacotes
+        if fast_header and not convert and not format:
+            found = extract_top_header(
+                top_module,
+                files,
+                include_dirs,
+                processor_path,
+                context=context,
+                use_index=use_cache,
+            )
+            if found:
+                header, top_file = found
+                logging.info(
+                    'Top module header extracted from '
+                    f'{os.path.relpath(top_file, processor_path)}; the '
+                    'full preprocessing continues in the background'
+                )
+                return header
+        return full_header.result()
+
+    def order_files(project_files):
+        project_files = [
+            os.path.relpath(f, start=processor_path) for f in project_files
+        ]
+        project_files = set(project_files + config_data.get('files'))
+        # check if files are verilog or vhdl
+        vhdl = [f for f in project_files if f.endswith(('.vhd', '.vhdl'))]
+        if vhdl:
+            return _order_vhdl_files(
+                vhdl, repo_root=processor_path, use_index=use_cache
+            )
+        verilog = [f for f in project_files if f.endswith(('.sv', '.v'))]
+        return _order_sv_files(
+            verilog, repo_root=processor_path, use_index=use_cache
+        )
 
-    # Save processed files in config json with relative paths
-    config_data['files'] = files
-    with open(config_path, 'w', encoding='utf-8') as file:
-        json.dump(config_data, file, indent=4)
+    def save_config(ordered_files):
+        # Save processed files in config json with relative paths
+        config_data['files'] = ordered_files
+        with open(config_path, 'w', encoding='utf-8') as file:
+            json.dump(config_data, file, indent=4)
+
+    def make_prompt_header(header):
+        logging.debug(f'Extracted header:\n{header}')
+
+        # O cabeçalho completo segue para o wrapper; os prompts usam a versão
+        # compacta
+        if not compact:
+            return header
+        prompt_header = compact_header(
+            header, header_budget(model), keep_body=keep_context
+        )
+        logging.info(
+            f'Header compacted from ~{estimate_tokens(header)} to '
+            f'~{estimate_tokens(prompt_header)} tokens'
+        )
+        logging.debug(f'Compacted header:\n{prompt_header}')
+        return prompt_header
+
+    def classify(header):
+        interface_and_ports, confidence = classify_bus(header)
+        return (
+            interface_and_ports,
+            confidence,
+            bool(interface_and_ports) and confidence >= classifier_threshold,
+        )
 
-    logging.debug(f'Extracted header:\n{header}')
+    def map_by_name(interface_and_ports, header):
+        mapped, confidence = map_connections(interface_and_ports, header)
+        resolved = {
+            key: value
+            for key, value in mapped.items()
+            if confidence[key] >= mapper_threshold
+        }
+        return mapped, confidence, resolved
+
+    def preload(header, prompt_header):
+        # Só carrega o modelo se alguma etapa vai mesmo consultá-lo, isto
+        # é, se o classificador, o mapeamento por nome e o cache não bastam
+        interface_and_ports, _, confident = classify(header)
+        if not confident:
+            interface_and_ports = use_cache and cached_interface(
+                prompt_header, model, structured=structured
+            )
+            if not interface_and_ports:
+                preload_model(model)
+                return
+        mapped, _, resolved = map_by_name(interface_and_ports, header)
+        if len(resolved) == len(mapped) or (
+            use_cache
+            and connections_cached(
+                interface_and_ports,
+                prompt_header,
+                model,
+                structured=structured,
+                resolved=resolved,
+                samples=samples,
+            )
+        ):
+            logging.debug('No LLM query expected, model not preloaded.')
+            return
+        preload_model(model)
+
+    def find_interface(header, prompt_header):
+        logging.info('Extracting interfaces and memory ports...')
+
+        ok = False
+        tentativas = 0
+
+        interface_and_ports, confidence, confident = classify(header)
+        if confident:
+            logging.info(
+                'Bus classified from port names '
+                f'(confidence {confidence:.2f}), skipping the LLM.'
+            )
+            ok = True
+        else:
+            logging.debug(
+                f'Bus classifier confidence {confidence:.2f} below '
+                f'{classifier_threshold}, asking the LLM.'
+            )
+
+        # Tenta 3 vezes obter um json valido
+        while not ok and tentativas < 3:
+            tentativas += 1
+            logging.debug(f'Attempt {tentativas} of 3...')
+            ok, interface_and_ports = extract_interface_and_memory_ports(
+                prompt_header,
+                model,
+                use_cache=use_cache,
+                stream=stream,
+                structured=structured,
+            )
+
+        if tentativas == 3 and not ok:
+            logging.error('Error parsing JSON')
+            sys.exit(1)
+
+        logging.info(f'Detected interface: {interface_and_ports}')
+        return interface_and_ports
+
+    def connect(interface_and_ports, header, prompt_header):
+        logging.info('Connecting interfaces...')
+
+        tentativas = 0
+        connections = None
+
+        mapped, confidence, resolved = map_by_name(interface_and_ports, header)
+        logging.debug(
+            'Connection mapper confidence: '
+            + ', '.join(f'{k}={v:.2f}' for k, v in confidence.items())
+        )
+        if len(resolved) == len(mapped):
+            logging.info('All signals connected by name, skipping the LLM.')
+            connections = resolved
+        elif resolved:
+            logging.info(
+                f'{len(resolved)} of {len(mapped)} signals connected by '
+                'name, asking the LLM for the rest.'
+            )
+
+        while connections is None and tentativas < 3:
+            tentativas += 1
+            logging.debug(f'Attempt {tentativas} of 3...')
+            if samples > 1:
+                connections, agreement = sample_connections(
+                    interface_and_ports,
+                    prompt_header,
+                    model,
+                    samples=samples,
+                    use_cache=use_cache,
+                    stream=stream,
+                    structured=structured,
+                    resolved=resolved,
+                )
+                if agreement:
+                    disputed = {k: v for k, v in agreement.items() if v < 1}
+                    logging.info(
+                        'Connection agreement: '
+                        f'{sum(agreement.values()) / len(agreement):.0%} '
+                        f'({len(disputed)} disputed signals)'
+                    )
+                    for key, value in disputed.items():
+                        logging.debug(
+                            f'{key} -> {connections[key]} '
+                            f'({value:.0%} of votes)'
+                        )
+            else:
+                connections = connect_interfaces(
+                    interface_and_ports,
+                    prompt_header,
+                    model,
+                    use_cache=use_cache,
+                    stream=stream,
+                    structured=structured,
+                    resolved=resolved,
+                )
+
+        if tentativas == 3 and connections is None:
+            logging.error('Error parsing JSON')
+            sys.exit(1)
+
+        logging.debug(f'Interface connections: {connections}')
+        return connections
+
+    def check_header(header, full_header, interface_and_ports, connections):
+        # O LLM viu o header do caminho rápido; se as portas do top no
+        # pré-processamento completo forem outras (macros, `ifdef), as
+        # etapas do LLM são refeitas com o header usado no wrapper
+        if header == full_header or _ports(header) == _ports(full_header):
+            return interface_and_ports, connections
+        logging.warning(
+            'Top module ports differ between the fast header and the full '
+            'preprocessing; redoing the interface and connection stages '
+            'with the full header.'
+        )
+        prompt_header = make_prompt_header(full_header)
+        interface_and_ports = find_interface(full_header, prompt_header)
+        connections = connect(interface_and_ports, full_header, prompt_header)
+        return interface_and_ports, connections
+
+    def make_wrapper(checked_interface, full_header, checked_connections):
+        second_memory = checked_interface.get('memory_interface', '') == 'Dual'
+        use_adapter = checked_interface.get('bus_type', '') not in [
+            'Wishbone',
+            'Custom',
+            'Avalon',
+        ]
+
+        logging.info('Generating instance...')
+
+        instance, assign_list, create_signals = generate_instance(
+            full_header,
+            checked_connections,
+            second_memory=second_memory,
+            instance_name='Processor',
+            use_adapter=use_adapter,
+        )
 
-    interface_and_ports = None
+        logging.info('Generating wrapper...')
 
-    logging.info('Extracting interfaces and memory ports...')
+        generate_wrapper(
+            processor,
+            instance,
+            checked_interface['bus_type'],
+            second_memory,
+            output,
+            assign_list,
+            create_signals,
+        )
+        return second_memory
+
+    def simulate(other_files, include_flags, second_memory):
+        logging.info('Starting simulation for verification...')
+
+        return simulate_to_check(
+            processor,
+            other_files,
+            include_flags,
+            output,
+            second_memory=second_memory,
+            build_dir=build_dir,
+        )
 
-    ok = False
-    tentativas = 0
-    # Tenta 3 vezes obter um json valido
-    while not ok and tentativas < 3:
-        tentativas += 1
-        logging.debug(f'Attempt {tentativas} of 3...')
-        ok, interface_and_ports = extract_interface_and_memory_ports(
-            header, model
+    # A ordenação dos arquivos e a reescrita da configuração correm em
+    # paralelo com as consultas ao LLM
+    pipeline = Pipeline(processor)
+    pipeline.add(
+        'preprocess',
+        preprocess,
+        outputs=(
+            'full_header',
+            'other_files',
+            'include_flags',
+            'project_files',
+        ),
+    )
+    # Os estágios do LLM só precisam do header do top, que sai antes do
+    # pré-processamento completo; o wrapper usa o header do Verilator
+    pipeline.add('top_header', top_header, outputs=('header',))
+    pipeline.add(
+        'order_files',
+        order_files,
+        inputs=('project_files',),
+        outputs=('ordered_files',),
+    )
+    pipeline.add('save_config', save_config, inputs=('ordered_files',))
+    pipeline.add(
+        'prompt_header',
+        make_prompt_header,
+        inputs=('header',),
+        outputs=('prompt_header',),
+    )
+    # Carrega o modelo em paralelo com a etapa da interface, se for usado
+    pipeline.add('preload', preload, inputs=('header', 'prompt_header'))
+    pipeline.add(
+        'interface',
+        find_interface,
+        inputs=('header', 'prompt_header'),
+        outputs=('interface_and_ports',),
+    )
+    pipeline.add(
+        'connections',
+        connect,
+        inputs=('interface_and_ports', 'header', 'prompt_header'),
+        outputs=('connections',),
+    )
+    pipeline.add(
+        'check_header',
+        check_header,
+        inputs=('header', 'full_header', 'interface_and_ports', 'connections'),
+        outputs=('checked_interface', 'checked_connections'),
+    )
+    pipeline.add(
+        'wrapper',
+        make_wrapper,
+        inputs=('checked_interface', 'full_header', 'checked_connections'),
+        outputs=('second_memory',),
+    )
+    pipeline.add(
+        'simulate',
+        simulate,
+        inputs=('other_files', 'include_flags', 'second_memory'),
+        outputs=('ok',),
+    )
+    logging.debug(f'Pipeline stages:\n{pipeline.describe()}')
+
+    try:
+        values = pipeline.run()
+    finally:
+        logging.info(f'Pipeline report:\n{pipeline.report()}')
+        if use_cache:
+            cache = get_response_cache()
+            logging.info(
+                f'LLM response cache: {cache.hits} hits, '
+                f'{cache.misses} misses'
+            )
+            # Latências observadas orientam os pedidos duplicados da
+            # próxima vez
+            get_latency_tracker().save()
+
+    return values['ok']
+
+
+def _ports(header: str) -> list[tuple[str, str]] | None:
+    """Direction and name of each port of `header` (None if unparseable)."""
+    try:
+        _, _, ports = parse_module_header(header)
+    except ValueError:
+        return None
+    return [(direction, name) for direction, name, _ in ports]
+
+
+def setup_logging(verbose: bool, log_file: str | None = None) -> None:
+    """
+    Configures the root logger.
+
+    Args:
+        verbose (bool): Enables DEBUG level messages.
+        log_file (str, optional): When given, logs are written (without
+            colors) to this file instead of the terminal.
+    """
+    if log_file:
+        handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt='%H:%M:%S'))
+    else:
+        handler = colorlog.StreamHandler()
+        handler.setFormatter(
+            colorlog.ColoredFormatter(
+                '%(log_color)s%(asctime)s [%(name)s] %(levelname)s:%(reset)s %(message)s',
+                datefmt='%H:%M:%S',
+                log_colors={
+                    'DEBUG': 'cyan',
+                    'INFO': 'green',
+                    'WARNING': 'yellow',
+                    'ERROR': 'red',
+                    'CRITICAL': 'bold_red,bg_white',
+                },
+            )
         )
 
-    if tentativas == 3 and not ok:
-        logging.error('Error parsing JSON')
-        sys.exit(1)
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        handlers=[handler],
+        force=True,
+    )
 
-    logging.info(f'Detected interface: {interface_and_ports}')
 
-    logging.info('Connecting interfaces...')
+def _run_batch_core(
+    processor: str, log_file: str, verbose: bool, **kwargs
+) -> tuple[str, str, float]:
+    """
+    Runs `build_wrapper` for a single processor inside a batch worker.
 
-    tentativas = 0
-    connections = None
+    Everything the run prints, including the output of Verilator and GHDL,
+    is redirected to `log_file`.
 
-    while connections is None and tentativas < 3:
-        tentativas += 1
-        logging.debug(f'Attempt {tentativas} of 3...')
-        connections = connect_interfaces(interface_and_ports, header, model)
+    Returns:
+        tuple: (processor, status, elapsed seconds), where status is one of
+               'passed', 'failed' or 'error'.
+    """
+    log_fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(log_fd, sys.stdout.fileno())
+    os.dup2(log_fd, sys.stderr.fileno())
+    os.close(log_fd)
 
-    if tentativas == 3 and connections is None:
-        logging.error('Error parsing JSON')
-        sys.exit(1)
+    setup_logging(verbose, log_file)
 
-    logging.debug(f'Interface connections: {connections}')
+    start = time.monotonic()
+    try:
+        ok = build_wrapper(processor=processor, **kwargs)
+        status = 'passed' if ok else 'failed'
+    except (Exception, SystemExit) as e:
+        logging.exception(f'Error processing core {processor}: {e!r}')
+        status = 'error'
 
-    second_memory = interface_and_ports.get('memory_interface', '') == 'Dual'
-    use_adapter = interface_and_ports.get('bus_type', '') not in [
-        'Wishbone',
-        'Custom',
-        'Avalon',
-    ]
+    return processor, status, time.monotonic() - start
 
-    logging.info('Generating instance...')
 
-    instance, assign_list, create_signals = generate_instance(
-        header,
-        connections,
-        second_memory=second_memory,
-        instance_name='Processor',
-        use_adapter=use_adapter,
-    )
+def _scan_workers_per_job(jobs: int) -> int:
+    # Divide as CPUs entre os processos do lote, para que a varredura de
+    # arquivos HDL de cada um não crie um pool do tamanho da máquina
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+def _init_batch_worker(keep_alive: str, scan_workers: int) -> None:
+    set_keep_alive(keep_alive)
+    set_scan_workers(scan_workers)
+
+
+def run_batch(
+    processors: list[str],
+    config: str,
+    processors_root: str,
+    log_dir: str,
+    jobs: int,
+    verbose: bool,
+    **kwargs,
+) -> bool:
+    """
+    Runs `build_wrapper` for several processors on a bounded worker pool.
+
+    Each processor gets its own build directory (`BUILD_DIR/<processor>`)
+    and log file (`<log_dir>/<processor>.log`), so concurrent runs do not
+    overwrite each other. A summary table is logged and saved to
+    `<log_dir>/summary.txt`. The model stays loaded on the servers until
+    the whole batch finishes.
+
+    Returns:
+        bool: True if every processor passed the simulation check.
+    """
+    if not processors:
+        processors = sorted(
+            os.path.splitext(name)[0]
+            for name in os.listdir(config)
+            if name.endswith('.json')
+        )
+
+    # Preserva a ordem e remove duplicados
+    processors = list(dict.fromkeys(processors))
 
-    logging.info('Generating wrapper...')
+    os.makedirs(log_dir, exist_ok=True)
 
-    generate_wrapper(
-        processor,
-        instance,
-        interface_and_ports['bus_type'],
-        second_memory,
-        output,
-        assign_list,
-        create_signals,
+    logging.info(
+        f'Running batch of {len(processors)} processors with {jobs} workers...'
     )
 
-    logging.info('Starting simulation for verification...')
+    # Mantém o modelo carregado durante todo o lote, sem expirar entre cores
+    model = kwargs.get('model')
+    if model:
+        keep_alive = set_keep_alive(BATCH_KEEP_ALIVE)
+        preload_model(model)
+
+    results = {}
+    try:
+        # Um processo novo por core isola o estado global e o
+        # redirecionamento de stdout/stderr
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            max_tasks_per_child=1,
+            initializer=_init_batch_worker,
+            initargs=(BATCH_KEEP_ALIVE, _scan_workers_per_job(jobs)),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _run_batch_core,
+                    processor,
+                    os.path.join(log_dir, f'{processor}.log'),
+                    verbose,
+                    config=config,
+                    processor_path=os.path.join(processors_root, processor),
+                    build_dir=os.path.join(BUILD_DIR, processor),
+                    **kwargs,
+                ): processor
+                for processor in processors
+            }
+
+            for future in as_completed(futures):
+                processor = futures[future]
+                try:
+                    _, status, elapsed = future.result()
+                except Exception as e:
+                    logging.error(f'Worker for {processor} crashed: {e!r}')
+                    status, elapsed = 'error', 0.0
+                results[processor] = (status, elapsed)
+                log_call = (
+                    logging.info if status == 'passed' else logging.error
+                )
+                log_call(f'{processor}: {status} ({elapsed:.1f}s)')
+    finally:
+        # Libera o modelo mesmo se o lote for interrompido; onde ele já
+        # estava carregado, só volta ao keep-alive de antes do lote
+        if model:
+            set_keep_alive(keep_alive)
+            release_model(model, keep_alive=keep_alive)
+
+    name_width = max(len('Processor'), *(len(p) for p in processors))
+    table = [
+        f'{"Processor":<{name_width}}  {"Status":<7}  {"Time (s)":>9}  Log',
+        f'{"-" * name_width}  {"-" * 7}  {"-" * 9}  {"-" * 3}',
+    ]
+    for processor in processors:
+        status, elapsed = results[processor]
+        table.append(
+            f'{processor:<{name_width}}  {status:<7}  {elapsed:>9.1f}  '
+            f'{os.path.join(log_dir, processor + ".log")}'
+        )
+    passed = sum(1 for status, _ in results.values() if status == 'passed')
+    table.append(f'\n{passed}/{len(processors)} processors passed.')
+
+    summary = '\n'.join(table)
+    with open(
+        os.path.join(log_dir, 'summary.txt'), 'w', encoding='utf-8'
+    ) as file:
+        file.write(summary + '\n')
+
+    logging.info(f'Batch summary:\n{summary}')
+
+    return passed == len(processors)
+
+
+def run_index(processors: list[str], processors_root: str, jobs: int) -> bool:
+    """
+    Builds or updates the HDL index (see `core/hdl_index.py`) of each
+    processor repository, or of every repository under `processors_root`
+    when no processor is given.
+
+    Returns:
+        bool: True if every repository was indexed.
+    """
+    if not processors:
+        processors = sorted(
+            name
+            for name in os.listdir(processors_root)
+            if os.path.isdir(os.path.join(processors_root, name))
+        )
 
-    simulate_to_check(
-        processor,
-        other_files,
-        include_flags,
-        output,
-        second_memory=second_memory,
+    logging.info(
+        f'Indexing {len(processors)} repositories with {jobs} workers...'
     )
 
+    ok = True
+    start = time.monotonic()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=set_scan_workers,
+        initargs=(_scan_workers_per_job(jobs),),
+    ) as pool:
+        futures = {
+            pool.submit(
+                warm_index, os.path.join(processors_root, processor)
+            ): processor
+            for processor in processors
+        }
+        for future in as_completed(futures):
+            processor = futures[future]
+            try:
+                files, scanned, reused = future.result()
+            except Exception as e:
+                logging.error(f'Could not index {processor}: {e!r}')
+                ok = False
+                continue
+            logging.info(
+                f'{processor}: {files} files ({scanned} scanned, '
+                f'{reused} unchanged)'
+            )
+
+    logging.info(f'Indexing finished in {time.monotonic() - start:.1f}s')
+    return ok
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -162,7 +715,6 @@ def main() -> None:
         '--processor',
         type=str,
         help='Processor name (e.g., Grande-Risco-5)',
-        required=True,
     )
     parser.add_argument(
         '-n',
@@ -182,7 +734,6 @@ def main() -> None:
         '-P',
         '--processor-path',
         type=str,
-        required=True,
         help='Path to the processor source code',
     )
     parser.add_argument(
@@ -209,30 +760,166 @@ def main() -> None:
         action='store_true',
         help='Format code to a human-readable style using Verible',
     )
+    parser.add_argument(
+        '-b',
+        '--batch',
+        type=str,
+        nargs='*',
+        metavar='PROCESSOR',
+        help='Process several processors in parallel. Without names, every '
+        'configuration in the config directory is processed',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help='Number of processors handled in parallel in batch mode',
+    )
+    parser.add_argument(
+        '--processors-root',
+        type=str,
+        default=DEFAULT_PROCESSORS_PATH,
+        help='Directory holding the processor repositories in batch mode',
+    )
+    parser.add_argument(
+        '--log-dir',
+        type=str,
+        default='logs',
+        help='Directory for per-processor logs and the summary in batch mode',
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream LLM answers and stop generating once the JSON result '
+        'is complete',
+    )
+    parser.add_argument(
+        '--structured-output',
+        action='store_true',
+        help='Constrain LLM answers to a JSON schema (Ollama structured '
+        'outputs)',
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Disable the on-disk caches of preprocessing results and LLM '
+        'responses',
+    )
+    parser.add_argument(
+        '--classifier-threshold',
+        type=float,
+        default=DEFAULT_CONFIDENCE_THRESHOLD,
+        help='Minimum confidence of the rule-based bus classifier to skip '
+        'the LLM interface query (above 1 always asks the LLM)',
+    )
+    parser.add_argument(
+        '--mapper-threshold',
+        type=float,
+        default=DEFAULT_MAPPER_THRESHOLD,
+        help='Minimum confidence of a connection made by name to keep it '
+        'without asking the LLM (above 1 asks the LLM for every signal)',
+    )
+    parser.add_argument(
+        '--samples',
+        type=int,
+        default=1,
+        help='Number of connection answers sampled in parallel; the '
+        'connection of each signal is chosen by majority vote',
+    )
+    parser.add_argument(
+        '--no-compact',
+        action='store_true',
+        help='Send the module header to the LLM verbatim instead of a '
+        'compact port table',
+    )
+    parser.add_argument(
+        '--keep-context',
+        action='store_true',
+        help='Keep the module body lines after the header (see --context) '
+        'in the compacted header',
+    )
+    parser.add_argument(
+        '--no-fast-header',
+        action='store_true',
+        help='Wait for the preprocessing of the whole design before '
+        'extracting the top module header',
+    )
+
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    index_parser = subparsers.add_parser(
+        'index',
+        help='Build or update the HDL index of the processor repositories',
+        description='Build or update the HDL index of the processor '
+        'repositories, so later runs only rescan changed files',
+    )
+    index_parser.add_argument(
+        'processors',
+        nargs='*',
+        metavar='PROCESSOR',
+        help='Processors to index (default: every repository in '
+        '--processors-root)',
+    )
+    # SUPPRESS: sem a opção aqui, vale o valor dado antes do subcomando
+    # (ou o default do parser principal)
+    index_parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=argparse.SUPPRESS,
+        help='Number of repositories indexed in parallel (default: '
+        f'{min(4, os.cpu_count() or 1)})',
+    )
+    index_parser.add_argument(
+        '--processors-root',
+        type=str,
+        default=argparse.SUPPRESS,
+        help='Directory holding the processor repositories (default: '
+        f'{DEFAULT_PROCESSORS_PATH})',
+    )
 
     args = parser.parse_args()
 
-    handler = colorlog.StreamHandler()
-    formatter = colorlog.ColoredFormatter(
-        '%(log_color)s%(asctime)s [%(name)s] %(levelname)s:%(reset)s %(message)s',
-        datefmt='%H:%M:%S',
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'bold_red,bg_white',
-        },
-    )
-    handler.setFormatter(formatter)
+    if args.command == 'index':
+        setup_logging(args.verbose)
+        ok = run_index(args.processors, args.processors_root, args.jobs)
+        sys.exit(0 if ok else 1)
 
-    logging.basicConfig(
-        level=logging.DEBUG if args.verbose else logging.INFO,
-        handlers=[handler],
-    )
+    if args.batch is None and not (args.processor and args.processor_path):
+        parser.error(
+            'the following arguments are required: -p/--processor, '
+            '-P/--processor-path (or use --batch)'
+        )
+
+    setup_logging(args.verbose)
 
     logging.debug('Detailed logging enabled.')
 
+    if args.batch is not None:
+        ok = run_batch(
+            args.batch,
+            config=args.config,
+            processors_root=args.processors_root,
+            log_dir=args.log_dir,
+            jobs=args.jobs,
+            verbose=args.verbose,
+            context=args.context,
+            model=args.model,
+            output=args.output,
+            convert=args.convert_to_verilog2005,
+            format=args.format_code,
+            use_cache=not args.no_cache,
+            stream=args.stream,
+            structured=args.structured_output,
+            classifier_threshold=args.classifier_threshold,
+            mapper_threshold=args.mapper_threshold,
+            samples=args.samples,
+            compact=not args.no_compact,
+            keep_context=args.keep_context,
+            fast_header=not args.no_fast_header,
+        )
+        sys.exit(0 if ok else 1)
+
     build_wrapper(
         config=args.config,
         processor=args.processor,
@@ -242,6 +929,15 @@ def main() -> None:
         output=args.output,
         convert=args.convert_to_verilog2005,
         format=args.format_code,
+        use_cache=not args.no_cache,
+        stream=args.stream,
+        structured=args.structured_output,
+        classifier_threshold=args.classifier_threshold,
+        mapper_threshold=args.mapper_threshold,
+        samples=args.samples,
+        compact=not args.no_compact,
+        keep_context=args.keep_context,
+        fast_header=not args.no_fast_header,
     )
 
 
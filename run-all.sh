@@ -10,14 +10,7 @@ CORES=("riskow" "Grande-Risco-5" "tinyriscv" "rvx" "rpu" "darkriscv" "kronos" "S
 #riscv, rpu , zero-riscy, leaf, kronos, sprintrv, VexRiscv, rs5
 
 LOG_DIR=logs
-mkdir -p "$LOG_DIR"
+JOBS=${JOBS:-4}
 
-for core in "${CORES[@]}"; do
-    echo "Processing core: $core"
-    python main.py -p "$core" -P "/eda/processadores/$core" -n 0 -m gpt-oss:20b -v > "$LOG_DIR/$core.log" 2>&1
-    if [ $? -ne 0 ]; then
-        echo "Error processing core: $core. Check the log file $LOG_DIR/$core.log for details."
-    else
-        echo "Successfully processed core: $core"
-    fi
-done
+python main.py --batch "${CORES[@]}" --processors-root /eda/processadores \
+    -j "$JOBS" --log-dir "$LOG_DIR" -n 0 -m gpt-oss:20b -v
@@ -0,0 +1,92 @@
+"""Tests for `core.balancer`."""
+
+import httpx
+import pytest
+from ollama import ResponseError
+from core.balancer import (
+    EndpointPool,
+    is_endpoint_failure,
+    parse_endpoints,
+)
+
+
+def test_parse_endpoints_reads_weights_and_models():
+    """Options follow the URL, separated by `;`."""
+    first, second = parse_endpoints(
+        'http://gpu1:11434;weight=2;models=qwen3:14b|gpt-oss:20b, '
+        'http://gpu2:11434'
+    )
+
+    assert (first.url, first.weight) == ('http://gpu1:11434', 2.0)
+    assert first.models == {'qwen3:14b', 'gpt-oss:20b'}
+    assert second.models is None and second.serves('anything')
+    with pytest.raises(ValueError):
+        parse_endpoints('http://gpu1:11434;size=2')
+    with pytest.raises(ValueError):
+        parse_endpoints(' , ')
+
+
+def test_least_outstanding_relative_to_weight():
+    """A heavier endpoint takes proportionally more requests."""
+    pool = EndpointPool(parse_endpoints('http://a;weight=2,http://b'))
+    urls = [pool.acquire('m').url for _ in range(6)]
+
+    assert urls.count('http://a') == 4
+    assert urls.count('http://b') == 2
+
+
+def test_models_and_exclusions_limit_the_candidates():
+    """Excluded endpoints are used only when nothing else serves the model."""
+    pool = EndpointPool(parse_endpoints('http://a;models=x,http://b'))
+    a, b = pool.endpoints
+
+    assert pool.acquire('y') is b
+    assert pool.candidates('y') == 1
+    assert pool.acquire('x', exclude={a}) is b
+    assert pool.acquire('y', exclude={b}) is b
+    with pytest.raises(ValueError):
+        EndpointPool(parse_endpoints('http://a;models=x')).acquire('y')
+
+
+def test_failing_endpoint_is_ejected_and_recovers():
+    """Consecutive failures eject an endpoint; a success resets it."""
+    pool = EndpointPool(parse_endpoints('http://a,http://b'), max_failures=2)
+    a, b = pool.endpoints
+    for _ in range(2):
+        pool.release(pool.acquire('m', exclude={b}), ok=False)
+
+    assert [pool.acquire('m') for _ in range(3)] == [b, b, b]
+    assert a.ejections == 1
+
+    pool.release(a, ok=True)
+    assert (a.failures, a.ejections) == (0, 0)
+
+
+def test_all_ejected_uses_the_first_to_come_back():
+    """Requests are never refused, even with every endpoint ejected."""
+    pool = EndpointPool(parse_endpoints('http://a,http://b'), max_failures=1)
+    a, b = pool.endpoints
+    pool.release(pool.acquire('m', exclude={b}), ok=False)
+    pool.release(pool.acquire('m', exclude={a}), ok=False)
+
+    assert pool.acquire('m') is a
+
+
+def test_cancelled_request_leaves_health_untouched():
+    """`ok=None` only releases the request."""
+    pool = EndpointPool(parse_endpoints('http://a'), max_failures=1)
+    endpoint = pool.acquire('m')
+
+    pool.release(endpoint, ok=None)
+
+    assert (endpoint.outstanding, endpoint.failures) == (0, 0)
+
+
+def test_server_errors_count_as_endpoint_failures():
+    """Transport errors and 5xx are failures, bad requests are not."""
+    request = httpx.Request('POST', 'http://a/api/generate')
+
+    assert is_endpoint_failure(ResponseError('busy', 503))
+    assert is_endpoint_failure(httpx.ConnectError('down', request=request))
+    assert not is_endpoint_failure(ResponseError('no such model', 404))
+    assert not is_endpoint_failure(ValueError('bad prompt'))
@@ -0,0 +1,120 @@
+"""Tests for the stage graph of `main.build_wrapper`."""
+
+import json
+import pytest
+import main
+
+FAST_HEADER = 'module top(input clk, output [31:0] addr);'
+INTERFACE = {'bus_type': 'Custom', 'memory_interface': 'Single'}
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """
+    Runs `build_wrapper` with the HDL tools and the LLM replaced by stubs.
+    Returns the LLM calls, the connections given to the wrapper and the
+    preloaded models.
+    """
+    config = tmp_path / 'config'
+    config.mkdir()
+    (config / 'cpu.json').write_text(
+        json.dumps({'files': ['top.sv'], 'top_module': 'top'})
+    )
+    calls = {'llm': [], 'wrapper': [], 'preload': []}
+
+    def extract(prompt_header, model, **kwargs):
+        calls['llm'].append(('interface', prompt_header))
+        return True, dict(INTERFACE)
+
+    def connect(interface, prompt_header, model, **kwargs):
+        calls['llm'].append(('connections', prompt_header))
+        return {'core_addr': 'addr'}
+
+    def instance(header, connections, **kwargs):
+        calls['wrapper'].append((header, connections))
+        return '', [], []
+
+    monkeypatch.setattr(main, 'extract_interface_and_memory_ports', extract)
+    monkeypatch.setattr(main, 'connect_interfaces', connect)
+    monkeypatch.setattr(main, 'generate_instance', instance)
+    monkeypatch.setattr(main, 'generate_wrapper', lambda *args: None)
+    monkeypatch.setattr(main, 'simulate_to_check', lambda *a, **k: True)
+    monkeypatch.setattr(main, '_order_sv_files', lambda files, **k: files)
+    monkeypatch.setattr(
+        main, 'preload_model', lambda model: calls['preload'].append(model)
+    )
+    monkeypatch.setattr(
+        main,
+        'extract_top_header',
+        lambda *a, **k: (FAST_HEADER, str(tmp_path / 'top.sv')),
+    )
+
+    def build(full_header, **kwargs):
+        def process_verilog(*args, **kw):
+            if isinstance(full_header, Exception):
+                raise full_header
+            return full_header, [], [], []
+
+        monkeypatch.setattr(main, 'process_verilog', process_verilog)
+        ok = main.build_wrapper(
+            config=str(config),
+            processor='cpu',
+            context=0,
+            model='m',
+            processor_path=str(tmp_path),
+            output=str(tmp_path / 'out'),
+            convert=False,
+            format=False,
+            use_cache=False,
+            compact=False,
+            **kwargs,
+        )
+        return ok, calls
+
+    return build
+
+
+def test_llm_stages_run_once_when_headers_agree(run):
+    """The fast header is enough when the full one has the same ports."""
+    full = 'module top(\n  input clk,\n  output [31:0] addr\n);'
+
+    ok, calls = run(full)
+
+    assert ok
+    assert [stage for stage, _ in calls['llm']] == ['interface', 'connections']
+    assert calls['wrapper'] == [(full, {'core_addr': 'addr'})]
+    assert calls['preload'] == ['m']
+
+
+def test_llm_stages_are_redone_when_ports_differ(run):
+    """Ports only in the full header reach the LLM before the wrapper."""
+    full = 'module top(input clk, output [31:0] addr, input irq);'
+
+    ok, calls = run(full)
+
+    assert ok
+    prompts = [prompt for _, prompt in calls['llm']]
+    assert prompts == [FAST_HEADER, FAST_HEADER, full, full]
+    assert calls['wrapper'][0][0] == full
+
+
+def test_no_preload_when_the_classifier_and_mapper_answer(run, monkeypatch):
+    """The model is not loaded when no LLM query is left."""
+    monkeypatch.setattr(main, 'classify_bus', lambda h: (INTERFACE, 1.0))
+    monkeypatch.setattr(
+        main,
+        'map_connections',
+        lambda i, h: ({'core_addr': 'addr'}, {'core_addr': 1.0}),
+    )
+
+    ok, calls = run(FAST_HEADER)
+
+    assert ok
+    assert calls['llm'] == []
+    assert calls['preload'] == []
+
+
+def test_preprocessing_failure_stops_the_wrapper(run):
+    """The error of a stage reaches the caller of build_wrapper."""
+    with pytest.raises(RuntimeError, match='verilator failed'):
+        run(RuntimeError('verilator failed'))
@@ -0,0 +1,68 @@
+"""Tests for `core.bus_classifier` and `core.connection_mapper`."""
+
+from core.bus_classifier import classify_bus, match_signal
+from core.connection_mapper import map_connections
+
+DUAL_WISHBONE = """module cpu (
+  input clk_i, input rst_i,
+  output iwb_cyc_o, output iwb_stb_o, output iwb_we_o,
+  output [31:0] iwb_adr_o, output [31:0] iwb_dat_o,
+  input [31:0] iwb_dat_i, input iwb_ack_i, output [3:0] iwb_sel_o,
+  output dwb_cyc_o, output dwb_stb_o, output dwb_we_o,
+  output [31:0] dwb_adr_o, output [31:0] dwb_dat_o,
+  input [31:0] dwb_dat_i, input dwb_ack_i, output [3:0] dwb_sel_o
+);"""
+
+SINGLE_WISHBONE_WITHOUT_SEL = """module cpu (
+  input clk, input rst,
+  output wb_cyc_o, output wb_stb_o, output wb_we_o,
+  output [31:0] wb_adr_o, output [31:0] wb_dat_o,
+  input [31:0] wb_dat_i, input wb_ack_i
+);"""
+
+
+def test_match_signal_strips_direction_markers():
+    """The interface prefix is what precedes the signal name."""
+    assert match_signal(['iwb', 'adr', 'o'], [['adr']]) == ['iwb']
+    assert match_signal(['mem', 'ready', 'i'], [['ready']]) == ['mem']
+    assert match_signal(['wb', 'dat', 'i'], [['dat', 'i']]) == ['wb']
+    assert match_signal(['clk'], [['adr']]) is None
+
+
+def test_two_prefixed_interfaces_are_a_dual_bus():
+    """Instruction and data groups of the same protocol mean Dual."""
+    interface, confidence = classify_bus(DUAL_WISHBONE)
+
+    assert interface == {'bus_type': 'Wishbone', 'memory_interface': 'Dual'}
+    assert confidence == 1.0
+
+
+def test_unknown_or_unparseable_headers_have_no_confidence():
+    """Without a recognizable bus the LLM has to be asked."""
+    assert classify_bus('module x(input a, output b);') == ({}, 0.0)
+    assert classify_bus('not verilog') == ({}, 0.0)
+
+
+def test_mapper_connects_both_memories_by_name():
+    """Each wrapper signal goes to the port of its own interface."""
+    interface, _ = classify_bus(DUAL_WISHBONE)
+
+    mapped, confidence = map_connections(interface, DUAL_WISHBONE)
+
+    assert mapped['core_addr'] == 'iwb_adr_o'
+    assert mapped['data_mem_data_in'] == 'dwb_dat_i'
+    assert mapped['data_mem_sel'] == 'dwb_sel_o'
+    assert min(confidence.values()) == 1.0
+
+
+def test_mapper_uses_rule_defaults_with_lower_confidence():
+    """A missing byte select is tied off, but not as a name match."""
+    interface = {'bus_type': 'Wishbone', 'memory_interface': 'Single'}
+
+    mapped, confidence = map_connections(
+        interface, SINGLE_WISHBONE_WITHOUT_SEL
+    )
+
+    assert mapped['core_sel'] == "4'b1111"
+    assert 0 < confidence['core_sel'] < 1.0
+    assert mapped['core_ack'] == 'wb_ack_i'
@@ -0,0 +1,104 @@
+"""Tests for `core.cache`."""
+
+import os
+import time
+from core.cache import ArtifactCache, ResponseCache, make_key
+
+
+def make_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(path=str(tmp_path / 'llm.sqlite'), **kwargs)
+
+
+def test_response_round_trip_counts_hits_and_misses(tmp_path):
+    """A stored response is found again, each lookup is counted."""
+    cache = make_cache(tmp_path)
+
+    assert cache.get('m', 'prompt') is None
+    cache.put('m', 'prompt', 'answer')
+
+    assert cache.get('m', 'prompt') == 'answer'
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats()['entries'] == 1
+
+
+def test_key_ignores_comments_and_whitespace_only(tmp_path):
+    """Reformatting the header hits; model, options and schema do not."""
+    cache = make_cache(tmp_path)
+    cache.put('m', 'module a(input x); // clock', 'answer')
+
+    assert cache.get('m', 'module  a(input x);\n/* old */') == 'answer'
+    assert cache.get('other', 'module a(input x);') is None
+    assert cache.get('m', 'module a(input x);', {'seed': 1}) is None
+    assert (
+        cache.get('m', 'module a(input x);', format={'type': 'object'}) is None
+    )
+
+
+def test_expired_entries_are_ignored_and_purged(tmp_path):
+    """Entries older than the TTL miss and are removed on the next put."""
+    cache = make_cache(tmp_path, ttl=0.05)
+    cache.put('m', 'old', 'answer')
+    time.sleep(0.1)
+
+    assert cache.get('m', 'old') is None
+    cache.put('m', 'new', 'answer')
+    assert cache.stats()['entries'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Only `max_entries` entries are kept, by last use."""
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put('m', 'a', '1')
+    time.sleep(0.01)
+    cache.put('m', 'b', '2')
+    time.sleep(0.01)
+    assert cache.get('m', 'a') == '1'
+    time.sleep(0.01)
+    cache.put('m', 'c', '3')
+
+    assert cache.peek('m', 'a') == '1'
+    assert cache.peek('m', 'b') is None
+    assert cache.peek('m', 'c') == '3'
+
+
+def test_peek_is_not_counted(tmp_path):
+    """`peek` does not change the hit and miss counters."""
+    cache = make_cache(tmp_path)
+    cache.put('m', 'a', '1')
+
+    assert cache.peek('m', 'a') == '1'
+    assert cache.peek('m', 'b') is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_make_key_separates_parts():
+    """Moving text between parts changes the key."""
+    assert make_key('ab', 'c') != make_key('a', 'bc')
+    assert make_key('a', b'b') == make_key(b'a', 'b')
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    """Entries read last survive once the size cap is exceeded."""
+    cache = ArtifactCache('test', max_bytes=25, root=str(tmp_path))
+    for age, key in enumerate(('a', 'b')):
+        entry = cache.put(key, {'out.v': 'x' * 10})
+        os.utime(entry, (age, age))
+    assert cache.get('a')
+
+    cache.put('c', {'out.v': 'x' * 10})
+
+    assert cache.get('a') and cache.get('c')
+    assert cache.get('b') is None
+
+
+def test_artifact_cache_counts_nested_files(tmp_path):
+    """The size of an entry includes its subdirectories."""
+    cache = ArtifactCache('test', max_bytes=15, root=str(tmp_path))
+    entry = cache.put('work', {'lib.cf': 'x'})
+    os.makedirs(os.path.join(entry, 'sub'))
+    with open(os.path.join(entry, 'sub', 'obj.o'), 'w') as f:
+        f.write('x' * 20)
+
+    cache.evict()
+
+    assert cache.get('work') is None
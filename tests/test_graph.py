@@ -0,0 +1,71 @@
+"""Tests for `core.graph.DependencyGraph`."""
+
+from core.graph import DependencyGraph
+
+
+def test_order_follows_edges_and_keeps_input_order_on_ties():
+    """Nodes come after their dependencies, otherwise in input order."""
+    graph = DependencyGraph(['top', 'alu', 'pkg', 'regs'])
+    graph.add_edge('pkg', 'alu')
+    graph.add_edge('alu', 'top')
+    graph.add_edge('regs', 'top')
+
+    assert graph.order() == ['pkg', 'alu', 'regs', 'top']
+
+
+def test_order_breaks_ties_by_key():
+    """A custom key decides between nodes that are ready together."""
+    graph = DependencyGraph(['b', 'c', 'a'], key=str)
+    graph.add_edge('c', 'a')
+
+    assert graph.order() == ['b', 'c', 'a']
+
+
+def test_add_edge_ignores_self_loops_and_duplicates():
+    """Only new edges between different nodes are added."""
+    graph = DependencyGraph(['a', 'b'])
+
+    assert graph.add_edge('a', 'b')
+    assert not graph.add_edge('a', 'b')
+    assert not graph.add_edge('a', 'a')
+    assert graph.successors == {'a': {'b'}, 'b': set()}
+
+
+def test_cycle_is_placed_as_a_whole():
+    """A cycle does not block the ordering and keeps outer edges."""
+    graph = DependencyGraph(['top', 'y', 'x', 'pkg'])
+    graph.add_edge('pkg', 'x')
+    graph.add_edge('x', 'y')
+    graph.add_edge('y', 'x')
+    graph.add_edge('y', 'top')
+
+    order = graph.order()
+
+    assert order == ['pkg', 'y', 'x', 'top']
+    assert graph.cycles() == [['y', 'x']]
+
+
+def test_every_node_is_ordered_once_with_several_cycles():
+    """Overlapping cycles collapse into one component."""
+    nodes = ['a', 'b', 'c', 'd', 'e']
+    graph = DependencyGraph(nodes)
+    for before, after in [('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'b')]:
+        graph.add_edge(before, after)
+    graph.add_edge('d', 'e')
+
+    order = graph.order()
+
+    assert sorted(order) == nodes
+    assert graph.cycles() == [['a', 'b', 'c']]
+    assert order.index('d') < order.index('e')
+
+
+def test_long_chain_does_not_hit_the_recursion_limit():
+    """Components are found iteratively."""
+    nodes = list(range(5000))
+    graph = DependencyGraph(reversed(nodes))
+    for node in nodes[:-1]:
+        graph.add_edge(node, node + 1)
+
+    assert graph.order() == nodes
+    assert graph.cycles() == []
@@ -0,0 +1,67 @@
+"""Tests for `core.header_compact`."""
+
+from core.header_compact import compact_header, estimate_tokens
+
+HEADER = """module core #(parameter XLEN = 32) ( // the core
+  input  wire              clk,      // system clock
+  input  wire              rst_n,
+  output wire [XLEN-1:0]   mem_addr,
+  output wire [XLEN-1:0]   mem_wdata,
+  input  wire [XLEN-1:0]   mem_rdata,
+  output wire [31:0]       trace_pc,
+  output wire [31:0]       dbg_state
+);
+  reg [31:0] pc;
+endmodule"""
+
+
+def test_header_becomes_a_port_table():
+    """One `direction range name` line per port, body dropped."""
+    compact = compact_header(HEADER)
+
+    assert compact.splitlines() == [
+        'module core #(',
+        '  parameter XLEN = 32',
+        ') (',
+        '  input clk, // system clock',
+        '  input rst_n,',
+        '  output [XLEN-1:0] mem_addr,',
+        '  output [XLEN-1:0] mem_wdata,',
+        '  input [XLEN-1:0] mem_rdata,',
+        '  output [31:0] trace_pc,',
+        '  output [31:0] dbg_state',
+        ');',
+    ]
+
+
+def test_body_starts_after_the_header_semicolon():
+    """The last port name appearing earlier does not move the body."""
+    header = """module m
+  import pa::*;
+(
+  input clk,
+  output [7:0] a
+);
+  assign a = 0;
+endmodule"""
+
+    compact = compact_header(header, keep_body=True)
+
+    assert compact.endswith(');\nassign a = 0;\nendmodule')
+
+
+def test_budget_drops_debug_and_trace_ports_first():
+    """Low-priority ports go before the memory ports."""
+    compact = compact_header(HEADER, max_tokens=40)
+
+    assert estimate_tokens(compact) <= 40
+    assert 'trace_pc' not in compact and 'dbg_state' not in compact
+    assert 'mem_addr' in compact
+    assert 'more ports omitted' in compact
+
+
+def test_unparseable_header_only_loses_comments_and_spaces():
+    """Without a module header the text is kept, squeezed."""
+    compact = compact_header('entity   x is  -- not verilog\n\n  port(a);')
+
+    assert compact == 'entity x is -- not verilog\nport(a);'
@@ -0,0 +1,41 @@
+"""Tests for `core.json_stream`."""
+
+from core.json_stream import BraceScanner, extract_balanced_braces
+
+
+def test_block_split_across_chunks():
+    """Offsets count every chunk fed so far."""
+    scanner = BraceScanner()
+    chunks = ['Answer: {"bus', '_type": "AXI"', '} done']
+
+    assert scanner.feed(chunks[0]) == []
+    assert scanner.feed(chunks[1]) == []
+    [(start, end)] = scanner.feed(chunks[2])
+    assert ''.join(chunks)[start:end] == '{"bus_type": "AXI"}'
+
+
+def test_nested_blocks_are_reported_once_at_the_top_level():
+    """Inner braces do not close the outer block."""
+    scanner = BraceScanner()
+    text = '{"a": {"b": {}}}{"c": 1}'
+
+    closed = [block for ch in text for block in scanner.feed(ch)]
+
+    assert closed == [(0, 16), (16, 24)]
+
+
+def test_stray_closing_brace_is_ignored():
+    """A `}` outside any block does not break the count."""
+    scanner = BraceScanner()
+
+    assert scanner.feed('} {x}') == [(2, 5)]
+    assert scanner.depth == 0
+
+
+def test_extract_balanced_braces():
+    """The first complete block from `start_index` is returned."""
+    text = 'Connections: {"a": {"b": 1}} tail {"c": 2}'
+
+    assert extract_balanced_braces(text, 0) == '{"a": {"b": 1}}'
+    assert extract_balanced_braces(text, 29) == '{"c": 2}'
+    assert extract_balanced_braces('{"open": {', 0) is None
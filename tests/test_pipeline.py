@@ -0,0 +1,111 @@
+"""Tests for `core.pipeline.Pipeline`."""
+
+import time
+import threading
+import pytest
+from core.pipeline import Pipeline
+
+
+def test_stages_get_their_inputs_and_store_their_outputs():
+    """Outputs are passed by name, several outputs come from a tuple."""
+    pipeline = Pipeline('test')
+    pipeline.add('split', lambda text: text.split(), ('text',), ('words',))
+    pipeline.add(
+        'count',
+        lambda words: (len(words), words[0]),
+        ('words',),
+        ('count', 'first'),
+    )
+
+    values = pipeline.run({'text': 'a b c'})
+
+    assert values == {
+        'text': 'a b c',
+        'words': ['a', 'b', 'c'],
+        'count': 3,
+        'first': 'a',
+    }
+
+
+def test_independent_stages_overlap():
+    """Stages without dependencies between them run at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline('test')
+    pipeline.add('left', barrier.wait, outputs=('left',))
+    pipeline.add('right', barrier.wait, outputs=('right',))
+
+    values = pipeline.run()
+
+    assert {values['left'], values['right']} == {0, 1}
+
+
+def test_failure_is_raised_and_dependents_never_start():
+    """The first error stops the run; stages after it are not started."""
+    pipeline = Pipeline('test')
+
+    def fail():
+        raise RuntimeError('preprocessing failed')
+
+    pipeline.add('fail', fail, outputs=('header',))
+    pipeline.add('wrapper', lambda header: header, ('header',), ('out',))
+
+    with pytest.raises(RuntimeError, match='preprocessing failed'):
+        pipeline.run()
+    assert pipeline.stages['fail'].end is not None
+    assert pipeline.stages['wrapper'].start is None
+
+
+def test_failure_waits_for_running_stages():
+    """Stages already running are awaited before the error is raised."""
+    finished = threading.Event()
+    pipeline = Pipeline('test')
+
+    def slow():
+        time.sleep(0.1)
+        finished.set()
+
+    def fail():
+        raise ValueError('bad')
+
+    pipeline.add('slow', slow)
+    pipeline.add('fail', fail)
+
+    with pytest.raises(ValueError):
+        pipeline.run()
+    assert finished.is_set()
+
+
+def test_missing_input_and_duplicate_output_are_rejected():
+    """The graph is checked before anything runs."""
+    pipeline = Pipeline('test')
+    pipeline.add('a', lambda x: x, ('x',), ('y',))
+
+    with pytest.raises(ValueError, match='needs x'):
+        pipeline.run()
+    with pytest.raises(ValueError, match='already produced'):
+        pipeline.add('b', lambda: 1, outputs=('y',))
+    with pytest.raises(ValueError, match='already exists'):
+        pipeline.add('a', lambda: 1)
+
+
+def test_cycle_is_rejected():
+    """Stages that wait on each other can never run."""
+    pipeline = Pipeline('test')
+    pipeline.add('a', lambda y: y, ('y',), ('x',))
+    pipeline.add('b', lambda x: x, ('x',), ('y',))
+
+    with pytest.raises(ValueError, match='cycle'):
+        pipeline.order()
+
+
+def test_critical_path_follows_the_slowest_dependency():
+    """The report marks the chain the last stage was waiting for."""
+    pipeline = Pipeline('test')
+    pipeline.add('fast', lambda: 1, outputs=('f',))
+    pipeline.add('slow', lambda: time.sleep(0.1), outputs=('s',))
+    pipeline.add('join', lambda f, s: f, ('f', 's'), ('out',))
+
+    pipeline.run()
+
+    assert [s.name for s in pipeline.critical_path()] == ['slow', 'join']
+    assert 'critical path (*): slow -> join' in pipeline.report()
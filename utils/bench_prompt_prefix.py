@@ -0,0 +1,121 @@
+"""
+Benchmark of prompt-prefix reuse: prompt evaluation time per call when the
+fixed instructions come first (the layout used by `core/prompts.py`) versus
+when the per-core data comes first, which defeats prefix reuse.
+
+Synthetic module headers stand in for a batch of cores. Against a real
+server (`SERVER_URL`) the numbers are the `prompt_eval_duration` reported
+by Ollama; without one, a local stand-in simulating prefix reuse is used:
+
+    python utils/bench_prompt_prefix.py --cores 20 --model qwen3:14b
+    SERVER_URL=http://gpu1:11434 python utils/bench_prompt_prefix.py
+"""
+import os
+import sys
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ollama import Client
+from core.interface_resolve import static_prefix
+from core.prompts import find_interface_prompt, wishbone_prompt
+from utils.fake_ollama import start_server
+
+
+def synthetic_header(index: int, ports: int) -> str:
+    """A module header with `ports` randomly named ports."""
+    rng = random.Random(index)
+    lines = [f'module core_{index} (', '  input clk,', '  input rst_n,']
+    for i in range(ports):
+        direction = rng.choice(['input', 'output'])
+        width = rng.choice(['', '[31:0] ', '[3:0] '])
+        name = rng.choice(['mem', 'bus', 'ibus', 'dbus']) + f'_sig{i}'
+        lines.append(f'  {direction} {width}{name},')
+    lines[-1] = lines[-1].rstrip(',')
+    lines.append(');')
+    return '\n'.join(lines)
+
+
+def build(template: str, header: str, prefix_first: bool) -> str:
+    """Builds a prompt with the fixed text first, or the header first."""
+    prompt = template.format(
+        core_declaration=header,
+        processor_interface=header,
+        memory_interface='Single',
+    )
+    if prefix_first:
+        return prompt
+    # Mesmo conteúdo, mas com os dados do core antes das instruções fixas
+    prefix = static_prefix(template)
+    return prompt[len(prefix) :] + '\n' + prefix
+
+
+def run(client: Client, model: str, prompts: list[str]) -> list[float]:
+    """Returns the prompt evaluation time (ms) of each call."""
+    times = []
+    for prompt in prompts:
+        response = client.generate(
+            model=model,
+            prompt=prompt,
+            keep_alive='10m',
+            options={'num_predict': 1},
+        )
+        times.append((response.prompt_eval_duration or 0) / 1e6)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark of prompt-prefix reuse',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument('--cores', type=int, default=10)
+    parser.add_argument('--ports', type=int, default=40)
+    parser.add_argument('--model', type=str, default='qwen3:14b')
+    parser.add_argument(
+        '--prompt',
+        choices=['interface', 'connections'],
+        default='interface',
+    )
+    parser.add_argument(
+        '--prompt-rate',
+        type=float,
+        default=20000,
+        help='Characters per second of the stand-in server',
+    )
+    args = parser.parse_args()
+
+    if 'SERVER_URL' in os.environ:
+        host = os.environ['SERVER_URL'].split(',')[0].split(';')[0]
+    else:
+        host = start_server(latency=0, prompt_rate=args.prompt_rate).url
+        print(f'Using stand-in server {host}')
+
+    client = Client(host=host)
+    template = (
+        find_interface_prompt
+        if args.prompt == 'interface'
+        else wishbone_prompt
+    )
+    headers = [synthetic_header(i, args.ports) for i in range(args.cores)]
+
+    print(
+        f'{"Layout":<14} {"First (ms)":>10} {"Mean (ms)":>10} '
+        f'{"Rest (ms)":>10}'
+    )
+    for label, prefix_first in (('data first', False), ('prefix first', True)):
+        prompts = [build(template, h, prefix_first) for h in headers]
+        # Chamada fora da medição, para partir do mesmo estado do servidor
+        run(client, args.model, ['warm-up'])
+        times = run(client, args.model, prompts)
+        rest = statistics.mean(times[1:]) if len(times) > 1 else times[0]
+        print(
+            f'{label:<14} {times[0]:>10.1f} '
+            f'{statistics.mean(times):>10.1f} {rest:>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
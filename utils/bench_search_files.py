@@ -0,0 +1,169 @@
+"""
+Benchmark of `search_files` on a synthetic source tree: the current
+single-pass name index against the previous implementation, which ran one
+regex per referenced module over every file. Both must return the same
+files:
+
+    python utils/bench_search_files.py --files 5000 --modules 300
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.hdl_process import search_files
+
+
+def legacy_search_files(text_lines, files):
+    """`search_files` before the name index, kept as the reference."""
+    modules = set()
+    pattern = re.compile(r'(\w+)\s*(\w+)\s*\(')
+    module_pattern = re.compile(r'^\s*module\s+(\w+)\s*\(')
+    entity_pattern = re.compile(r'^\s*entity\s+(\w+)\s+is\b', re.IGNORECASE)
+
+    for line in text_lines:
+        if line.strip() == '' or line.startswith('`line'):
+            continue
+        strip = line.strip()
+        out = pattern.search(strip)
+        module_out = module_pattern.search(strip)
+        entity_out = entity_pattern.search(strip)
+        if strip.endswith('#(') or ' #(' in strip:
+            split = strip.split(' ')
+            if 'module' in split[0]:
+                modules.add(split[1])
+            else:
+                modules.add(split[0])
+        elif module_out:
+            modules.add(module_out.group(1))
+        elif entity_out:
+            modules.add(entity_out.group(1))
+        elif out and strip[-1] == '(' and not strip[0] == ')':
+            modules.add(out.group(1))
+
+    found_files = set()
+    has_vhdl_files = any(f.lower().endswith(('.vhd', '.vhdl')) for f in files)
+    hdl_file_patterns = {}
+    for name in modules:
+        hdl_file_patterns[f'module_{name}'] = re.compile(
+            rf'^\s*module\s+{re.escape(name)}\b', re.IGNORECASE | re.MULTILINE
+        )
+        if has_vhdl_files:
+            hdl_file_patterns[f'entity_{name}'] = re.compile(
+                rf'^\s*entity\s+{re.escape(name)}\s+is\b',
+                re.IGNORECASE | re.MULTILINE,
+            )
+
+    for file_path in files:
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                if any(
+                    pattern.search(content)
+                    for pattern in hdl_file_patterns.values()
+                ):
+                    found_files.add(os.path.abspath(file_path))
+        except Exception:
+            pass
+
+    return sorted(found_files)
+
+
+def make_tree(root: str, count: int, lines: int) -> list[str]:
+    """Writes `count` HDL files declaring `unit_<i>` modules/entities."""
+    rng = random.Random(0)
+    body = '\n'.join(
+        f'  assign w{i} = a{i} & b{i}; // filler' for i in range(lines)
+    )
+    files = []
+    for i in range(count):
+        if i % 10 == 0:
+            path = os.path.join(root, f'd{i % 50}', f'unit_{i}.vhd')
+            text = (
+                f'library ieee;\nENTITY Unit_{i} IS\n  port (a : in bit);\n'
+                f'end entity;\n-- {body}\n'
+            )
+        else:
+            ext = '.sv' if i % 3 else '.v'
+            path = os.path.join(root, f'd{i % 50}', f'unit_{i}{ext}')
+            # Variações: quebra de linha após `module`, maiúsculas e vários
+            # módulos por arquivo
+            decl = rng.choice(
+                [
+                    f'module unit_{i} (',
+                    f'module\n  unit_{i} #(',
+                    f'  MODULE unit_{i}(',
+                ]
+            )
+            text = f'{decl}\n  input a\n);\n{body}\nendmodule\n'
+            if i % 7 == 0:
+                text += f'module unit_{i}_helper;\nendmodule\n'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        files.append(path)
+    return files
+
+
+def make_listing(count: int, modules: int) -> list[str]:
+    """Preprocessed lines instantiating `modules` of the generated units."""
+    rng = random.Random(1)
+    lines = ['module top (', '  input clk', ');']
+    for i in rng.sample(range(count), modules):
+        lines.append(f'  unit_{i} u{i} (')
+        lines.append('    .clk(clk)')
+        lines.append('  );')
+    lines.append('endmodule')
+    return lines
+
+
+def measure(func, *args) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark of search_files',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--modules', type=int, default=300)
+    parser.add_argument(
+        '--lines', type=int, default=200, help='Filler lines per file'
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        files = make_tree(root, args.files, args.lines)
+        listing = make_listing(args.files, min(args.modules, args.files))
+
+        # Primeira leitura fora da medição, para aquecer o cache de páginas
+        search_files(listing, files)
+
+        legacy_time, expected = measure(legacy_search_files, listing, files)
+        index_time, found = measure(search_files, listing, files)
+
+    print(
+        f'{args.files} files, {args.modules} referenced modules, '
+        f'{len(found)} files found'
+    )
+    print(f'{"Legacy":<8} {legacy_time:>8.2f}s')
+    print(
+        f'{"Index":<8} {index_time:>8.2f}s '
+        f'({legacy_time / index_time:.1f}x faster)'
+    )
+    if found != expected:
+        print('Results differ from the legacy implementation!')
+        sys.exit(1)
+    print('Results are identical.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Local stand-in for an Ollama server, used to exercise the LLM client code
+(load balancing, caching, timeouts) without a GPU or network access.
+
+It implements `/api/generate` (streaming and non-streaming), `/api/tags` and
+`/api/ps`, with configurable latency and error rate. With `--prompt-rate`,
+prompt evaluation takes time proportional to the part of the prompt that
+differs from the previous prompt of the same model, like the prefix reuse
+of a real server. With `--load-time`, the first request for a model waits
+for it to load; an empty prompt only loads the model, and `keep_alive=0`
+unloads it:
+
+    python utils/fake_ollama.py --port 11500 --latency 2 --error-rate 0.1
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTERFACE_ANSWER = (
+    'The module exposes cyc, stb, we, adr, dat_i, dat_o and ack signals, '
+    'so it is a Wishbone master with a single memory interface.\n'
+    '{"bus_type": "Wishbone", "memory_interface": "Single"}'
+)
+
+CONNECTIONS_ANSWER = (
+    'Mapping the Wishbone signals to the wrapper.\n'
+    'Connections:\n'
+    '{\n'
+    '    "core_cyc": "wb_cyc_o",\n'
+    '    "core_stb": "wb_stb_o",\n'
+    '    "core_we": "wb_we_o",\n'
+    '    "core_addr": "wb_adr_o",\n'
+    '    "core_data_out": "wb_dat_o",\n'
+    '    "core_data_in": "wb_dat_i",\n'
+    '    "core_ack": "wb_ack_i",\n'
+    '    "core_sel": "4\'b1111"\n'
+    '}'
+)
+
+
+def default_answer(prompt: str) -> str:
+    """Returns a canned answer matching the kind of prompt received."""
+    if 'wrapper interface' in prompt or 'Connections' in prompt:
+        return CONNECTIONS_ANSWER
+    return INTERFACE_ANSWER
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """HTTP server emulating the subset of the Ollama API used here."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        models: list[str] | None = None,
+        answer: str | None = None,
+        chunk_size: int = 8,
+        prompt_rate: float | None = None,
+        load_time: float = 0.0,
+    ):
+        super().__init__(address, FakeOllamaHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.models = models
+        self.answer = answer
+        self.chunk_size = chunk_size
+        self.prompt_rate = prompt_rate  # caracteres avaliados por segundo
+        self.last_prompt = {}
+        self.load_time = load_time
+        self.loading = {}
+        self.loaded = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def delay(self) -> float:
+        return max(0.0, random.gauss(self.latency, self.jitter))
+
+    def load(self, model: str) -> float:
+        """Loads `model` if needed and returns the time it took."""
+        start = time.monotonic()
+        with self.lock:
+            loaded = self.loading.get(model)
+            if loaded is None:
+                loaded = self.loading[model] = threading.Event()
+                first = True
+            else:
+                first = False
+        if first:
+            time.sleep(self.load_time)
+            with self.lock:
+                self.loaded.add(model)
+            loaded.set()
+        # Requisições concorrentes esperam a mesma carga
+        loaded.wait()
+        return time.monotonic() - start if self.load_time else 0.0
+
+    def prompt_eval_time(self, model: str, prompt: str) -> float:
+        """Time to evaluate the part of `prompt` not shared with the last."""
+        if not self.prompt_rate:
+            return 0.0
+        with self.lock:
+            last = self.last_prompt.get(model, '')
+            self.last_prompt[model] = prompt
+        shared = len(os.path.commonprefix([last, prompt]))
+        return (len(prompt) - shared) / self.prompt_rate
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server: FakeOllamaServer
+
+    def log_message(self, format, *args):
+        pass  # silencioso
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        models = sorted(self.server.models or self.server.loaded)
+        if self.path == '/api/tags':
+            self._send_json(200, {'models': [{'name': m} for m in models]})
+        elif self.path == '/api/ps':
+            loaded = sorted(self.server.loaded)
+            self._send_json(200, {'models': [{'name': m} for m in loaded]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        model = request.get('model', '')
+        prompt = request.get('prompt') or ''
+
+        with self.server.lock:
+            self.server.requests += 1
+
+        if self.server.models is not None and model not in self.server.models:
+            self._send_json(404, {'error': f'model "{model}" not found'})
+            return
+
+        delay = self.server.delay()
+        if random.random() < self.server.error_rate:
+            time.sleep(delay / 2)
+            self._send_json(500, {'error': 'simulated server failure'})
+            return
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        if request.get('keep_alive') in (0, '0', '0s', '0m'):
+            with self.server.lock:
+                self.server.loaded.discard(model)
+                self.server.loading.pop(model, None)
+                self.server.last_prompt.pop(model, None)
+            self._send_json(
+                200,
+                {
+                    'model': model,
+                    'created_at': created_at,
+                    'response': '',
+                    'done': True,
+                    'done_reason': 'unload',
+                },
+            )
+            return
+
+        load_time = self.server.load(model)
+        if not prompt:
+            self._send_json(
+                200,
+                {
+                    'model': model,
+                    'created_at': created_at,
+                    'response': '',
+                    'done': True,
+                    'done_reason': 'load',
+                    'load_duration': int(load_time * 1e9),
+                },
+            )
+            return
+
+        answer = self.server.answer or default_answer(prompt)
+        eval_time = self.server.prompt_eval_time(model, prompt)
+        time.sleep(eval_time)
+        stats = {
+            'total_duration': int((delay + eval_time + load_time) * 1e9),
+            'load_duration': int(load_time * 1e9),
+            'prompt_eval_count': len(prompt) // 4,
+            'prompt_eval_duration': int(
+                (eval_time if self.server.prompt_rate else delay * 0.2) * 1e9
+            ),
+            'eval_count': len(answer) // 4,
+            'eval_duration': int(delay * 0.8e9),
+        }
+
+        if not request.get('stream', True):
+            time.sleep(delay)
+            self._send_json(
+                200,
+                {
+                    'model': model,
+                    'created_at': created_at,
+                    'response': answer,
+                    'done': True,
+                    'done_reason': 'stop',
+                    **stats,
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        size = self.server.chunk_size
+        chunks = [answer[i : i + size] for i in range(0, len(answer), size)]
+        try:
+            for chunk in chunks:
+                time.sleep(delay / max(1, len(chunks)))
+                line = {
+                    'model': model,
+                    'created_at': created_at,
+                    'response': chunk,
+                    'done': False,
+                }
+                self.wfile.write(json.dumps(line).encode() + b'\n')
+                self.wfile.flush()
+            last = {
+                'model': model,
+                'created_at': created_at,
+                'response': '',
+                'done': True,
+                'done_reason': 'stop',
+                **stats,
+            }
+            self.wfile.write(json.dumps(last).encode() + b'\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # cliente cancelou a geração
+
+
+def start_server(
+    port: int = 0, host: str = '127.0.0.1', **kwargs
+) -> FakeOllamaServer:
+    """Starts a stand-in server on a background thread and returns it."""
+    server = FakeOllamaServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for an Ollama server',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11500)
+    parser.add_argument(
+        '--latency', type=float, default=0.5, help='Mean latency (s)'
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=0.0, help='Latency std. dev. (s)'
+    )
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of requests answered with HTTP 500',
+    )
+    parser.add_argument(
+        '--models',
+        type=str,
+        nargs='*',
+        help='Models served (default: any)',
+    )
+    parser.add_argument(
+        '--prompt-rate',
+        type=float,
+        help='Prompt characters evaluated per second, simulating prefix '
+        'reuse (default: prompt evaluation is free)',
+    )
+    parser.add_argument(
+        '--load-time',
+        type=float,
+        default=0.0,
+        help='Time (s) to load a model on its first request',
+    )
+    parser.add_argument(
+        '--answer-file',
+        type=str,
+        help='File with a fixed answer (default: canned answers)',
+    )
+    args = parser.parse_args()
+
+    answer = None
+    if args.answer_file:
+        with open(args.answer_file, 'r', encoding='utf-8') as f:
+            answer = f.read()
+
+    server = FakeOllamaServer(
+        (args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        models=args.models,
+        answer=answer,
+        prompt_rate=args.prompt_rate,
+        load_time=args.load_time,
+    )
+    print(f'Fake Ollama server listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Load test of the LLM endpoint balancer against local stand-in servers.
+
+Starts one fake Ollama server per `--server LATENCY:ERROR_RATE[:WEIGHT]`,
+points `SERVER_URL` at them and fires `--requests` prompts through
+`send_prompt_async`, then reports how requests were distributed:
+
+    python utils/load_test_balancer.py --server 0.2:0 --server 0.5:0.3 \
+        --server 0.2:0:2 --requests 200
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import collections
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fake_ollama import start_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Load test of the LLM endpoint balancer',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        '--server',
+        action='append',
+        default=[],
+        help='Stand-in server as LATENCY:ERROR_RATE[:WEIGHT]',
+    )
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    parser.add_argument('--model', type=str, default='qwen3:14b')
+    args = parser.parse_args()
+
+    specs = args.server or ['0.2:0', '0.4:0', '0.2:0.5']
+    servers = []
+    entries = []
+    for spec in specs:
+        latency, error_rate, *weight = spec.split(':')
+        server = start_server(
+            latency=float(latency), error_rate=float(error_rate)
+        )
+        servers.append(server)
+        entry = server.url
+        if weight:
+            entry += f';weight={weight[0]}'
+        entries.append(entry)
+
+    os.environ['SERVER_URL'] = ','.join(entries)
+    os.environ['LLM_MAX_IN_FLIGHT'] = str(args.max_in_flight)
+
+    import core
+
+    results = collections.Counter()
+
+    async def one(i: int) -> None:
+        try:
+            ok, _ = await core.send_prompt_async(f'prompt {i}', args.model)
+            results['ok' if ok else 'empty'] += 1
+        except Exception as e:
+            results[type(e).__name__] += 1
+
+    async def run() -> None:
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+    start = time.monotonic()
+    asyncio.run(run())
+    elapsed = time.monotonic() - start
+
+    print(f'{args.requests} requests in {elapsed:.2f}s: {dict(results)}')
+    print(f'{"Endpoint":<28} {"Spec":<12} {"Requests":>8} {"Ejections":>9}')
+    for server, spec, endpoint in zip(servers, specs, core.llm_pool.endpoints):
+        print(
+            f'{server.url:<28} {spec:<12} {server.requests:>8} '
+            f'{endpoint.ejections:>9}'
+        )
+
+
+if __name__ == '__main__':
+    main()